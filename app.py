@@ -2,17 +2,24 @@
 Main Streamlit application for the LLM Evolution Explorer.
 """
 import streamlit as st
+import html
+import json
 import os
 import sys
+from contextlib import contextmanager
 
 # Add the current directory to the path so imports work correctly
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from utils.config import get_config, save_api_key
-from utils.gemini_api import initialize_gemini, generate_response, generate_rag_response, get_available_models
-from utils.document_processor import extract_text_from_pdf, save_uploaded_file
+from utils.gemini_api import initialize_gemini, generate_response_stream, generate_rag_response_stream
+from utils.ingestion import get_ingestion_queue
+from utils.retrieval import CorpusIndex, retrieve_chunks
+from utils.context_packer import pack_context
 from utils.model_selector import add_model_selector
-import asyncio
+from utils.tracing import get_tracer
+from utils.async_runtime import get_async_runtime
+from utils.upload_store import get_upload_store
 
 # Set page configuration
 config = get_config()
@@ -58,13 +65,40 @@ def main():
         st.session_state.api_key_submitted = False
     if "current_setup" not in st.session_state:
         st.session_state.current_setup = "basic"
-    if "document_text" not in st.session_state:
-        st.session_state.document_text = ""
+    # A SharedDocument handle: the document and its index live in the process-wide document store
+    if "document" not in st.session_state:
+        st.session_state.document = None
+    if "document_vector_store" not in st.session_state:
+        st.session_state.document_vector_store = None
+    if "document_ann_index" not in st.session_state:
+        st.session_state.document_ann_index = None
     if "documents" not in st.session_state:
         st.session_state.documents = {}
+    if "corpus_index" not in st.session_state:
+        st.session_state.corpus_index = CorpusIndex()
+    # Created on first use of a dense engine, so NumPy isn't loaded for BM25-only sessions
+    if "vector_corpus" not in st.session_state:
+        st.session_state.vector_corpus = None
+    if "ann_corpus" not in st.session_state:
+        st.session_state.ann_corpus = None
+    if "retrieval_engine" not in st.session_state:
+        st.session_state.retrieval_engine = config["retrieval_engine"]
+    if "processed_uploads" not in st.session_state:
+        st.session_state.processed_uploads = set()
+    if "ingestion_jobs" not in st.session_state:
+        st.session_state.ingestion_jobs = []  # uploads being processed in the background
+    if "ingestion_errors" not in st.session_state:
+        st.session_state.ingestion_errors = []
+    if "last_trace" not in st.session_state:
+        st.session_state.last_trace = None
+    if "tool_memo" not in st.session_state:
+        st.session_state.tool_memo = {}  # agent tool results, memoized for the session
     if "selected_model" not in st.session_state:
         st.session_state.selected_model = config["default_model"]
     
+    # Start the janitor that removes expired uploads (once per process)
+    get_upload_store()
+    
     # Header
     st.markdown("<h1 class='main-header'>LLM Evolution Explorer</h1>", unsafe_allow_html=True)
     st.markdown("An interactive app to explore the evolution of LLMs — from basic queries to agentic RAG integrations.")
@@ -121,6 +155,21 @@ def main():
             
             # Add model selector
             st.session_state.selected_model = add_model_selector()
+            
+            # Retrieval engine selection for the RAG setups
+            if st.session_state.current_setup in ("rag", "agentic_rag"):
+                retrieval_engines = {
+                    "bm25": "Lexical (BM25)",
+                    "dense": "Dense vectors (exact)",
+                    "ann": "Dense vectors (approximate, IVF)"
+                }
+                st.markdown("### Retrieval Engine")
+                st.session_state.retrieval_engine = st.selectbox(
+                    "Engine:",
+                    options=list(retrieval_engines.keys()),
+                    format_func=lambda x: retrieval_engines[x],
+                    index=list(retrieval_engines.keys()).index(st.session_state.retrieval_engine)
+                )
     
     # Main content based on selected setup
     if not st.session_state.api_key_submitted:
@@ -146,6 +195,11 @@ def main():
         agentic_tool_use()
     elif st.session_state.current_setup == "agentic_rag":
         agentic_rag_integration()
+    
+    # Rendered last so that it shows the request that just ran
+    with st.sidebar:
+        display_trace_panel()
+        display_document_store_metrics()
 
 def display_architecture(setup):
     """Display the conceptual architecture for the selected setup."""
@@ -241,6 +295,239 @@ def display_workflow(setup):
     for i, step in enumerate(workflows[setup]):
         st.markdown(f"**Step {i+1}:** {step}")
 
+def display_stream_stats(stream):
+    """Display the timing and cache status of a streamed response next to the answer."""
+    stats = []
+    if stream.time_to_first_token is not None:
+        stats.append(f"Time to first token: {stream.time_to_first_token:.2f}s")
+        stats.append(f"Total time: {stream.total_time:.2f}s")
+    if stream.cache_hit is not None:
+        stats.append("Cache: hit" if stream.cache_hit else "Cache: miss")
+    if stats:
+        st.caption(" · ".join(stats))
+
+def vector_store_key(content_hash):
+    """Get the vector store key of a document chunked with the configured settings."""
+    return f"{content_hash}_{config['chunk_size']}_{config['chunk_overlap']}"
+
+def get_document_retriever():
+    """Get the index of the RAG document for the selected retrieval engine."""
+    engine = st.session_state.retrieval_engine
+    index = st.session_state.document.get_index()
+    if engine == "bm25":
+        return index
+    
+    # Import the vector modules here so NumPy is only loaded by the dense engines
+    from utils.vector_store import open_vector_store
+    from utils.ann_index import LibraryDocument, get_library_index
+    
+    if st.session_state.document_vector_store is None:
+        # Reopens the persisted vectors if this document was embedded before
+        st.session_state.document_vector_store = open_vector_store(
+            vector_store_key(st.session_state.document.document["hash"]),
+            index.chunks
+        )
+    if engine == "ann":
+        if st.session_state.document_ann_index is None:
+            # Searched through the IVF index shared by all documents of all sessions
+            st.session_state.document_ann_index = LibraryDocument(get_library_index(), st.session_state.document_vector_store)
+        return st.session_state.document_ann_index
+    return st.session_state.document_vector_store
+
+def get_corpus_retriever():
+    """Get the multi-document index for the selected retrieval engine."""
+    engine = st.session_state.retrieval_engine
+    if engine == "bm25":
+        return st.session_state.corpus_index
+    
+    # Import the vector modules here so NumPy is only loaded by the dense engines
+    from utils.vector_store import VectorCorpus, open_vector_store
+    from utils.ann_index import LibraryCorpus, get_library_index
+    
+    corpus_key = "ann_corpus" if engine == "ann" else "vector_corpus"
+    if st.session_state[corpus_key] is None:
+        # The approximate corpus probes the IVF index shared by all documents of all sessions
+        st.session_state[corpus_key] = LibraryCorpus(get_library_index()) if engine == "ann" else VectorCorpus()
+    vector_corpus = st.session_state[corpus_key]
+    for doc_name, doc_info in st.session_state.documents.items():
+        if doc_name not in vector_corpus:
+            chunks = st.session_state.corpus_index.document_chunks(doc_name)
+            store = open_vector_store(vector_store_key(doc_info["handle"].document["hash"]), chunks)
+            vector_corpus.add_document(doc_name, store)
+    return vector_corpus
+
+def remove_document_vectors(doc_name):
+    """Drop a document from the dense and approximate corpora, if they exist."""
+    for corpus in (st.session_state.vector_corpus, st.session_state.ann_corpus):
+        if corpus is not None:
+            corpus.remove_document(doc_name)
+
+def add_page_citations(results):
+    """Label retrieved chunks with the page they start on, for citations."""
+    for result in results:
+        if "document" in result:
+            pages = st.session_state.documents[result["document"]]["handle"].document["chunk_pages"]
+            result["label"] = f"{result['document']}, p. {pages[result['position']]}"
+        else:
+            pages = st.session_state.document.document["chunk_pages"]
+            result["label"] = f"Chunk {result['chunk_id'] + 1}, p. {pages[result['chunk_id']]}"
+    return results
+
+@contextmanager
+def request_trace(name):
+    """Trace a user request and keep its waterfall for the sidebar panel."""
+    with get_tracer().trace(name, model=st.session_state.selected_model) as trace:
+        yield trace
+    if trace is not None:
+        st.session_state.last_trace = trace.to_dict()
+
+def render_waterfall(trace):
+    """Render the spans of a trace as an HTML waterfall."""
+    total = trace["duration_ms"] or 1.0
+    depths = {}
+    rows = []
+    for span in trace["spans"]:
+        depth = depths.get(span["parent_id"], -1) + 1
+        depths[span["span_id"]] = depth
+        left = 100 * span["start_ms"] / total
+        width = max(0.5, 100 * span["duration_ms"] / total)
+        color = "#d9534f" if span["error"] else "#4e8cff"
+        rows.append(
+            f"<div style='font-size:0.75rem;padding-left:{depth * 0.6}rem'>{html.escape(span['name'])} "
+            f"<span style='color:#888'>{span['duration_ms']:.0f} ms</span></div>"
+            f"<div style='position:relative;height:6px;background:#eee;margin-bottom:4px'>"
+            f"<div style='position:absolute;left:{left:.1f}%;width:{width:.1f}%;height:6px;background:{color}'></div></div>"
+        )
+    return "".join(rows)
+
+def display_trace_panel():
+    """Display the waterfall of the last request and the rolling latency histograms."""
+    st.markdown("### Latency Trace")
+    trace = st.session_state.last_trace
+    if trace is None:
+        st.caption("Submit a request to see where its time went.")
+    else:
+        st.caption(f"{trace['name']} · {trace['duration_ms']:.0f} ms")
+        st.markdown(render_waterfall(trace), unsafe_allow_html=True)
+    
+    histograms = get_tracer().histograms()
+    if histograms:
+        with st.expander("Latency histograms"):
+            st.dataframe([
+                {
+                    "span": name,
+                    "count": histogram["count"],
+                    "p50 ms": round(histogram["p50_ms"], 1),
+                    "p95 ms": round(histogram["p95_ms"], 1),
+                    "p99 ms": round(histogram["p99_ms"], 1),
+                }
+                for name, histogram in sorted(histograms.items())
+            ], hide_index=True)
+            span_name = st.selectbox("Span:", options=sorted(histograms))
+            st.dataframe([
+                {"latency": f"≤ {bound} ms" if bound is not None else "slower", "count": count}
+                for bound, count in histograms[span_name]["buckets"] if count
+            ], hide_index=True)
+
+def display_document_store_metrics():
+    """Display the size and hit rate of the document store shared by all sessions."""
+    from utils.document_store import get_document_store
+    metrics = get_document_store().metrics()
+    st.markdown("### Shared Documents")
+    st.caption(
+        f"{metrics['resident_documents']} documents in memory · "
+        f"{metrics['resident_bytes'] / 2 ** 20:.1f} / {metrics['max_bytes'] / 2 ** 20:.0f} MB · "
+        f"{metrics['references']} session references · hit rate {metrics['hit_rate']:.0%} · "
+        f"{metrics['evictions']} evicted to disk"
+    )
+
+def display_packing_report(packing):
+    """Display how much of the model's context budget the packed context used."""
+    st.caption(
+        f"Context: {packing['used_tokens']:,} / {packing['budget']:,} tokens ({packing['utilization']:.0%} of budget) · "
+        f"{packing['included']} chunks included, {packing['dropped']} dropped"
+    )
+
+def display_source_timings(fetched):
+    """Display how long each context source of a pipelined request took."""
+    names = {"documents": "Documents", "github": "GitHub issues"}
+    parts = []
+    for name, source in fetched.items():
+        if source["status"] == "ok":
+            parts.append(f"{names.get(name, name)}: {source['elapsed_ms']:.0f} ms ({len(source['results'])} results)")
+        else:
+            parts.append(f"{names.get(name, name)}: {source['status']} after {source['elapsed_ms']:.0f} ms")
+    st.caption(" · ".join(parts))
+
+def queue_upload(uploaded_file, target):
+    """Queue an uploaded PDF for background ingestion into the "document" or "corpus" index."""
+    job = get_ingestion_queue().submit(uploaded_file.name, uploaded_file, config["chunk_size"], config["chunk_overlap"])
+    st.session_state.ingestion_jobs.append({"job": job, "target": target})
+
+def index_ingested_document(job, target):
+    """Add the shared document of a finished ingestion job to the session."""
+    handle = job.document
+    if target == "document":
+        if st.session_state.document is not None:
+            st.session_state.document.release()
+        st.session_state.document = handle
+        st.session_state.document_vector_store = None
+        st.session_state.document_ann_index = None
+    else:
+        # Add the document's shared index to the corpus without rebuilding it
+        if job.name in st.session_state.documents:
+            st.session_state.documents[job.name]["handle"].release()
+        st.session_state.corpus_index.add_document(job.name, index=handle.get_index)
+        remove_document_vectors(job.name)
+        st.session_state.documents[job.name] = {
+            "handle": handle,
+            "num_chunks": len(handle.document["chunks"])
+        }
+    if job.trace is not None:
+        st.session_state.last_trace = job.trace
+
+def collect_ingestion_jobs():
+    """Index the documents of finished ingestion jobs. Returns whether any job finished."""
+    running = []
+    finished = False
+    for entry in st.session_state.ingestion_jobs:
+        job = entry["job"]
+        if not job.finished:
+            running.append(entry)
+            continue
+        finished = True
+        if job.error:
+            st.session_state.ingestion_errors.append(f"Could not process '{job.name}': {job.error}")
+        else:
+            index_ingested_document(job, entry["target"])
+    st.session_state.ingestion_jobs = running
+    return finished
+
+@st.fragment(run_every=config["ingestion_poll_interval"])
+def display_ingestion_progress(target):
+    """Show per-page progress of the running ingestion jobs, polling until they finish."""
+    if collect_ingestion_jobs():
+        # Rerun the whole page so the document list and question box pick up the new documents
+        st.rerun()
+    for entry in st.session_state.ingestion_jobs:
+        if entry["target"] != target:
+            continue
+        job = entry["job"]
+        if job.num_pages is None:
+            text = f"{job.name}: {job.status}"
+        else:
+            text = f"{job.name}: page {job.pages_done} of {job.num_pages}"
+        st.progress(job.progress, text=text)
+
+def display_ingestion_status(target):
+    """Show ingestion errors and the progress of a panel's running jobs."""
+    for error in st.session_state.ingestion_errors:
+        st.error(error)
+    st.session_state.ingestion_errors = []
+    collect_ingestion_jobs()
+    if any(entry["target"] == target for entry in st.session_state.ingestion_jobs):
+        display_ingestion_progress(target)
+
 def basic_llm_query():
     """Implement the basic LLM query functionality."""
     st.markdown("<div class='card'>", unsafe_allow_html=True)
@@ -250,10 +537,11 @@ def basic_llm_query():
     
     if st.button("Submit Query"):
         if query:
-            with st.spinner("Generating response..."):
-                response = generate_response(query, st.session_state.selected_model)
+            with request_trace("basic_query"):
                 st.markdown("### Response:")
-                st.markdown(response)
+                stream = generate_response_stream(query, st.session_state.selected_model)
+                st.write_stream(stream)
+                display_stream_stats(stream)
         else:
             st.warning("Please enter a query.")
     
@@ -267,33 +555,35 @@ def rag_integration():
     st.markdown("### Upload Document")
     uploaded_file = st.file_uploader("Upload a PDF document:", type=["pdf"])
     
-    if uploaded_file:
-        if "document_path" not in st.session_state or st.session_state.document_path != uploaded_file.name:
-            with st.spinner("Processing document..."):
-                # Save the uploaded file
-                file_path = save_uploaded_file(uploaded_file, config["temp_folder"])
-                
-                # Extract text from the PDF
-                document_text = extract_text_from_pdf(file_path)
-                
-                # Store in session state
-                st.session_state.document_text = document_text
-                st.session_state.document_path = uploaded_file.name
-                
-                st.success(f"Document '{uploaded_file.name}' processed successfully!")
+    # Track the upload by file id, so a different file with the same name is processed too
+    if uploaded_file and st.session_state.get("document_upload_id") != uploaded_file.file_id:
+        # Extract and chunk the PDF in the background; the previous document stays queryable meanwhile
+        queue_upload(uploaded_file, "document")
+        st.session_state.document_upload_id = uploaded_file.file_id
+    display_ingestion_status("document")
     
     # Query input
     st.markdown("### Ask a Question About the Document")
     
-    if st.session_state.document_text:
+    if st.session_state.document is not None:
         query = st.text_area("Your question:", height=100)
         
         if st.button("Submit Question"):
             if query:
-                with st.spinner("Generating response..."):
-                    response = generate_rag_response(query, st.session_state.document_text, st.session_state.selected_model)
+                with request_trace("rag_query"):
+                    # Only send the most relevant chunks instead of the whole document
+                    results = add_page_citations(retrieve_chunks(get_document_retriever(), query, config["retrieval_top_k"]))
+                    context, packing = pack_context(results, st.session_state.selected_model)
                     st.markdown("### Response:")
-                    st.markdown(response)
+                    stream = generate_rag_response_stream(query, context, st.session_state.selected_model)
+                    st.write_stream(stream)
+                    display_stream_stats(stream)
+                    display_packing_report(packing)
+                    
+                    with st.expander(f"Retrieved context ({len(results)} chunks)"):
+                        for result in results:
+                            st.markdown(f"**{result['label']}** (score: {result['score']:.2f})")
+                            st.text(result["text"])
             else:
                 st.warning("Please enter a question.")
     else:
@@ -308,6 +598,7 @@ def agentic_tool_use():
     
     # Import the GitHub tool here to avoid circular imports
     from utils.github_tool import GitHubTool
+    from utils.agent import run_agent
     
     # Default repository from config
     default_repo = config['github_repo']
@@ -329,10 +620,7 @@ def agentic_tool_use():
     
     if st.button("Submit Repository Query"):
         if query:
-            with st.spinner("Processing query..."):
-                # First, generate a response using Gemini
-                response = generate_response(f"The user is asking about the GitHub repository: {repo_url}. The query is: {query}", st.session_state.selected_model)
-                
+            with request_trace("agentic_query"):
                 # Initialize GitHub tool
                 github_tool = GitHubTool()
                 github_tool.repo_url = repo_url  # Update the repository URL
@@ -346,38 +634,43 @@ def agentic_tool_use():
                     # Display repository info
                     st.markdown(f"### Repository: {repo_owner}/{repo_name}")
                     
-                    # Display response
-                    st.markdown("### Response:")
-                    st.markdown(response)
-                    
-                    # Show repository issues
-                    st.markdown("### Repository Issues:")
+                    # Let the model call the GitHub tools; calls of one turn run concurrently on the
+                    # background event loop, and results are memoized for the session
+                    with st.spinner("Agent is working..."):
+                        result = get_async_runtime().run(
+                            run_agent(query, github_tool, st.session_state.selected_model, st.session_state.tool_memo)
+                        )
                     
-                    # Use asyncio to run the async method
-                    async def get_issues():
-                        return await github_tool.list_repository_issues(repo_owner, repo_name)
+                    st.markdown("### Response:")
+                    st.write_stream(result["stream"])
+                    if result["stop_reason"] in ("max_steps", "time_budget"):
+                        # Only an answer from the gathered tool results is generated while streamed
+                        display_stream_stats(result["stream"])
+                    calls = [call for step in result["steps"] for call in step["calls"]]
+                    memoized = sum(call["cached"] for call in calls)
+                    st.caption(f"{len(result['steps'])} model turns · {len(calls)} tool calls ({memoized} memoized) · "
+                               f"{result['elapsed']:.2f}s · stopped: {result['stop_reason'].replace('_', ' ')}")
                     
-                    issues = asyncio.run(get_issues())
-                    if isinstance(issues, list):
-                        for issue in issues:
-                            st.markdown(f"**#{issue['number']}**: {issue['title']} ({issue['state']})")
-                            st.markdown(f"Created: {issue['created_at']}")
-                            st.markdown(f"Description: {issue['body']}")
-                            st.markdown("---")
-                    else:
-                        st.warning(f"Could not fetch issues: {issues}")
+                    # Show the tool calls the model made
+                    st.markdown("### Tool Calls:")
+                    if not calls:
+                        st.info("The model answered without calling any tools.")
+                    for step in result["steps"]:
+                        if not step["calls"]:
+                            continue
+                        names = ", ".join(call["name"] for call in step["calls"])
+                        with st.expander(f"Turn {step['step']}: {names}"):
+                            for call in step["calls"]:
+                                status = "memoized" if call["cached"] else f"{call['duration_ms']:.0f} ms"
+                                st.markdown(f"**{call['name']}** `{json.dumps(call['args'], default=str)}` · {status}")
+                                if isinstance(call["result"], str):
+                                    st.warning(call["result"])
+                                else:
+                                    st.json(call["result"], expanded=False)
                     
-                    # Show available tools (for demonstration)
+                    # Show the functions registered with the model
                     st.markdown("### Available Tools:")
-                    st.info("This would normally be handled automatically by the agentic LLM, but for demonstration purposes, we're showing the available tools here.")
-                    
-                    # Use asyncio to run the async method
-                    async def run_async():
-                        tools = await github_tool.discover_available_tools()
-                        return tools
-                    
-                    tools = asyncio.run(run_async())
-                    st.json(tools)
+                    st.json(result["tools"], expanded=False)
                 else:
                     st.error("Invalid repository URL format. Please use the format: https://github.com/username/repository")
         else:
@@ -391,30 +684,27 @@ def agentic_rag_integration():
     
     # Document upload
     st.markdown("### Upload Documents")
-    uploaded_file = st.file_uploader("Upload a PDF document:", type=["pdf"], key="agentic_rag_uploader")
+    uploaded_files = st.file_uploader("Upload PDF documents:", type=["pdf"], accept_multiple_files=True, key="agentic_rag_uploader")
     
-    if uploaded_file:
-        if uploaded_file.name not in st.session_state.documents:
-            with st.spinner("Processing document..."):
-                # Save the uploaded file
-                file_path = save_uploaded_file(uploaded_file, config["temp_folder"])
-                
-                # Extract text from the PDF
-                document_text = extract_text_from_pdf(file_path)
-                
-                # Store in session state
-                st.session_state.documents[uploaded_file.name] = {
-                    "path": file_path,
-                    "text": document_text
-                }
-                
-                st.success(f"Document '{uploaded_file.name}' processed successfully!")
+    # Track uploads by file id so a removed document isn't re-added on the next rerun
+    for uploaded_file in uploaded_files or []:
+        if uploaded_file.file_id not in st.session_state.processed_uploads:
+            # Extract and chunk the PDFs in parallel in the background; indexed documents stay queryable meanwhile
+            queue_upload(uploaded_file, "corpus")
+            st.session_state.processed_uploads.add(uploaded_file.file_id)
+    display_ingestion_status("corpus")
     
     # Display uploaded documents
     if st.session_state.documents:
         st.markdown("### Uploaded Documents:")
-        for doc_name in st.session_state.documents:
-            st.markdown(f"- {doc_name}")
+        for doc_name, doc_info in list(st.session_state.documents.items()):
+            doc_col, remove_col = st.columns([5, 1])
+            doc_col.markdown(f"- {doc_name} ({doc_info['num_chunks']} chunks)")
+            if remove_col.button("Remove", key=f"remove_{doc_name}"):
+                st.session_state.corpus_index.remove_document(doc_name)
+                remove_document_vectors(doc_name)
+                st.session_state.documents.pop(doc_name)["handle"].release()
+                st.rerun()
     
     # Query input
     st.markdown("### Ask a Question")
@@ -424,45 +714,49 @@ def agentic_rag_integration():
     
     if st.button("Submit Question", key="agentic_rag_submit"):
         if query:
-            with st.spinner("Generating response..."):
-                # Combine all document texts
-                all_docs_text = ""
-                for doc_name, doc_info in st.session_state.documents.items():
-                    all_docs_text += f"\n\n--- Document: {doc_name} ---\n{doc_info['text']}"
+            with request_trace("agentic_rag_query"):
+                # Import the GitHub tool here to avoid circular imports
+                from utils.github_tool import GitHubTool
+                from utils.rag_pipeline import fetch_sources, fuse_sources, issue_chunks
+                
+                # Start document retrieval and the issue lookup together, and wait for both up to the deadline
+                github_tool = GitHubTool()
+                sources = {}
+                if len(st.session_state.corpus_index):
+                    retriever = get_corpus_retriever()
+                    sources["documents"] = lambda: retrieve_chunks(retriever, query, config["retrieval_top_k"])
+                sources["github"] = github_tool.search_issues(query)
+                with st.spinner("Retrieving documents and GitHub issues..."):
+                    fetched = get_async_runtime().run(fetch_sources(sources, config["agentic_rag_deadline"]))
+                
+                # Fuse both rankings into one context, packed into the model's budget
+                documents = add_page_citations(fetched["documents"]["results"]) if "documents" in fetched else []
+                fused = fuse_sources({"documents": documents, "github": issue_chunks(fetched["github"]["results"])})
                 
-                # Generate response with RAG
-                if all_docs_text:
-                    response = generate_rag_response(
+                st.markdown("### Response:")
+                packing = None
+                if fused:
+                    context, packing = pack_context(fused, st.session_state.selected_model)
+                    stream = generate_rag_response_stream(
                         f"The user is asking about the GitHub repository: {config['github_repo']} and possibly the uploaded documents. The query is: {query}",
-                        all_docs_text,
+                        context,
                         st.session_state.selected_model
                     )
                 else:
-                    response = generate_response(
+                    stream = generate_response_stream(
                         f"The user is asking about the GitHub repository: {config['github_repo']}. The query is: {query}",
                         st.session_state.selected_model
                     )
-                
-                st.markdown("### Response:")
-                st.markdown(response)
-                
-                # Show GitHub integration (for demonstration)
-                st.markdown("### GitHub Integration:")
-                st.info("This would normally be handled automatically by the agentic LLM, but for demonstration purposes, we're showing the GitHub integration here.")
-                
-                # Import the GitHub tool here to avoid circular imports
-                from utils.github_tool import GitHubTool
-                
-                # Initialize GitHub tool
-                github_tool = GitHubTool()
-                
-                # Use asyncio to run the async method
-                async def run_async():
-                    issues = await github_tool.list_repository_issues()
-                    return issues
-                
-                issues = asyncio.run(run_async())
-                st.json(issues)
+                st.write_stream(stream)
+                display_stream_stats(stream)
+                display_source_timings(fetched)
+                if packing:
+                    display_packing_report(packing)
+                    with st.expander(f"Retrieved context ({len(fused)} chunks)"):
+                        for chunk in fused:
+                            score = f", score: {chunk['source_score']:.2f}" if chunk["source_score"] is not None else ""
+                            st.markdown(f"**{chunk['label']}** ({chunk['source']}{score})")
+                            st.text(chunk["text"])
         else:
             st.warning("Please enter a question.")
     
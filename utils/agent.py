@@ -0,0 +1,190 @@
+"""
+Tool-calling agent loop for the LLM Evolution Explorer application.
+
+The GitHub tool's functions are registered with the model, which decides
+which to call. All function calls of one model turn run concurrently on the
+background event loop, and their results are memoized for the session, so a
+repeated call is answered without another API request. The loop is bounded
+by a number of model turns ("agent_max_steps") and a latency budget
+("agent_time_budget"); when either runs out, the model answers from the tool
+results gathered so far. The final answer is returned as a response stream,
+so the app renders it as it is generated.
+"""
+import asyncio
+import json
+import re
+import time
+from utils.async_runtime import gather_with_timeout
+from utils.config import get_config
+from utils.gemini_api import ResponseStream, generate_rag_response_stream
+from utils.llm_backend import get_llm_backend
+from utils.tracing import get_tracer
+
+def function_name(tool_name):
+    """
+    Get the function name a tool is registered under, e.g. "github_search_issues".
+
+    Args:
+        tool_name (str): The tool name, e.g. "github.search_issues".
+
+    Returns:
+        str: The name with characters function-calling APIs reject replaced by underscores.
+    """
+    return re.sub(r"[^A-Za-z0-9_]", "_", tool_name)
+
+def build_agent_prompt(query, repo_url):
+    """
+    Build the opening message of the agent conversation.
+
+    Args:
+        query (str): The user's question.
+        repo_url (str): The repository being discussed.
+
+    Returns:
+        str: The prompt.
+    """
+    return (
+        f"You are answering questions about the GitHub repository {repo_url}. "
+        "Use the available functions to look up issues and code when they would help, "
+        "and call several functions in the same turn when the calls are independent. "
+        "Base your answer on the function results and cite issue numbers.\n\n"
+        f"Question: {query}"
+    )
+
+def format_tool_results(steps):
+    """
+    Format the tool calls of an agent run as context for a final answer.
+
+    Args:
+        steps (list): The "steps" of an agent run.
+
+    Returns:
+        str: One block per tool call.
+    """
+    blocks = []
+    for step in steps:
+        for call in step["calls"]:
+            blocks.append(f"{call['name']}({json.dumps(call['args'], default=str)}):\n"
+                          f"{json.dumps(call['result'], default=str)}")
+    return "\n\n".join(blocks)
+
+def _result_for_model(result, max_chars):
+    text = json.dumps(result, default=str)
+    if len(text) > max_chars:
+        return text[:max_chars] + " ... [truncated]"
+    return result
+
+async def run_agent(query, github_tool, model_name=None, memo=None, max_steps=None, time_budget=None):
+    """
+    Answer a question with a tool-calling agent loop.
+
+    Must be awaited on the app's background event loop (utils.async_runtime),
+    which also owns the session's memoized tool calls.
+
+    Args:
+        query (str): The user's question.
+        github_tool (GitHubTool): The tool whose functions the model may call.
+        model_name (str, optional): The model to use. Defaults to None, which uses the default model.
+        memo (dict, optional): Memoized tool results, kept across calls for a
+            session. Defaults to None, which memoizes within this run only.
+        max_steps (int, optional): Maximum number of model turns. Defaults to
+            None, which uses the "agent_max_steps" setting.
+        time_budget (float, optional): Seconds the model turns and tool calls
+            may take before the final answer. Defaults to None, which uses the
+            "agent_time_budget" setting.
+
+    Returns:
+        dict: "stream" (a ResponseStream over the answer, consumed by the caller;
+        a stream over the tool results is only generated while it is iterated), "steps" (per model turn: "step", "model_ms"
+        and its "calls", each with "name", "args", "result", "cached" and
+        "duration_ms"), "tools" (the registered tools), "stop_reason"
+        ("answered", "max_steps", "time_budget" or "error") and "elapsed" (seconds).
+    """
+    config = get_config()
+    model_name = model_name or config["default_model"]
+    max_steps = max_steps or config["agent_max_steps"]
+    time_budget = time_budget or config["agent_time_budget"]
+    memo = {} if memo is None else memo
+    backend = get_llm_backend()
+    tracer = get_tracer()
+    start = time.perf_counter()
+
+    tools = await github_tool.discover_available_tools()
+    tool_names = {function_name(tool["name"]): tool["name"] for tool in tools}
+    declarations = [dict(tool, name=function_name(tool["name"])) for tool in tools]
+
+    async def call_tool(call):
+        tool_name = tool_names.get(call["name"], call["name"])
+        key = json.dumps([github_tool.repo_url, tool_name, call["args"]], sort_keys=True, default=str)
+        entry = memo.get(key)
+        cached = entry is not None
+        call_start = time.perf_counter()
+        if entry is None:
+            # Memoize the task itself, so identical calls in flight share one request
+            entry = memo[key] = asyncio.ensure_future(github_tool.call_tool(tool_name, call["args"]))
+
+            def settle(task):
+                # Keep successful results only; error strings and cancellations are retried next time
+                result = None if task.cancelled() or task.exception() else task.result()
+                if isinstance(result, (list, dict)):
+                    memo[key] = result
+                else:
+                    memo.pop(key, None)
+            entry.add_done_callback(settle)
+        # A timed-out caller mustn't cancel a task other callers share
+        result = await asyncio.shield(entry) if isinstance(entry, asyncio.Future) else entry
+        return {"name": tool_name, "args": call["args"], "result": result, "cached": cached,
+                "duration_ms": (time.perf_counter() - call_start) * 1000}
+
+    def finish(stream, stop_reason):
+        return {"stream": stream, "steps": steps, "tools": tools, "stop_reason": stop_reason,
+                "elapsed": time.perf_counter() - start}
+
+    messages = [{"role": "user", "text": build_agent_prompt(query, github_tool.repo_url)}]
+    steps = []
+    stop_reason = "max_steps"
+    for step in range(1, max_steps + 1):
+        remaining = time_budget - (time.perf_counter() - start)
+        if remaining <= 0:
+            stop_reason = "time_budget"
+            break
+
+        model_start = time.perf_counter()
+        try:
+            with tracer.span("agent_model_call", model=model_name, step=step):
+                reply = await asyncio.wait_for(
+                    asyncio.to_thread(backend.chat, model_name, messages, declarations), remaining
+                )
+        except asyncio.TimeoutError:
+            stop_reason = "time_budget"
+            break
+        except Exception as e:
+            print(f"Error in agent step {step}: {str(e)}")
+            return finish(ResponseStream(iter([f"Error generating agent response: {str(e)}. Please try a different model or check your API key."])), "error")
+        model_ms = (time.perf_counter() - model_start) * 1000
+
+        messages.append({"role": "model", "text": reply["text"], "function_calls": reply["function_calls"]})
+        if not reply["function_calls"]:
+            steps.append({"step": step, "model_ms": model_ms, "calls": []})
+            return finish(ResponseStream(iter([reply["text"]])), "answered")
+
+        # Run all of the turn's function calls concurrently, within what is left of the budget
+        calls = reply["function_calls"]
+        timeout = max(0.001, min(config["tool_call_timeout"], time_budget - (time.perf_counter() - start)))
+        outcomes = await gather_with_timeout(*(call_tool(call) for call in calls), timeout=timeout)
+        records = []
+        for call, outcome in zip(calls, outcomes):
+            if isinstance(outcome, str):
+                # The call timed out or failed
+                outcome = {"name": tool_names.get(call["name"], call["name"]), "args": call["args"],
+                           "result": outcome, "cached": False, "duration_ms": timeout * 1000}
+            records.append(outcome)
+        steps.append({"step": step, "model_ms": model_ms, "calls": records})
+        messages.append({"role": "tool", "results": [
+            {"name": call["name"], "response": _result_for_model(record["result"], config["agent_max_result_chars"])}
+            for call, record in zip(calls, records)
+        ]})
+
+    # Out of steps or time: answer from the tool results gathered so far. The stream is
+    # consumed by the caller, so generation doesn't block the event loop
+    return finish(generate_rag_response_stream(query, format_tool_results(steps), model_name), stop_reason)
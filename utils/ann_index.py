@@ -0,0 +1,670 @@
+"""
+Approximate nearest-neighbour (IVF) indexes for dense retrieval.
+
+IVFIndex indexes a single vector store. The app uses LibraryIndex, one IVF
+index over the stores of every document, which sessions search through
+LibraryDocument and LibraryCorpus.
+"""
+import argparse
+import heapq
+import os
+import shutil
+import threading
+import time
+import weakref
+import numpy as np
+from utils.config import get_config
+from utils.vector_store import VectorCorpus, VectorStore, get_embedder, top_k_rows
+
+def spherical_kmeans(vectors, num_clusters, iterations=10, seed=0):
+    """
+    Cluster unit-norm vectors with spherical k-means.
+
+    Args:
+        vectors (np.ndarray): Unit-norm float32 matrix of shape (n, dim).
+        num_clusters (int): Number of clusters.
+        iterations (int, optional): Number of Lloyd iterations. Defaults to 10.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        np.ndarray: Unit-norm centroid matrix of shape (num_clusters, dim).
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), num_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        # Re-seed empty clusters with random points
+        empty = np.flatnonzero(~sums.any(axis=1))
+        if len(empty):
+            sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over the vectors of a VectorStore.
+
+    Vectors are clustered with spherical k-means; each row id is filed under
+    its nearest centroid. A query only scores the rows of its nprobe nearest
+    lists, so nprobe trades recall for latency (nprobe == num_lists is exact).
+    New rows are assigned to the existing centroids as they are added, and the
+    centroids are retrained once the store has grown retrain_growth times past
+    the size they were trained on. Stores smaller than min_train_size are
+    searched exactly. The index is saved as ivf.npz next to the store.
+    """
+    def __init__(self, store, num_lists=None, nprobe=8, min_train_size=1024,
+                 kmeans_iterations=10, retrain_growth=4.0):
+        self.store = store
+        self.num_lists = num_lists
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.kmeans_iterations = kmeans_iterations
+        self.retrain_growth = retrain_growth
+        self.centroids = None
+        self.lists = []
+        self.trained_count = 0
+        self.indexed_count = 0
+        self._lock = threading.Lock()
+        self._load()
+        self.sync()
+
+    @property
+    def chunks(self):
+        return self.store.chunks
+
+    def __len__(self):
+        return len(self.store)
+
+    def _path(self):
+        return os.path.join(self.store.directory, "ivf.npz")
+
+    def _load(self):
+        if not os.path.exists(self._path()):
+            return
+        data = np.load(self._path())
+        offsets = data["list_offsets"]
+        self.centroids = data["centroids"]
+        self.lists = [data["list_ids"][offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+        self.trained_count = int(data["trained_count"])
+        self.indexed_count = int(data["indexed_count"])
+
+    def save(self):
+        """Persist the centroids and inverted lists."""
+        if self.centroids is None:
+            return
+        sizes = [len(ids) for ids in self.lists]
+        # A private temporary file, so processes saving the same index never write into each other's
+        tmp_path = f"{self._path()}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            centroids=self.centroids,
+            list_ids=np.concatenate(self.lists) if self.lists else np.empty(0, dtype=np.int64),
+            list_offsets=np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+            trained_count=self.trained_count,
+            indexed_count=self.indexed_count
+        )
+        os.replace(tmp_path, self._path())
+
+    def train(self):
+        """Cluster the store's vectors and rebuild the inverted lists from scratch."""
+        vectors = self.store.vectors()
+        # k-means can't find more clusters than there are vectors
+        num_lists = min(self.num_lists or max(1, int(4 * np.sqrt(len(vectors)))), len(vectors))
+        # Train on a sample; k-means cost doesn't need to grow with the corpus
+        sample_size = min(len(vectors), 256 * num_lists)
+        sample = vectors[np.random.default_rng(0).choice(len(vectors), sample_size, replace=False)]
+        self.centroids = spherical_kmeans(np.asarray(sample), num_lists, self.kmeans_iterations)
+        self.lists = [np.empty(0, dtype=np.int64) for _ in range(num_lists)]
+        self.trained_count = len(vectors)
+        self.indexed_count = 0
+        self._assign(0, len(vectors))
+
+    def _assign(self, start, end, batch_size=65536):
+        vectors = self.store.vectors()
+        for batch_start in range(start, end, batch_size):
+            batch_end = min(end, batch_start + batch_size)
+            assignments = np.argmax(np.asarray(vectors[batch_start:batch_end]) @ self.centroids.T, axis=1)
+            order = np.argsort(assignments, kind="stable")
+            ids = np.arange(batch_start, batch_end, dtype=np.int64)[order]
+            boundaries = np.searchsorted(assignments[order], np.arange(len(self.centroids) + 1))
+            for list_id in range(len(self.centroids)):
+                new_ids = ids[boundaries[list_id]:boundaries[list_id + 1]]
+                if len(new_ids):
+                    self.lists[list_id] = np.concatenate([self.lists[list_id], new_ids])
+        self.indexed_count = end
+
+    def sync(self):
+        """
+        Index rows added to the store since the last sync.
+
+        Trains the index once the store is large enough, assigns new rows to
+        their nearest lists, and retrains when the store has outgrown the
+        centroids.
+        """
+        with self._lock:
+            count = len(self.store)
+            if count == self.indexed_count:
+                return
+            if count < self.min_train_size:
+                return
+            if self.centroids is None or count > self.retrain_growth * self.trained_count:
+                self.train()
+            else:
+                self._assign(self.indexed_count, count)
+            self.save()
+
+    def add(self, texts):
+        """
+        Embed and add texts to the store, then index them.
+
+        Args:
+            texts (list): The chunk texts to add.
+
+        Returns:
+            list: The row ids assigned to the texts.
+        """
+        ids = self.store.add(texts)
+        self.sync()
+        return ids
+
+    def search_vectors(self, query_vectors, top_k=5, nprobe=None):
+        """
+        Approximate cosine top-k search for a batch of query embeddings.
+
+        Args:
+            query_vectors (np.ndarray): Unit-norm query matrix of shape (num_queries, dim).
+            top_k (int, optional): Number of results per query. Defaults to 5.
+            nprobe (int, optional): Number of lists to scan. Defaults to the index's nprobe.
+
+        Returns:
+            tuple: Row id and score matrices of shape (num_queries, k), best first.
+            Rows with fewer than k candidates are padded with id -1.
+        """
+        if self.centroids is None or self.indexed_count < len(self.store):
+            self.sync()
+        if self.centroids is None:
+            return self.store.search_vectors(query_vectors, top_k)
+
+        vectors = self.store.vectors()
+        probes, _ = top_k_rows(query_vectors @ self.centroids.T, nprobe or self.nprobe)
+        ids = np.full((len(query_vectors), top_k), -1, dtype=np.int64)
+        scores = np.full((len(query_vectors), top_k), -np.inf, dtype=np.float32)
+        for row, query_vector in enumerate(query_vectors):
+            # Sorted ids keep reads from the memory map sequential
+            candidates = np.sort(np.concatenate([self.lists[list_id] for list_id in probes[row]]))
+            if not len(candidates):
+                continue
+            candidate_scores = vectors[candidates] @ query_vector
+            order, values = top_k_rows(candidate_scores[None, :], top_k)
+            ids[row, :order.shape[1]] = candidates[order[0]]
+            scores[row, :order.shape[1]] = values[0]
+        return ids, scores
+
+    def search(self, query, top_k=5, nprobe=None):
+        """
+        Search the index for the chunks most similar to a query.
+
+        Args:
+            query (str): The query text.
+            top_k (int, optional): Number of results. Defaults to 5.
+            nprobe (int, optional): Number of lists to scan. Defaults to the index's nprobe.
+
+        Returns:
+            list: List of result dicts with "chunk_id", "score" and "text", best match first.
+        """
+        if not len(self.store):
+            return []
+        ids, scores = self.search_vectors(self.store.embedder.encode([query]), top_k, nprobe)
+        return [
+            {"chunk_id": int(chunk_id), "score": float(score), "text": self.store.chunks[chunk_id]}
+            for chunk_id, score in zip(ids[0], scores[0]) if chunk_id >= 0
+        ]
+
+    def leading_chunks(self, top_k=5):
+        """
+        Get the first chunks of the store.
+
+        Args:
+            top_k (int, optional): Number of chunks to return. Defaults to 5.
+
+        Returns:
+            list: List of result dicts with "chunk_id", "score" and "text".
+        """
+        return self.store.leading_chunks(top_k)
+
+# Open indexes by store directory, shared by every session while any of them holds one
+_indexes = weakref.WeakValueDictionary()
+_open_locks = {}
+_open_locks_guard = threading.Lock()
+
+def _open_lock(directory):
+    with _open_locks_guard:
+        return _open_locks.setdefault(directory, threading.Lock())
+
+def open_ann_index(store):
+    """
+    Open (or build) the IVF index of a vector store with the configured knobs.
+
+    Sessions opening the same store share one index, so it is trained and
+    saved once; a per-directory lock makes later callers wait for the first
+    to finish loading or training it.
+
+    Args:
+        store (VectorStore): The vector store to index.
+
+    Returns:
+        IVFIndex: The ANN index.
+    """
+    config = get_config()
+    with _open_lock(store.directory):
+        index = _indexes.get(store.directory)
+        if index is None or index.store is not store:
+            # Not open yet, or the store has been rebuilt since
+            index = IVFIndex(
+                store,
+                num_lists=config["ann_num_lists"],
+                nprobe=config["ann_nprobe"],
+                min_train_size=config["ann_min_train_size"],
+                kmeans_iterations=config["ann_kmeans_iterations"]
+            )
+            _indexes[store.directory] = index
+    return index
+
+# Postings of the library index pack a document slot and a row id into one int64
+ROW_BITS = 32
+ROW_MASK = (1 << ROW_BITS) - 1
+
+class LibraryIndex:
+    """
+    One IVF index over the vector stores of every document, shared by all sessions.
+
+    Documents are inserted incrementally: their rows are filed under the
+    nearest existing centroids, and each posting records the document it came
+    from, so results keep their provenance. The centroids are trained once the
+    library holds min_train_size rows and retrained when it has grown
+    retrain_growth times past that. A query probes its nearest lists once for
+    the whole library and keeps the candidates of the documents being searched,
+    so its cost grows with the probed lists rather than with the number of
+    documents. The index is saved as library_ivf.npz next to the vector stores.
+    """
+    def __init__(self, path, num_lists=None, nprobe=8, min_train_size=1024,
+                 kmeans_iterations=10, retrain_growth=4.0):
+        self.path = path
+        self.num_lists = num_lists
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.kmeans_iterations = kmeans_iterations
+        self.retrain_growth = retrain_growth
+        # store key -> {"slot", "count"}; slots index self.keys
+        self.documents = {}
+        self.keys = []
+        self.centroids = None
+        self.lists = []
+        self.trained_count = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self):
+        return sum(document["count"] for document in self.documents.values())
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            data = np.load(self.path)
+            self.keys = [str(key) for key in data["keys"]]
+            self.documents = {key: {"slot": slot, "count": int(count)}
+                              for slot, (key, count) in enumerate(zip(self.keys, data["counts"]))}
+            if len(data["centroids"]):
+                offsets = data["list_offsets"]
+                self.centroids = data["centroids"]
+                self.lists = [data["postings"][offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+                self.trained_count = int(data["trained_count"])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading library index, rebuilding it: {str(e)}")
+            self.documents, self.keys, self.centroids, self.lists, self.trained_count = {}, [], None, [], 0
+
+    def save(self):
+        """Persist the documents, centroids and inverted lists. Must hold the lock."""
+        sizes = [len(postings) for postings in self.lists]
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # A private temporary file, so processes saving the library never write into each other's
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            keys=np.array(self.keys, dtype=str),
+            counts=np.array([self.documents[key]["count"] for key in self.keys], dtype=np.int64),
+            centroids=self.centroids if self.centroids is not None else np.empty((0, 0), dtype=np.float32),
+            postings=np.concatenate(self.lists) if self.lists else np.empty(0, dtype=np.int64),
+            list_offsets=np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+            trained_count=self.trained_count
+        )
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _key(store):
+        return os.path.basename(store.directory)
+
+    def add_document(self, store):
+        """
+        Insert a document's vectors, unless it is already indexed.
+
+        Args:
+            store (VectorStore): The document's vector store.
+        """
+        key = self._key(store)
+        with self._lock:
+            document = self.documents.get(key)
+            changed = document is None or document["count"] != len(store)
+            if document is None:
+                document = self.documents[key] = {"slot": len(self.keys), "count": 0}
+                self.keys.append(key)
+            elif changed and self.centroids is not None:
+                # The store was rebuilt: drop its old postings
+                self.lists = [postings[(postings >> ROW_BITS) != document["slot"]] for postings in self.lists]
+            document["count"] = len(store)
+
+            total = len(self)
+            if total >= self.min_train_size and (self.centroids is None or total > self.retrain_growth * self.trained_count):
+                self._train()
+            elif not changed:
+                return
+            elif self.centroids is not None:
+                self._assign(document["slot"], store)
+            self.save()
+
+    def _open_stores(self):
+        """Open the stores of all indexed documents, forgetting those that no longer exist. Must hold the lock."""
+        from utils.vector_store import open_existing_vector_store
+        stores = {}
+        for key in list(self.keys):
+            store = open_existing_vector_store(key)
+            if store is None or len(store) != self.documents[key]["count"]:
+                continue
+            stores[key] = store
+        if len(stores) != len(self.keys):
+            # Renumber the slots of the documents that are left
+            self.keys = list(stores)
+            self.documents = {key: {"slot": slot, "count": len(stores[key])} for slot, key in enumerate(self.keys)}
+        return stores
+
+    def _train(self):
+        """Cluster a sample of the library and rebuild the inverted lists. Must hold the lock."""
+        stores = self._open_stores()
+        counts = [len(stores[key]) for key in self.keys]
+        total = sum(counts)
+        num_lists = min(self.num_lists or max(1, int(4 * np.sqrt(total))), total)
+        # Train on a sample; k-means cost doesn't need to grow with the library
+        sample_ids = np.sort(np.random.default_rng(0).choice(total, min(total, 256 * num_lists), replace=False))
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        sample = []
+        for slot, key in enumerate(self.keys):
+            rows = sample_ids[(sample_ids >= offsets[slot]) & (sample_ids < offsets[slot + 1])] - offsets[slot]
+            if len(rows):
+                sample.append(np.asarray(stores[key].vectors()[rows]))
+        self.centroids = spherical_kmeans(np.concatenate(sample), num_lists, self.kmeans_iterations)
+        self.lists = [np.empty(0, dtype=np.int64) for _ in range(num_lists)]
+        self.trained_count = total
+        for slot, key in enumerate(self.keys):
+            self._assign(slot, stores[key])
+
+    def _assign(self, slot, store, batch_size=65536):
+        """File a document's rows under their nearest centroids. Must hold the lock."""
+        vectors = store.vectors()
+        for batch_start in range(0, len(vectors), batch_size):
+            batch_end = min(len(vectors), batch_start + batch_size)
+            assignments = np.argmax(np.asarray(vectors[batch_start:batch_end]) @ self.centroids.T, axis=1)
+            order = np.argsort(assignments, kind="stable")
+            postings = (np.int64(slot) << ROW_BITS) | np.arange(batch_start, batch_end, dtype=np.int64)[order]
+            boundaries = np.searchsorted(assignments[order], np.arange(len(self.centroids) + 1))
+            for list_id in range(len(self.centroids)):
+                new_postings = postings[boundaries[list_id]:boundaries[list_id + 1]]
+                if len(new_postings):
+                    self.lists[list_id] = np.concatenate([self.lists[list_id], new_postings])
+
+    def search_vectors(self, query_vector, stores, top_k=5, nprobe=None):
+        """
+        Approximate cosine top-k search over some of the library's documents.
+
+        The probed lists are widened in proportion to the share of the library
+        being searched, to keep recall. When that would scan as many rows as
+        the documents hold (or the index isn't trained yet), they are searched
+        exactly instead.
+
+        Args:
+            query_vector (np.ndarray): Unit-norm query vector of shape (dim,).
+            stores (list): VectorStores of the documents to search, already added.
+            top_k (int, optional): Number of results. Defaults to 5.
+            nprobe (int, optional): Number of lists to scan for the whole
+                library. Defaults to the index's nprobe.
+
+        Returns:
+            list: (store, row id, score) tuples, best first.
+        """
+        with self._lock:
+            centroids, lists, total = self.centroids, list(self.lists), len(self)
+            slots = {self.documents[self._key(store)]["slot"]: store for store in stores
+                     if self._key(store) in self.documents}
+        rows = sum(len(store) for store in stores)
+        results = []
+        if centroids is not None and rows and len(slots) == len(stores):
+            probes = min(len(centroids), int(np.ceil((nprobe or self.nprobe) * total / rows)))
+            if probes * total / len(centroids) < rows:
+                (lists_to_scan,), _ = top_k_rows((query_vector @ centroids.T)[None, :], probes)
+                postings = np.concatenate([lists[list_id] for list_id in lists_to_scan])
+                postings = postings[np.isin(postings >> ROW_BITS, list(slots))]
+                for slot in np.unique(postings >> ROW_BITS):
+                    # Sorted ids keep reads from the memory map sequential
+                    row_ids = np.sort(postings[(postings >> ROW_BITS) == slot] & ROW_MASK)
+                    store = slots[int(slot)]
+                    results.extend(zip([store] * len(row_ids), row_ids, store.vectors()[row_ids] @ query_vector))
+                return heapq.nlargest(top_k, results, key=lambda result: result[2])
+
+        for store in stores:
+            ids, scores = store.search_vectors(query_vector[None, :], top_k)
+            results.extend((store, chunk_id, score) for chunk_id, score in zip(ids[0], scores[0]))
+        return heapq.nlargest(top_k, results, key=lambda result: result[2])
+
+class LibraryDocument:
+    """
+    Approximate search over one document of the library index, with the
+    search interface of a VectorStore.
+    """
+    def __init__(self, library, store):
+        self.library = library
+        self.store = store
+        library.add_document(store)
+
+    @property
+    def chunks(self):
+        return self.store.chunks
+
+    def __len__(self):
+        return len(self.store)
+
+    def search(self, query, top_k=5):
+        """
+        Search the document for the chunks most similar to a query.
+
+        Args:
+            query (str): The query text.
+            top_k (int, optional): Number of results. Defaults to 5.
+
+        Returns:
+            list: List of result dicts with "chunk_id", "score" and "text", best match first.
+        """
+        if not len(self.store):
+            return []
+        query_vector = self.store.embedder.encode([query])[0]
+        return [
+            {"chunk_id": int(chunk_id), "score": float(score), "text": self.store.chunks[chunk_id]}
+            for _, chunk_id, score in self.library.search_vectors(query_vector, [self.store], top_k)
+        ]
+
+    def leading_chunks(self, top_k=5):
+        """
+        Get the first chunks of the document.
+
+        Args:
+            top_k (int, optional): Number of chunks to return. Defaults to 5.
+
+        Returns:
+            list: List of result dicts with "chunk_id", "score" and "text".
+        """
+        return self.store.leading_chunks(top_k)
+
+class LibraryCorpus(VectorCorpus):
+    """
+    Approximate search over a session's documents through the library index.
+
+    Documents are added and removed like in VectorCorpus, but a query probes
+    the shared library index once instead of scanning every document's store.
+    """
+    def __init__(self, library):
+        super().__init__()
+        self.library = library
+
+    def add_document(self, doc_id, store):
+        """
+        Add a document's vector store, inserting it into the library index if needed.
+
+        Args:
+            doc_id (str): Document identifier, e.g. the file name.
+            store (VectorStore): The document's vector store.
+        """
+        self.library.add_document(store)
+        super().add_document(doc_id, store)
+
+    def search(self, query, top_k=5):
+        """
+        Search all documents for the chunks most similar to a query.
+
+        Args:
+            query (str): The query text.
+            top_k (int, optional): Number of results. Defaults to 5.
+
+        Returns:
+            list: List of result dicts with "chunk_id", "score", "text",
+            "document", "position" and "label", best match first.
+        """
+        if not self.documents:
+            return []
+        doc_ids = {id(store): doc_id for doc_id, store in self.documents.items()}
+        query_vector = get_embedder().encode([query])[0]
+        results = []
+        for store, chunk_id, score in self.library.search_vectors(query_vector, list(self.documents.values()), top_k):
+            results.extend(self._with_provenance(doc_ids[id(store)], [
+                {"chunk_id": int(chunk_id), "score": float(score), "text": store.chunks[chunk_id]}
+            ]))
+        return results
+
+_library = None
+_library_lock = threading.Lock()
+
+def get_library_index():
+    """
+    Get the process-wide library index for the configured embedder, creating it on first use.
+
+    Returns:
+        LibraryIndex: The library index.
+    """
+    global _library
+    with _library_lock:
+        if _library is None:
+            config = get_config()
+            _library = LibraryIndex(
+                os.path.join(config["temp_folder"], "vector_stores", get_embedder().name, "library_ivf.npz"),
+                num_lists=config["ann_num_lists"],
+                nprobe=config["ann_nprobe"],
+                min_train_size=config["ann_min_train_size"],
+                kmeans_iterations=config["ann_kmeans_iterations"]
+            )
+        return _library
+
+
+def recall_report(index, query_vectors, top_k=10, nprobes=(1, 2, 4, 8, 16, 32, 64, 128)):
+    """
+    Measure recall@k and latency of an IVF index against exact search.
+
+    Args:
+        index (IVFIndex): A trained index.
+        query_vectors (np.ndarray): Unit-norm query matrix.
+        top_k (int, optional): The k of recall@k. Defaults to 10.
+        nprobes (tuple, optional): nprobe values to measure.
+
+    Returns:
+        list: One dict per setting with "nprobe" ("exact" for the baseline),
+        "recall", "mean_ms" and "p95_ms" (per query).
+    """
+    def timed(search):
+        latencies = []
+        ids = []
+        for query_vector in query_vectors:
+            start = time.perf_counter()
+            row_ids, _ = search(query_vector[None, :])
+            latencies.append((time.perf_counter() - start) * 1000)
+            ids.append(row_ids[0])
+        return ids, latencies
+
+    exact_ids, exact_latencies = timed(lambda q: index.store.search_vectors(q, top_k))
+    rows = [{"nprobe": "exact", "recall": 1.0,
+             "mean_ms": float(np.mean(exact_latencies)), "p95_ms": float(np.percentile(exact_latencies, 95))}]
+    for nprobe in nprobes:
+        if index.centroids is None or nprobe > len(index.centroids):
+            break
+        ann_ids, latencies = timed(lambda q: index.search_vectors(q, top_k, nprobe))
+        recall = np.mean([
+            len(set(exact.tolist()) & set(ann.tolist())) / len(exact)
+            for exact, ann in zip(exact_ids, ann_ids)
+        ])
+        rows.append({"nprobe": nprobe, "recall": float(recall),
+                     "mean_ms": float(np.mean(latencies)), "p95_ms": float(np.percentile(latencies, 95))})
+    return rows
+
+def _synthetic_vectors(count, dim, num_topics=256, seed=0):
+    """Generate clustered unit vectors that mimic the topical structure of real chunks."""
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((num_topics, dim)).astype(np.float32)
+    vectors = topics[rng.integers(num_topics, size=count)] + 0.8 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def main():
+    """Print a recall@k vs. latency report for a PDF or a synthetic corpus."""
+    parser = argparse.ArgumentParser(description="IVF recall@k vs. latency report against exact search.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--pdf", help="PDF file to chunk, embed and index")
+    source.add_argument("--synthetic", type=int, help="Number of synthetic clustered vectors to index")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--num-lists", type=int, default=None)
+    args = parser.parse_args()
+
+    config = get_config()
+    embedder = get_embedder()
+    if args.pdf:
+        from utils.document_processor import process_pdf
+        from utils.vector_store import open_vector_store
+        document = process_pdf(args.pdf, config["chunk_size"], config["chunk_overlap"])
+        store = open_vector_store(f"{document['hash']}_{config['chunk_size']}_{config['chunk_overlap']}", document["chunks"])
+        rng = np.random.default_rng(1)
+        sample = rng.choice(len(store), min(args.queries, len(store)), replace=False)
+        query_vectors = embedder.encode([" ".join(store.chunks[i].split()[:12]) for i in sample])
+    else:
+        directory = os.path.join(config["temp_folder"], "vector_stores", "synthetic", f"{args.synthetic}_{embedder.dim}")
+        shutil.rmtree(directory, ignore_errors=True)
+        store = VectorStore(directory, embedder)
+        store.add_vectors(_synthetic_vectors(args.synthetic, embedder.dim), [""] * args.synthetic)
+        query_vectors = _synthetic_vectors(args.queries, embedder.dim, seed=1)
+
+    index = IVFIndex(store, num_lists=args.num_lists, min_train_size=1)
+    print(f"Corpus: {len(store)} vectors, {len(index.centroids)} lists, top_k={args.top_k}")
+    print(f"{'nprobe':>8} {'recall@k':>9} {'mean ms':>9} {'p95 ms':>9}")
+    for row in recall_report(index, query_vectors, args.top_k):
+        print(f"{row['nprobe']:>8} {row['recall']:>9.3f} {row['mean_ms']:>9.2f} {row['p95_ms']:>9.2f}")
+
+if __name__ == "__main__":
+    main()
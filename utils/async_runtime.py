@@ -0,0 +1,131 @@
+"""
+Long-lived background event loop for the LLM Evolution Explorer application.
+
+Streamlit runs the app script synchronously, so async tool calls used to go
+through asyncio.run(), which creates and closes an event loop per call. The
+runtime instead keeps one loop running on a daemon thread for the whole
+process. Coroutines are submitted to it from any thread, and the caller's
+context variables (e.g. the current trace) carry over into them.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import get_config
+
+class AsyncRuntime:
+    """
+    An event loop running forever on a background thread.
+
+    Blocking calls offloaded with asyncio.to_thread (e.g. GitHub requests) run
+    on the loop's own executor, sized so that fanned-out calls aren't limited
+    to the default pool of a few threads.
+    """
+    def __init__(self, name="async-runtime", max_workers=32):
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        self.loop.set_default_executor(self.executor)
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=name)
+        self._thread.start()
+        self._started.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._started.set)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the loop without waiting for it.
+
+        Args:
+            coro (coroutine): The coroutine to run.
+
+        Returns:
+            concurrent.futures.Future: Future for the coroutine's result.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """
+        Run a coroutine on the loop and wait for its result.
+
+        Args:
+            coro (coroutine): The coroutine to run.
+            timeout (float, optional): Seconds to wait before cancelling it. Defaults to None.
+
+        Returns:
+            The coroutine's result.
+        """
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self):
+        """Stop the loop and wait for its thread to exit."""
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+        self.loop.close()
+        self.executor.shutdown(wait=False)
+
+async def gather_with_timeout(*aws, timeout=None):
+    """
+    Await several calls concurrently, each with its own timeout.
+
+    A call that times out or raises doesn't cancel the others; its result is
+    an error message string instead, like the tool methods' own errors.
+
+    Args:
+        *aws (awaitable): The calls.
+        timeout (float, optional): Seconds allowed per call. Defaults to None,
+            which uses the "tool_call_timeout" setting.
+
+    Returns:
+        list: The results, in the order of the calls.
+    """
+    if timeout is None:
+        timeout = get_config()["tool_call_timeout"]
+
+    async def guarded(aw):
+        try:
+            return await asyncio.wait_for(aw, timeout)
+        except asyncio.TimeoutError:
+            return f"Timed out after {timeout:.3g}s"
+        except Exception as e:
+            print(f"Error in concurrent call: {str(e)}")
+            return f"Error: {str(e)}"
+
+    return await asyncio.gather(*(guarded(aw) for aw in aws))
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+def get_async_runtime():
+    """
+    Get the process-wide async runtime, starting it on first use.
+
+    Returns:
+        AsyncRuntime: The runtime.
+    """
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AsyncRuntime(max_workers=get_config()["async_runtime_workers"])
+        return _runtime
+
+def run_async(coro, timeout=None):
+    """
+    Run a coroutine on the process-wide runtime and wait for its result.
+
+    Args:
+        coro (coroutine): The coroutine to run.
+        timeout (float, optional): Seconds to wait before cancelling it. Defaults to None.
+
+    Returns:
+        The coroutine's result.
+    """
+    return get_async_runtime().run(coro, timeout)
@@ -0,0 +1,412 @@
+"""
+Offline benchmark suite for the ingestion, retrieval and generation pipeline.
+
+Every stage runs locally: documents are synthetic PDFs and generation goes
+through a stub model with configurable latency, so no network access or API
+key is needed. Results can be saved as JSON and compared with a baseline:
+
+    python -m utils.benchmark --output baseline.json
+    python -m utils.benchmark --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import get_config
+
+STAGES = ["extract", "chunk", "index", "retrieve", "prompt", "generate", "github"]
+# Metrics where a larger value is a regression
+HIGHER_IS_WORSE = {"p50_ms": True, "p95_ms": True, "peak_rss_mb": True, "throughput": False}
+
+WORDS = (
+    "model token context retrieval index chunk vector stream cache latency "
+    "gemini prompt document page query answer agent tool issue repository "
+    "embedding score budget batch request response pipeline memory"
+).split()
+
+def _pdf_string(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_synthetic_pdf(path, num_pages, lines_per_page=40, paragraph_lines=8, seed=0):
+    """
+    Write a text-only PDF with random words, for extraction benchmarks.
+
+    Args:
+        path (str): Path of the PDF file to write.
+        num_pages (int): Number of pages.
+        lines_per_page (int, optional): Lines of text per page. Defaults to 40.
+        paragraph_lines (int, optional): Lines per paragraph. Defaults to 8.
+        seed (int, optional): Random seed. Defaults to 0.
+    """
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(num_pages):
+        operators = ["BT /F1 10 Tf 50 780 Td 12 TL"]
+        for line in range(lines_per_page):
+            if line and line % paragraph_lines == 0:
+                operators.append("T*")
+            words = " ".join(rng.choice(WORDS) for _ in range(12))
+            operators.append(f"({_pdf_string(f'{page + 1}.{line + 1} {words}')}) '")
+        operators.append("ET")
+        content = "\n".join(operators).encode()
+        page_ids.append(len(objects) + 1)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects) + 2} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {num_pages} >>".encode()
+
+    parts = [b"%PDF-1.4\n"]
+    offsets = []
+    size = len(parts[0])
+    for number, body in enumerate(objects, start=1):
+        offsets.append(size)
+        part = f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+        parts.append(part)
+        size += len(part)
+    xref = [f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"]
+    xref.extend(f"{offset:010d} 00000 n \n" for offset in offsets)
+    xref.append(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{size}\n%%EOF\n")
+    parts.append("".join(xref).encode())
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"".join(parts))
+
+class StubModel:
+    """
+    Stand-in for a Gemini model with configurable latency.
+
+    Can be passed as the call_model of a GenerationClient.
+    """
+    def __init__(self, latency=0.05, jitter=0.0, stream_chunks=8, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.stream_chunks = stream_chunks
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay(self):
+        with self._lock:
+            return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    def _stream(self, text, delay):
+        words = text.split(" ")
+        step = max(1, len(words) // self.stream_chunks)
+        for i in range(0, len(words), step):
+            time.sleep(delay / self.stream_chunks)
+            yield " ".join(words[i:i + step]) + " "
+
+    def __call__(self, model_name, prompt, stream=False):
+        delay = self._delay()
+        text = f"Stub answer from {model_name} to a {len(prompt)}-character prompt. " + " ".join(WORDS)
+        if stream:
+            return self._stream(text, delay)
+        time.sleep(delay)
+        return text
+
+class _RSSSampler:
+    """
+    Samples the resident set size of this process in a background thread.
+
+    Uses /proc/self/statm where available; elsewhere it falls back to the
+    process-wide high-water mark from getrusage. Memory used by the
+    extraction process pool's workers is not included.
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current_bytes():
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            import resource
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+            return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, self.current_bytes())
+
+    def __enter__(self):
+        self.peak_bytes = self.current_bytes()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self.current_bytes())
+
+def percentile(samples, p):
+    """
+    Get a percentile of a list of samples (nearest rank).
+
+    Args:
+        samples (list): The samples.
+        p (float): Percentile between 0 and 100.
+
+    Returns:
+        float: The percentile, or 0.0 if there are no samples.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+def run_stage(name, operation, inputs, unit, items_per_input=1, concurrency=1, warmup=0):
+    """
+    Time an operation over a list of inputs.
+
+    Args:
+        name (str): Stage name.
+        operation (callable): Called with each input; its last result is returned.
+        inputs (list): Inputs to run the operation on.
+        unit (str): What the throughput counts, e.g. "pages".
+        items_per_input (int, optional): Units processed per input. Defaults to 1.
+        concurrency (int, optional): Number of inputs run at once. Defaults to 1.
+        warmup (int, optional): Untimed runs on the first input. Defaults to 0.
+
+    Returns:
+        tuple: The stage result dict and the output of the last operation.
+    """
+    latencies = []
+    for _ in range(warmup if inputs else 0):
+        operation(inputs[0])
+
+    def timed(item):
+        start = time.perf_counter()
+        output = operation(item)
+        latencies.append(time.perf_counter() - start)
+        return output
+
+    with _RSSSampler() as sampler:
+        start = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                outputs = list(executor.map(timed, inputs))
+        else:
+            outputs = [timed(item) for item in inputs]
+        elapsed = time.perf_counter() - start
+
+    items = items_per_input * len(inputs)
+    result = {
+        "stage": name,
+        "runs": len(inputs),
+        "unit": unit,
+        "items": items,
+        "throughput": items / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "peak_rss_mb": sampler.peak_bytes / 2 ** 20,
+    }
+    return result, outputs[-1] if outputs else None
+
+def run_benchmarks(pages=50, repeat=5, queries=50, requests=64, concurrency=8,
+                   latency_ms=50.0, jitter_ms=0.0, stages=None, seed=0):
+    """
+    Run the benchmark stages in pipeline order.
+
+    Args:
+        pages (int, optional): Pages in the synthetic PDF. Defaults to 50.
+        repeat (int, optional): Runs of the whole-document stages. Defaults to 5.
+        queries (int, optional): Queries for the retrieval and prompt stages. Defaults to 50.
+        requests (int, optional): Requests for the generation stage. Defaults to 64.
+        concurrency (int, optional): Concurrent generation requests. Defaults to 8.
+        latency_ms (float, optional): Latency of the stub model. Defaults to 50.0.
+        jitter_ms (float, optional): Random latency jitter of the stub model. Defaults to 0.0.
+        stages (list, optional): Stages to report. Defaults to None, meaning all.
+            Earlier stages still run when a later one needs their output.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        dict: The parameters and a result dict per stage.
+    """
+    from utils.document_processor import extract_text_from_pdf, split_text
+    from utils.retrieval import build_index, retrieve_chunks
+    from utils.context_packer import pack_context
+    from utils.gemini_api import build_rag_prompt
+    from utils.generation_client import GenerationClient
+    from utils.async_runtime import gather_with_timeout, run_async
+    from utils.disk_cache import DiskCache
+    from utils.fake_github_server import start_fake_github_server
+    from utils.github_tool import GitHubClient, GitHubTool
+
+    config = get_config()
+    stages = stages or STAGES
+    params = {
+        "pages": pages, "repeat": repeat, "queries": queries, "requests": requests,
+        "concurrency": concurrency, "latency_ms": latency_ms, "jitter_ms": jitter_ms, "seed": seed,
+    }
+    results = {}
+
+    def record(name, *args, **kwargs):
+        result, output = run_stage(name, *args, **kwargs)
+        if name in stages:
+            results[name] = result
+            print(f"{name:>9}: {result['throughput']:>10.1f} {result['unit']}/s  "
+                  f"p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms  "
+                  f"peak RSS {result['peak_rss_mb']:>7.1f} MB")
+        return output
+
+    pdf_path = os.path.join(config["temp_folder"], "benchmarks", f"synthetic_{pages}_{seed}.pdf")
+    if not os.path.exists(pdf_path):
+        write_synthetic_pdf(pdf_path, pages, seed=seed)
+
+    def extract(path):
+        text = extract_text_from_pdf(path)
+        if text.startswith("Error extracting text from PDF"):
+            raise RuntimeError(text)
+        return text
+
+    # Start the extraction process pool outside the timed runs
+    extract(pdf_path)
+    text = record("extract", extract, [pdf_path] * repeat, "pages", items_per_input=pages)
+    chunks = record("chunk", lambda text: split_text(text, config["chunk_size"], config["chunk_overlap"]),
+                    [text] * repeat, "chars", items_per_input=len(text), warmup=1)
+    index = record("index", build_index, [chunks] * repeat, "chunks", items_per_input=len(chunks), warmup=1)
+
+    rng = random.Random(seed)
+    query_texts = [" ".join(rng.choice(WORDS) for _ in range(6)) for _ in range(queries)]
+    retrieved = {}
+
+    def retrieve(query):
+        retrieved[query] = retrieve_chunks(index, query, config["retrieval_top_k"])
+        return retrieved[query]
+
+    record("retrieve", retrieve, query_texts, "queries")
+
+    def build_prompt(query):
+        context, _ = pack_context(retrieved[query], config["default_model"], calibrate=False)
+        return build_rag_prompt(query, context)
+
+    prompt = record("prompt", build_prompt, query_texts, "prompts")
+
+    if "generate" in stages:
+        stub = StubModel(latency_ms / 1000, jitter_ms / 1000, seed=seed)
+        client = GenerationClient(call_model=stub, fallback_models=[], max_workers=concurrency)
+        record("generate", lambda prompt: client.generate(prompt, config["default_model"])[0],
+               [prompt] * requests, "requests", concurrency=concurrency)
+
+    if "github" in stages:
+        # A fake GitHub API on localhost; after the warmup run the listing and
+        # issue pages are revalidated from the ETag cache
+        server = start_fake_github_server(latency=0.0)
+        cache = DiskCache(os.path.join(config["temp_folder"], "benchmarks", "github_cache"), 64 * 1024 * 1024,
+                          name="GitHub cache")
+        tool = GitHubTool(client=GitHubClient(server.url, cache=cache))
+
+        async def github_calls(_):
+            issues = await tool.list_repository_issues()
+            return await gather_with_timeout(*(tool.get_issue_content(issue["number"]) for issue in issues[:10]))
+
+        try:
+            record("github", lambda item: run_async(github_calls(item)), list(range(queries)), "calls", warmup=1)
+        finally:
+            server.shutdown()
+
+    return {
+        "params": params,
+        "python": platform.python_version(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "stages": results,
+    }
+
+def compare_to_baseline(results, baseline, tolerance=0.2):
+    """
+    Compare benchmark results with a saved baseline.
+
+    Args:
+        results (dict): Results from run_benchmarks.
+        baseline (dict): Baseline results from run_benchmarks.
+        tolerance (float, optional): Allowed relative change before a metric
+            counts as a regression. Defaults to 0.2.
+
+    Returns:
+        list: Dicts with "stage", "metric", "baseline", "current", "change"
+        (relative) and "regression", for stages present in both.
+    """
+    rows = []
+    for stage, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if previous is None:
+            continue
+        for metric, higher_is_worse in HIGHER_IS_WORSE.items():
+            if not previous.get(metric):
+                continue
+            change = (current[metric] - previous[metric]) / previous[metric]
+            rows.append({
+                "stage": stage,
+                "metric": metric,
+                "baseline": previous[metric],
+                "current": current[metric],
+                "change": change,
+                "regression": change > tolerance if higher_is_worse else change < -tolerance,
+            })
+    return rows
+
+def main():
+    """Run the benchmarks, optionally saving the results and comparing them with a baseline."""
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks.")
+    parser.add_argument("--pages", type=int, default=50, help="Pages in the synthetic PDF")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of the whole-document stages")
+    parser.add_argument("--queries", type=int, default=50, help="Queries for retrieval and prompt construction")
+    parser.add_argument("--requests", type=int, default=64, help="Stub generation requests")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent generation requests")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Stub model latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Stub model latency jitter")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages to report")
+    parser.add_argument("--output", help="Write the results to this JSON file, e.g. to save a baseline")
+    parser.add_argument("--baseline", help="Compare with a baseline JSON file; exits non-zero on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative change against the baseline")
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))} (choose from {', '.join(STAGES)})")
+
+    results = run_benchmarks(
+        pages=args.pages, repeat=args.repeat, queries=args.queries, requests=args.requests,
+        concurrency=args.concurrency, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, stages=stages
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != results["params"]:
+            print("Warning: the baseline was recorded with different parameters")
+        rows = compare_to_baseline(results, baseline, args.tolerance)
+        print(f"{'stage':>9} {'metric':>12} {'baseline':>11} {'current':>11} {'change':>8}")
+        for row in rows:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['stage']:>9} {row['metric']:>12} {row['baseline']:>11.2f} "
+                  f"{row['current']:>11.2f} {row['change']:>+8.0%}{flag}")
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Streaming text chunker for the LLM Evolution Explorer application.
+
+Produces the same chunk boundaries as LangChain's RecursiveCharacterTextSplitter
+(default separators, kept at the start of each split, whitespace stripped)
+without importing LangChain. Text is chunked as it streams in: long paragraphs
+are split on lines as they arrive, so memory stays bounded by the chunk size
+and the largest fragment rather than by the document.
+"""
+import bisect
+import re
+from collections import deque
+
+SEPARATORS = ["\n\n", "\n", " ", ""]
+
+def _split_with_separator(text, offset, separator):
+    """
+    Split text on a separator, keeping the separator at the start of each piece.
+
+    Args:
+        text (str): Text to split.
+        offset (int): Offset of text within the document.
+        separator (str): Separator, or "" to split into characters.
+
+    Returns:
+        list: Non-empty (offset, piece) tuples covering text.
+    """
+    if separator:
+        parts = re.split(f"({re.escape(separator)})", text)
+        pieces = [parts[0]] + [parts[i] + parts[i + 1] for i in range(1, len(parts), 2)]
+    else:
+        pieces = list(text)
+
+    splits = []
+    for piece in pieces:
+        if piece:
+            splits.append((offset, piece))
+        offset += len(piece)
+    return splits
+
+class _Merger:
+    """
+    Greedily merges consecutive small splits into overlapping chunks.
+    """
+    def __init__(self, chunk_size, chunk_overlap):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.current = deque()
+        self.total = 0
+
+    def _join(self):
+        start = self.current[0][0]
+        text = "".join(piece for _, piece in self.current)
+        stripped = text.strip()
+        if not stripped:
+            return None
+        start += len(text) - len(text.lstrip())
+        return (start, start + len(stripped), stripped)
+
+    def push(self, split):
+        """
+        Add a split, returning any chunks it completes.
+
+        Args:
+            split (tuple): (offset, piece) tuple.
+
+        Returns:
+            list: Completed (start, end, text) chunks.
+        """
+        chunks = []
+        length = len(split[1])
+        if self.total + length > self.chunk_size:
+            if self.current:
+                chunk = self._join()
+                if chunk is not None:
+                    chunks.append(chunk)
+                # Keep trailing splits as overlap for the next chunk
+                while self.total > self.chunk_overlap or (self.total + length > self.chunk_size and self.total > 0):
+                    self.total -= len(self.current.popleft()[1])
+        self.current.append(split)
+        self.total += length
+        return chunks
+
+    def flush(self):
+        """
+        Emit the pending chunk and reset the merger.
+
+        Returns:
+            list: The final (start, end, text) chunk, if any.
+        """
+        chunks = []
+        if self.current:
+            chunk = self._join()
+            if chunk is not None:
+                chunks.append(chunk)
+        self.current = deque()
+        self.total = 0
+        return chunks
+
+def _split_recursive(text, offset, separators, chunk_size, chunk_overlap):
+    """
+    Recursively split an in-memory piece of text.
+
+    Args:
+        text (str): Text to split.
+        offset (int): Offset of text within the document.
+        separators (list): Separators to try, coarsest first.
+        chunk_size (int): Maximum chunk size.
+        chunk_overlap (int): Overlap between chunks.
+
+    Returns:
+        list: (start, end, text) chunks.
+    """
+    separator = separators[-1]
+    remaining = []
+    for i, candidate in enumerate(separators):
+        if candidate == "":
+            separator = candidate
+            break
+        if candidate in text:
+            separator = candidate
+            remaining = separators[i + 1:]
+            break
+
+    chunks = []
+    merger = _Merger(chunk_size, chunk_overlap)
+    for split_offset, piece in _split_with_separator(text, offset, separator):
+        if len(piece) < chunk_size:
+            chunks.extend(merger.push((split_offset, piece)))
+            continue
+
+        chunks.extend(merger.flush())
+        if remaining:
+            chunks.extend(_split_recursive(piece, split_offset, remaining, chunk_size, chunk_overlap))
+        else:
+            chunks.append((split_offset, split_offset + len(piece), piece))
+    chunks.extend(merger.flush())
+    return chunks
+
+def _iter_fragment_chunks(fragments, chunk_size, chunk_overlap):
+    """
+    Chunk a stream of text fragments.
+
+    The stream is split on paragraph breaks as it arrives. A paragraph that
+    grows to chunk_size is certain to be split on lines, so from then on its
+    complete lines are merged as they arrive instead of buffering the rest of
+    the paragraph. Only the pending chunk, the current fragment and at most
+    chunk_size characters of an unfinished paragraph are held in memory, even
+    when the text has no paragraph breaks at all.
+
+    Args:
+        fragments (iterable): Consecutive pieces of the document text.
+        chunk_size (int): Maximum chunk size.
+        chunk_overlap (int): Overlap between chunks.
+
+    Yields:
+        tuple: (start, end, text) chunks in document order.
+    """
+    if chunk_overlap > chunk_size:
+        raise ValueError(f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size}), should be smaller.")
+
+    separator = SEPARATORS[0]
+    line_separator = SEPARATORS[1]
+    merger = _Merger(chunk_size, chunk_overlap)
+    # Merges the lines of the current paragraph once it is being split on lines
+    line_merger = None
+    buffer = ""
+    buffer_offset = 0
+    separator_seen = False
+
+    def process(splits, merger, separators):
+        for split_offset, piece in splits:
+            if len(piece) < chunk_size:
+                yield from merger.push((split_offset, piece))
+            else:
+                yield from merger.flush()
+                yield from _split_recursive(piece, split_offset, separators, chunk_size, chunk_overlap)
+
+    def stream_lines():
+        # Merge the complete lines of the buffered paragraph, keeping its last line
+        nonlocal buffer, buffer_offset
+        cut = buffer.rfind(line_separator)
+        if cut <= 0:
+            return
+        yield from process(_split_with_separator(buffer[:cut], buffer_offset, line_separator), line_merger, SEPARATORS[2:])
+        buffer = buffer[cut:]
+        buffer_offset += cut
+
+    for fragment in fragments:
+        buffer += fragment
+        if line_merger is not None:
+            end = buffer.find(separator)
+            if end == -1:
+                yield from stream_lines()
+                continue
+            # The paragraph being split on lines ends at this paragraph break
+            yield from process(_split_with_separator(buffer[:end], buffer_offset, line_separator), line_merger, SEPARATORS[2:])
+            yield from line_merger.flush()
+            line_merger = None
+            buffer = buffer[end:]
+            buffer_offset += end
+            separator_seen = True
+
+        if not separator_seen and separator not in buffer:
+            # Whether or not a paragraph break follows, a first paragraph of
+            # chunk_size characters is split on lines
+            if len(buffer) >= chunk_size and line_separator in buffer:
+                line_merger = _Merger(chunk_size, chunk_overlap)
+                yield from stream_lines()
+            continue
+        separator_seen = True
+
+        # Everything before the last separator match is made of complete splits
+        last_match = None
+        for last_match in re.finditer(re.escape(separator), buffer):
+            pass
+        if last_match is not None and last_match.start() > 0:
+            cut = last_match.start()
+            yield from process(_split_with_separator(buffer[:cut], buffer_offset, separator), merger, SEPARATORS[1:])
+            buffer = buffer[cut:]
+            buffer_offset += cut
+
+        if len(buffer) >= chunk_size:
+            yield from merger.flush()
+            line_merger = _Merger(chunk_size, chunk_overlap)
+            yield from stream_lines()
+
+    if line_merger is not None:
+        yield from process(_split_with_separator(buffer, buffer_offset, line_separator), line_merger, SEPARATORS[2:])
+        yield from line_merger.flush()
+        return
+    if not separator_seen:
+        yield from _split_recursive(buffer, buffer_offset, SEPARATORS, chunk_size, chunk_overlap)
+        return
+    yield from process(_split_with_separator(buffer, buffer_offset, separator), merger, SEPARATORS[1:])
+    yield from merger.flush()
+
+def iter_chunks(pages, chunk_size=1000, chunk_overlap=200):
+    """
+    Chunk a stream of pages, tracking where each chunk comes from.
+
+    The document text is the concatenation of each page's text followed by a
+    newline, as produced by extract_text_from_pdf.
+
+    Args:
+        pages (iterable): (page_no, text) tuples, e.g. from iter_pdf_pages.
+        chunk_size (int, optional): Maximum chunk size. Defaults to 1000.
+        chunk_overlap (int, optional): Overlap between chunks. Defaults to 200.
+
+    Yields:
+        dict: Chunk with "text", "page" (page of its first character) and the
+        "start"/"end" character offsets of the chunk within the document.
+    """
+    page_starts = []
+    page_numbers = []
+
+    def fragments():
+        offset = 0
+        for page_no, page_text in pages:
+            page_starts.append(offset)
+            page_numbers.append(page_no)
+            offset += len(page_text) + 1
+            yield page_text + "\n"
+
+    for start, end, text in _iter_fragment_chunks(fragments(), chunk_size, chunk_overlap):
+        page = page_numbers[bisect.bisect_right(page_starts, start) - 1]
+        yield {"text": text, "page": page, "start": start, "end": end}
+
+def chunk_text(text, chunk_size=1000, chunk_overlap=200):
+    """
+    Split text into chunks.
+
+    Args:
+        text (str): Text to split.
+        chunk_size (int, optional): Maximum chunk size. Defaults to 1000.
+        chunk_overlap (int, optional): Overlap between chunks. Defaults to 200.
+
+    Returns:
+        list: List of text chunks.
+    """
+    return [chunk for _, _, chunk in _iter_fragment_chunks([text], chunk_size, chunk_overlap)]
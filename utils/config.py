@@ -2,24 +2,108 @@
 Configuration utilities for the LLM Evolution Explorer application.
 """
 import os
-from dotenv import load_dotenv
-
-# Load environment variables from .env file if it exists
-load_dotenv()
 
 # Default configuration
 DEFAULT_CONFIG = {
     "app_title": "LLM Evolution Explorer",
     "app_description": "Explore the evolution of LLMs — from basic queries to agentic RAG integrations",
-    "gemini_api_key": os.getenv("GEMINI_API_KEY", ""),
+    "gemini_api_key": "",  # read from GEMINI_API_KEY on first use
     "default_model": "gemini-1.5-pro",
+    # "gemini" for the Gemini API, or "http" for a server speaking the utils.stub_llm_server protocol
+    "llm_backend": "gemini",
+    "llm_backend_url": "http://127.0.0.1:8765",
+    "llm_http_pool_size": 32,  # connections and async worker threads of the HTTP backend
     "available_models": ["gemini-1.5-pro", "gemini-1.5-flash", "models/gemini-1.5-pro", "models/gemini-1.5-flash"],
     "github_repo": "https://github.com/modelcontextprotocol/python-sdk",
+    # GitHub REST API; point at utils.fake_github_server to run offline
+    "github_api_url": "https://api.github.com",
+    "github_token": "",  # read from GITHUB_TOKEN on first use; required for code search
+    "github_timeout": 10,  # seconds
+    "github_max_connections": 16,
+    "github_per_page": 100,
+    "github_max_pages": 10,  # pages fetched per listing or search
+    "github_cache_max_mb": 64,  # ETag-revalidated response cache
+    # Local full-text issue index, synced incrementally with updated_at watermarks
+    "issue_sync_interval": 60,  # seconds before a query re-syncs the index
+    "issue_search_limit": 8,  # issues put into the prompt
+    "tool_call_timeout": 10,  # seconds per concurrent tool call in the agentic panels
+    "async_runtime_workers": 32,  # threads for blocking calls made from the background event loop
+    # Tool-calling agent loop of the agentic setup
+    "agent_max_steps": 4,  # model turns before the agent must answer
+    "agent_time_budget": 30,  # seconds for model turns and tool calls before the agent must answer
+    "agent_max_result_chars": 8000,  # longer tool results are truncated before they reach the model
+    # Agentic RAG: documents and issues are fetched concurrently, then fused into one context
+    "agentic_rag_deadline": 5,  # seconds to wait for the sources before generation starts without the late ones
     "temp_folder": "/tmp/llm_evolution_explorer",
+    "chunk_size": 1000,
+    "chunk_overlap": 200,
+    "retrieval_top_k": 5,
+    "retrieval_engine": "bm25",  # "bm25", "dense" or "ann"
+    # Token budgets for RAG context, per model (without the "models/" prefix)
+    "context_token_budgets": {"gemini-1.5-pro": 64000, "gemini-1.5-flash": 32000},
+    "default_context_token_budget": 32000,
+    # "hashing" for the built-in hashing-trick embedder, or "package.module:factory" for a local encoder
+    "embedding_encoder": "hashing",
+    "embedding_dim": 384,
+    # IVF approximate search: more probed lists means higher recall and latency
+    "ann_num_lists": None,  # None uses 4 * sqrt(number of chunks in the library)
+    "ann_nprobe": 16,
+    "ann_min_train_size": 1024,  # smaller libraries are searched exactly
+    "ann_kmeans_iterations": 10,
+    "extraction_cache_max_mb": 512,
+    "extraction_workers": None,  # None uses os.cpu_count()
+    "extraction_pages_per_task": 16,
+    # Uploaded files, stored under temp_folder/uploads by content hash
+    "upload_ttl_hours": 24,  # files not uploaded again for this long are removed by the janitor
+    "upload_janitor_interval": 600,  # seconds between janitor sweeps
+    # Background ingestion of uploaded documents
+    "ingestion_workers": 4,  # documents extracted in parallel
+    "ingestion_poll_interval": 0.5,  # seconds between progress updates in the UI
+    # Documents and their indexes, shared by all sessions
+    "document_store_max_mb": 512,  # resident size before least recently used documents are evicted to disk
+    "document_store_disk_max_mb": 2048,  # evicted documents kept on disk
+    "model_catalog_ttl": 600,  # seconds
+    "model_catalog_retry_ttl": 30,  # seconds the default models are served after a failed catalog fetch
+    "generation_max_workers": 8,
+    "hedge_percentile": None,  # e.g. 95 to hedge requests slower than the model's p95 latency
+    "hedge_min_samples": 20,
+    "response_cache_enabled": True,
+    "response_cache_ttl": 86400,  # seconds
+    "response_cache_memory_entries": 256,
+    "response_cache_max_entry_kb": 256,
+    # Per-request latency traces, logged to temp_folder/traces/traces.jsonl
+    "tracing_enabled": True,
+    "trace_log_max_mb": 5,
+    "trace_log_backups": 3,
+    "trace_histogram_window": 500,  # latest spans per name kept for the histograms
+    # Cold-start budget checked by `python -m utils.import_report`
+    "import_time_budget_ms": 300,  # for app.py's imports, excluding Streamlit itself
+    "deferred_modules": ["google.generativeai", "pypdf", "numpy"],  # must not load at startup
 }
 
-# Ensure temp folder exists
-os.makedirs(DEFAULT_CONFIG["temp_folder"], exist_ok=True)
+_environment_loaded = False
+
+def _load_environment():
+    """
+    Load environment variables and prepare the temp folder, once per process.
+    
+    Kept out of module import so that importing the configuration is free.
+    """
+    global _environment_loaded
+    if _environment_loaded:
+        return
+    _environment_loaded = True
+    
+    # Load environment variables from .env file if it exists
+    from dotenv import load_dotenv
+    load_dotenv()
+    if not DEFAULT_CONFIG["gemini_api_key"]:
+        DEFAULT_CONFIG["gemini_api_key"] = os.getenv("GEMINI_API_KEY", "")
+    if not DEFAULT_CONFIG["github_token"]:
+        DEFAULT_CONFIG["github_token"] = os.getenv("GITHUB_TOKEN", "")
+    
+    # Ensure temp folder exists
+    os.makedirs(DEFAULT_CONFIG["temp_folder"], exist_ok=True)
 
 def get_config():
     """
@@ -28,6 +112,7 @@ def get_config():
     Returns:
         dict: The application configuration.
     """
+    _load_environment()
     return DEFAULT_CONFIG
 
 def save_api_key(api_key):
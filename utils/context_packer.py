@@ -0,0 +1,148 @@
+"""
+Token-budget-aware context packing for RAG prompts.
+"""
+import math
+import threading
+from utils.config import get_config
+from utils.llm_backend import get_llm_backend
+from utils.tracing import traced
+
+DEFAULT_CHARS_PER_TOKEN = 4.0
+CALIBRATION_SAMPLE_CHARS = 4000
+
+class TokenEstimator:
+    """
+    Fast local token estimator, calibrated per model against count_tokens.
+
+    Estimates are based on a characters-per-token ratio. The first time a model
+    is seen with calibration enabled, one count_tokens call on a text sample
+    measures the real ratio for that model; later estimates are local.
+    """
+    def __init__(self, default_chars_per_token=DEFAULT_CHARS_PER_TOKEN):
+        self.default_chars_per_token = default_chars_per_token
+        self._ratios = {}
+        self._lock = threading.Lock()
+
+    def calibrate(self, model_name, sample):
+        """
+        Measure the characters-per-token ratio of a model on a text sample.
+
+        Args:
+            model_name (str): The model name.
+            sample (str): Representative text.
+
+        Returns:
+            float: The measured ratio, or the default if count_tokens is unavailable.
+        """
+        sample = sample[:CALIBRATION_SAMPLE_CHARS]
+        ratio = self.default_chars_per_token
+        if sample.strip():
+            try:
+                tokens = get_llm_backend().count_tokens(model_name, sample)
+                if tokens:
+                    ratio = len(sample) / tokens
+            except Exception as e:
+                print(f"Error calibrating token estimate for model {model_name}: {str(e)}")
+        with self._lock:
+            self._ratios[model_name] = ratio
+        return ratio
+
+    def chars_per_token(self, model_name):
+        with self._lock:
+            return self._ratios.get(model_name, self.default_chars_per_token)
+
+    def is_calibrated(self, model_name):
+        with self._lock:
+            return model_name in self._ratios
+
+    def estimate(self, text, model_name=None):
+        """
+        Estimate the number of tokens in a text.
+
+        Args:
+            text (str): The text.
+            model_name (str, optional): The model whose ratio to use. Defaults to None.
+
+        Returns:
+            int: The estimated token count.
+        """
+        return math.ceil(len(text) / self.chars_per_token(model_name))
+
+_estimator = TokenEstimator()
+
+def get_token_estimator():
+    """
+    Get the process-wide token estimator.
+
+    Returns:
+        TokenEstimator: The token estimator.
+    """
+    return _estimator
+
+def get_context_budget(model_name):
+    """
+    Get the context token budget of a model.
+
+    Args:
+        model_name (str): The model name, with or without the "models/" prefix.
+
+    Returns:
+        int: The token budget for RAG context.
+    """
+    config = get_config()
+    budgets = config["context_token_budgets"]
+    name = model_name[len("models/"):] if model_name.startswith("models/") else model_name
+    return budgets.get(name, config["default_context_token_budget"])
+
+def chunk_label(chunk):
+    """Get the citation label of a chunk."""
+    if "label" in chunk:
+        return chunk["label"]
+    return f"Chunk {chunk['chunk_id'] + 1}"
+
+@traced()
+def pack_context(chunks, model_name, budget=None, calibrate=True):
+    """
+    Pack the highest-value chunks into a model's context token budget.
+
+    Chunks are taken in descending score order; a chunk that doesn't fit is
+    skipped so that smaller, lower-scored chunks can still fill the remaining
+    budget.
+
+    Args:
+        chunks (list): Chunk dicts with "text", an optional "score" (higher is
+            better) and a "label" or "chunk_id" used for citations.
+        model_name (str): The model the context is for.
+        budget (int, optional): Token budget. Defaults to None, which uses the model's budget.
+        calibrate (bool, optional): Whether to calibrate the estimator with
+            count_tokens the first time a model is seen. Defaults to True.
+
+    Returns:
+        tuple: The packed context string and a report dict with "budget",
+        "used_tokens", "utilization", "included" and "dropped".
+    """
+    estimator = get_token_estimator()
+    if budget is None:
+        budget = get_context_budget(model_name)
+    if calibrate and chunks and not estimator.is_calibrated(model_name):
+        estimator.calibrate(model_name, "\n\n".join(chunk["text"] for chunk in chunks))
+
+    ranked = sorted(chunks, key=lambda chunk: chunk.get("score", 0.0), reverse=True)
+    parts = []
+    used_tokens = 0
+    for chunk in ranked:
+        part = f"[{chunk_label(chunk)}]\n{chunk['text']}"
+        tokens = estimator.estimate(part + "\n\n", model_name)
+        if used_tokens + tokens > budget:
+            continue
+        parts.append(part)
+        used_tokens += tokens
+
+    report = {
+        "budget": budget,
+        "used_tokens": used_tokens,
+        "utilization": used_tokens / budget if budget else 0.0,
+        "included": len(parts),
+        "dropped": len(chunks) - len(parts),
+    }
+    return "\n\n".join(parts), report
@@ -0,0 +1,93 @@
+"""
+Size-bounded disk cache of JSON entries with least recently used eviction.
+"""
+import json
+import os
+import threading
+
+class DiskCache:
+    """
+    Disk cache of JSON-serializable entries keyed by a file-name-safe string,
+    e.g. a hex digest.
+
+    Each entry is a JSON file. Entries are touched on every hit and the least
+    recently used ones are evicted once the cache grows past max_bytes.
+    """
+    def __init__(self, directory, max_bytes, name="disk cache"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.name = name
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """
+        Look up a cache entry.
+
+        Args:
+            key (str): The entry key.
+
+        Returns:
+            The cached entry, or None on a miss.
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            # Refresh the mtime so eviction treats this entry as recently used
+            os.utime(path)
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, entry):
+        """
+        Store a cache entry and evict old entries if the cache is over its size limit.
+
+        Args:
+            key (str): The entry key.
+            entry: JSON-serializable value.
+        """
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing {self.name} entry {key}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits within max_bytes.
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
@@ -1,29 +1,261 @@
 """
 PDF document processing utilities for the LLM Evolution Explorer application.
 """
+import multiprocessing
 import os
-from pypdf import PdfReader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from utils.chunker import chunk_text, iter_chunks
+from utils.config import get_config
+from utils.extraction_cache import get_extraction_cache, hash_buffer, hash_file
+from utils.tracing import get_tracer, traced
 
-def extract_text_from_pdf(pdf_path):
+def _extract_page_range(pdf_path, start, end):
     """
-    Extract text from a PDF file.
+    Extract the text of pages [start, end) of a PDF file.
+    
+    Runs inside the extraction process pool, so it opens its own reader.
     
     Args:
         pdf_path (str): Path to the PDF file.
+        start (int): Index of the first page to extract.
+        end (int): Index one past the last page to extract.
+    
+    Returns:
+        list: Extracted text of each page in the range.
+    """
+    from pypdf import PdfReader
+    reader = PdfReader(pdf_path)
+    return [reader.pages[i].extract_text() for i in range(start, end)]
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool():
+    """
+    Get the shared extraction process pool, creating it on first use.
+    
+    Returns:
+        ProcessPoolExecutor: The process pool.
+    """
+    global _process_pool
+    # Ingestion workers ask for the pool concurrently; only one may create it
+    with _process_pool_lock:
+        if _process_pool is None:
+            config = get_config()
+            # Use spawn rather than fork: the Streamlit server is multi-threaded
+            _process_pool = ProcessPoolExecutor(
+                max_workers=config["extraction_workers"] or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _process_pool
+
+def _is_path(pdf_source):
+    """Whether a PDF source is a file path rather than an in-memory stream."""
+    return isinstance(pdf_source, (str, os.PathLike))
+
+def iter_pdf_pages(pdf_source, parallel=True, progress=None):
+    """
+    Extract the text of a PDF file page by page, in page order.
+    
+    Large documents are partitioned into page ranges that are extracted on a
+    process pool; pages are yielded as soon as their range is done, so callers
+    can start working on the first pages while later ones are still parsed.
+    An in-memory stream is read directly; it is only written to the upload
+    store when it is large enough for the process pool, which needs a path.
+    
+    Args:
+        pdf_source: Path to the PDF file, or a binary stream such as an
+            uploaded file or io.BytesIO.
+        parallel (bool, optional): Whether to use the process pool. Defaults to True.
+        progress (callable, optional): Called with (pages_done, num_pages) as
+            pages are extracted. Defaults to None.
+    
+    Yields:
+        tuple: The 1-based page number and the text of that page.
+    """
+    # pypdf is only imported once a document is actually processed
+    from pypdf import PdfReader
+    config = get_config()
+    pages_per_task = config["extraction_pages_per_task"]
+    if not _is_path(pdf_source):
+        pdf_source.seek(0)
+    reader = PdfReader(pdf_source)
+    num_pages = len(reader.pages)
+    
+    if progress is not None:
+        progress(0, num_pages)
+    
+    if not parallel or num_pages <= pages_per_task:
+        for i, page in enumerate(reader.pages):
+            page_text = page.extract_text()
+            if progress is not None:
+                progress(i + 1, num_pages)
+            yield i + 1, page_text
+        return
+    
+    pdf_path = pdf_source if _is_path(pdf_source) else save_uploaded_file(pdf_source)
+    pool = _get_process_pool()
+    ranges = [(start, min(start + pages_per_task, num_pages)) for start in range(0, num_pages, pages_per_task)]
+    # Bound the number of ranges in flight so finished pages don't pile up in memory
+    max_pending = 2 * (config["extraction_workers"] or os.cpu_count())
+    pending = deque()
+    next_range = 0
+    try:
+        while pending or next_range < len(ranges):
+            while next_range < len(ranges) and len(pending) < max_pending:
+                start, end = ranges[next_range]
+                pending.append((start, pool.submit(_extract_page_range, pdf_path, start, end)))
+                next_range += 1
+            
+            start, future = pending.popleft()
+            page_texts = future.result()
+            if progress is not None:
+                progress(start + len(page_texts), num_pages)
+            for offset, page_text in enumerate(page_texts):
+                yield start + offset + 1, page_text
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+@traced()
+def extract_text_from_pdf(pdf_source):
+    """
+    Extract text from a PDF file.
+    
+    Args:
+        pdf_source: Path to the PDF file, or a binary stream such as io.BytesIO.
     
     Returns:
         str: Extracted text from the PDF.
     """
     try:
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        return "".join(page_text + "\n" for _, page_text in iter_pdf_pages(pdf_source))
     except Exception as e:
         return f"Error extracting text from PDF: {str(e)}"
 
+def _extract_and_chunk(pages, chunk_size, chunk_overlap):
+    """
+    Chunk a stream of pages while collecting the full text and page boundaries.
+    
+    Args:
+        pages (iterable): (page_no, text) tuples, e.g. from iter_pdf_pages.
+        chunk_size (int): Size of each chunk.
+        chunk_overlap (int): Overlap between chunks.
+    
+    Returns:
+        tuple: The full text, a list of [start, end] character offsets (one per
+        page), the text chunks and the page number of each chunk.
+    """
+    parts = []
+    page_offsets = []
+    offset = 0
+    
+    def collect():
+        nonlocal offset
+        for page_no, page_text in pages:
+            parts.append(page_text + "\n")
+            page_offsets.append([offset, offset + len(page_text) + 1])
+            offset += len(page_text) + 1
+            yield page_no, page_text
+    
+    chunks = []
+    chunk_pages = []
+    for chunk in iter_chunks(collect(), chunk_size, chunk_overlap):
+        chunks.append(chunk["text"])
+        chunk_pages.append(chunk["page"])
+    return "".join(parts), page_offsets, chunks, chunk_pages
+
+def _cached_pages(entry):
+    """Rebuild the (page_no, text) stream of a cached extraction."""
+    text = entry["text"]
+    for page_no, (start, end) in enumerate(entry["pages"], start=1):
+        yield page_no, text[start:end - 1]
+
+def hash_pdf_source(pdf_source):
+    """
+    Compute the SHA-256 of a PDF file or stream, without copying an in-memory buffer.
+    
+    Args:
+        pdf_source: Path to the PDF file, or a binary stream such as io.BytesIO.
+    
+    Returns:
+        str: Hex digest of the PDF bytes.
+    """
+    if _is_path(pdf_source):
+        return hash_file(pdf_source)
+    if hasattr(pdf_source, "getbuffer"):
+        with pdf_source.getbuffer() as view:
+            return hash_buffer(view)
+    pdf_source.seek(0)
+    return hash_buffer(pdf_source.read())
+
+@traced()
+def process_pdf(pdf_source, chunk_size=1000, chunk_overlap=200, progress=None, content_hash=None):
+    """
+    Extract and chunk a PDF file, serving repeated files from the extraction cache.
+    
+    Results are keyed by the SHA-256 of the file bytes, so the same PDF uploaded
+    under any name or by any session is only parsed by pypdf once. On a cache
+    miss, pages are chunked as they come out of the extractor, so chunking
+    itself holds only a bounded window of text; the full text is still joined
+    once, because the result and the cache entry include it. Uploaded files
+    can be passed as they are: a cache hit then needs no disk copy at all.
+    
+    Args:
+        pdf_source: Path to the PDF file, or a binary stream such as a
+            Streamlit uploaded file or io.BytesIO.
+        chunk_size (int, optional): Size of each chunk. Defaults to 1000.
+        chunk_overlap (int, optional): Overlap between chunks. Defaults to 200.
+        progress (callable, optional): Called with (pages_done, num_pages) as
+            pages are extracted; a cached document reports all pages at once.
+            Defaults to None.
+        content_hash (str, optional): SHA-256 of the PDF bytes, if already known.
+            Defaults to None, which computes it.
+    
+    Returns:
+        dict: The content hash, extracted text, page boundaries, chunks and the
+        page number each chunk starts on.
+    """
+    tracer = get_tracer()
+    cache = get_extraction_cache()
+    with tracer.span("hash_file"):
+        content_hash = content_hash or hash_pdf_source(pdf_source)
+    chunks_key = f"{chunk_size}:{chunk_overlap}"
+    
+    with tracer.span("extraction_cache.get") as span:
+        entry = cache.get(content_hash)
+        span["hit"] = entry is not None
+    if entry is not None and progress is not None:
+        progress(len(entry["pages"]), len(entry["pages"]))
+    if entry is None:
+        try:
+            with tracer.span("extract_and_chunk"):
+                text, pages, chunks, chunk_pages = _extract_and_chunk(iter_pdf_pages(pdf_source, progress=progress), chunk_size, chunk_overlap)
+        except Exception as e:
+            # Don't cache failures so a later upload can retry
+            return {
+                "hash": content_hash,
+                "text": f"Error extracting text from PDF: {str(e)}",
+                "pages": [],
+                "chunks": [],
+                "chunk_pages": []
+            }
+        entry = {"hash": content_hash, "text": text, "pages": pages, "chunks": {}, "chunk_pages": {}}
+    elif chunks_key in entry["chunks"] and chunks_key in entry.setdefault("chunk_pages", {}):
+        return {**entry, "chunks": entry["chunks"][chunks_key], "chunk_pages": entry["chunk_pages"][chunks_key]}
+    else:
+        with tracer.span("chunk_cached_text"):
+            _, _, chunks, chunk_pages = _extract_and_chunk(_cached_pages(entry), chunk_size, chunk_overlap)
+    
+    entry["chunks"][chunks_key] = chunks
+    entry["chunk_pages"][chunks_key] = chunk_pages
+    with tracer.span("extraction_cache.put"):
+        cache.put(content_hash, entry)
+    return {**entry, "chunks": chunks, "chunk_pages": chunk_pages}
+
+@traced()
 def split_text(text, chunk_size=1000, chunk_overlap=200):
     """
     Split text into chunks for processing.
@@ -36,28 +268,31 @@ def split_text(text, chunk_size=1000, chunk_overlap=200):
     Returns:
         list: List of text chunks.
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len
-    )
-    return text_splitter.split_text(text)
+    return chunk_text(text, chunk_size, chunk_overlap)
 
-def save_uploaded_file(uploaded_file, directory):
+@traced()
+def save_uploaded_file(uploaded_file, directory=None):
     """
-    Save an uploaded file to the specified directory.
+    Save an uploaded file under its content hash, unless the same bytes are already saved.
+    
+    The file is written in fixed-size blocks from the upload's memoryview, so
+    the buffer isn't copied, and files with the same name but different
+    contents don't overwrite each other.
     
     Args:
-        uploaded_file: The uploaded file object from Streamlit.
-        directory (str): Directory to save the file to.
+        uploaded_file: The uploaded file object from Streamlit, or any binary stream.
+        directory (str, optional): Directory to save the file to. Defaults to
+            None, which uses the shared upload store and its janitor.
     
     Returns:
         str: Path to the saved file.
     """
-    os.makedirs(directory, exist_ok=True)
-    file_path = os.path.join(directory, uploaded_file.name)
-    
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    
-    return file_path
+    from utils.upload_store import UploadStore, get_upload_store
+    store = get_upload_store() if directory is None else UploadStore(directory, get_config()["upload_ttl_hours"] * 3600)
+    name = getattr(uploaded_file, "name", "")
+    suffix = os.path.splitext(name)[1].lower() or ".pdf"
+    if hasattr(uploaded_file, "getbuffer"):
+        with uploaded_file.getbuffer() as view:
+            return store.save(view, suffix)["path"]
+    uploaded_file.seek(0)
+    return store.save(uploaded_file.read(), suffix)["path"]
@@ -0,0 +1,347 @@
+"""
+Process-wide store of extracted documents and their indexes, shared across sessions.
+
+Documents are keyed by content hash and chunk settings, so fifty sessions
+working on the same handbook share one copy of its chunks and BM25 index.
+Sessions hold reference-counted SharedDocument handles. A handle is released
+explicitly when a session replaces or removes a document, or when its session
+state is garbage collected. Resident documents are kept within a global memory
+ceiling ("document_store_max_mb"). The least recently used ones are evicted to
+disk as JSON, like the other caches, and transparently reloaded (with their
+BM25 index rebuilt from the chunks) the next time a handle is used. Spilled
+files are kept within "document_store_disk_max_mb". A file is only removed
+while no handle references its document, and a referenced document that
+can't be written to disk stays resident. Reloads and builds run outside the
+store's lock, so they never stall other sessions' lookups.
+"""
+import json
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from utils.config import get_config
+from utils.retrieval import build_index
+
+def document_key(content_hash, chunk_size, chunk_overlap):
+    """
+    Get the store key of a document chunked with the given settings.
+
+    Args:
+        content_hash (str): SHA-256 of the document's bytes.
+        chunk_size (int): Size of each chunk.
+        chunk_overlap (int): Overlap between chunks.
+
+    Returns:
+        str: The key.
+    """
+    return f"{content_hash}_{chunk_size}_{chunk_overlap}"
+
+def estimate_bytes(document, index):
+    """
+    Estimate the memory held by a document and its BM25 index.
+
+    Args:
+        document (dict): The process_pdf result.
+        index (BM25Index): The document's index.
+
+    Returns:
+        int: Approximate size in bytes. Strings shared by the document and the
+        index are counted once.
+    """
+    strings = {id(text): text for text in [document["text"], *document["chunks"], *index.chunks] if text is not None}
+    size = sum(sys.getsizeof(text) for text in strings.values())
+    size += sum(sys.getsizeof(values) for values in (document["chunks"], document["chunk_pages"], document["pages"],
+                                                      index.chunks, index.chunk_lengths))
+    size += sys.getsizeof(index.postings)
+    size += sum(sys.getsizeof(term) + sys.getsizeof(postings) for term, postings in index.postings.items())
+    return size
+
+class SharedDocument:
+    """
+    A session's reference to a document in the store.
+
+    The document and its index are looked up on every access, so the store can
+    evict them to disk between uses.
+    """
+    def __init__(self, store, key):
+        self.store = store
+        self.key = key
+        self._release = weakref.finalize(self, store._release, key)
+
+    @property
+    def document(self):
+        """The process_pdf result: "hash", "text", "pages", "chunks" and "chunk_pages"."""
+        return self.store._get(self.key)["document"]
+
+    def get_index(self):
+        """
+        Get the document's BM25 index.
+
+        Returns:
+            BM25Index: The index.
+        """
+        return self.store._get(self.key)["index"]
+
+    def release(self):
+        """Drop this reference. Safe to call more than once."""
+        self._release()
+
+class DocumentStore:
+    """
+    Reference-counted, memory-bounded store of documents and their indexes.
+    """
+    def __init__(self, directory, max_bytes, max_disk_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        # key -> {"document", "index", "size"}, least recently used first
+        self._resident = OrderedDict()
+        self._refs = {}
+        # key -> Event set when the build in progress for that key has finished
+        self._building = {}
+        self._resident_bytes = 0
+        # Hits and misses count acquire() calls, i.e. how often sessions share a document;
+        # reloads count evicted documents brought back from disk by any access
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "reloads": 0, "evictions": 0, "disk_removals": 0}
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def acquire(self, key, build):
+        """
+        Get a handle to a document, reloading it from disk or building it on a miss.
+
+        Args:
+            key (str): The document key, from document_key().
+            build (callable): Returns (document, index) for a document that
+                isn't in memory or on disk, or None if it can't be built. It is
+                called without holding the store's lock; concurrent calls for
+                the same key wait for the first build instead of repeating it.
+
+        Returns:
+            SharedDocument: A new reference to the document, or None if build returned None.
+        """
+        with self._lock:
+            if self._resident_entry(key) is not None:
+                self._stats["hits"] += 1
+                return self._new_handle(key)
+        entry, source = self._load_or_build(key, build)
+        if entry is None:
+            return None
+        with self._lock:
+            self._stats["hits" if source == "memory" else "disk_hits" if source == "disk" else "misses"] += 1
+            return self._new_handle(key)
+
+    def _new_handle(self, key):
+        self._refs[key] = self._refs.get(key, 0) + 1
+        return SharedDocument(self, key)
+
+    def _release(self, key):
+        with self._lock:
+            count = self._refs.get(key, 0) - 1
+            if count > 0:
+                self._refs[key] = count
+            else:
+                # Unreferenced documents stay cached until they are evicted
+                self._refs.pop(key, None)
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._resident_entry(key)
+        if entry is None:
+            entry, _ = self._load_or_build(key)
+            if entry is None:
+                raise KeyError(f"Document {key} is no longer in the store")
+        return entry
+
+    def _resident_entry(self, key):
+        """Get a resident document and mark it recently used, or None. Must hold the lock."""
+        entry = self._resident.get(key)
+        if entry is not None:
+            self._resident.move_to_end(key)
+        return entry
+
+    def _load_or_build(self, key, build=None):
+        """
+        Make a document resident by reloading it from disk or building it.
+
+        The disk read and the index build run without holding the store's lock.
+        Concurrent callers for the same key wait for the first one and then use
+        its result.
+
+        Args:
+            key (str): The document key.
+            build (callable, optional): Builds the document if it isn't on disk.
+                Defaults to None, which only reloads it.
+
+        Returns:
+            tuple: The entry (None if it couldn't be reloaded or built) and where
+            it came from: "memory" (made resident by a concurrent caller), "disk"
+            or "build".
+        """
+        while True:
+            with self._lock:
+                entry = self._resident_entry(key)
+                if entry is not None:
+                    return entry, "memory"
+                building = self._building.get(key)
+                if building is None:
+                    # This caller loads the document; concurrent callers wait for it
+                    building = self._building[key] = threading.Event()
+                    break
+            # Wait for the other load, then look again (and load it here if that one failed)
+            building.wait()
+
+        try:
+            source = "disk"
+            entry = self._read(key)
+            if entry is None:
+                if build is None:
+                    return None, None
+                source = "build"
+                built = build()
+                if built is None:
+                    return None, None
+                document, index = built
+                entry = {"document": document, "index": index, "size": estimate_bytes(document, index)}
+            with self._lock:
+                if source == "disk":
+                    self._stats["reloads"] += 1
+                self._insert(key, entry)
+            return entry, source
+        finally:
+            with self._lock:
+                del self._building[key]
+            building.set()
+
+    def _read(self, key):
+        """Reload a spilled document and rebuild its BM25 index, or None if it isn't on disk."""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                document = json.load(f)
+            index = build_index(document["chunks"])
+            os.utime(self._path(key))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return {"document": document, "index": index, "size": estimate_bytes(document, index)}
+
+    def _insert(self, key, entry):
+        """Make a document resident and evict others past the memory ceiling. Must hold the lock."""
+        self._resident[key] = entry
+        self._resident_bytes += entry["size"]
+        for old_key in list(self._resident):
+            if self._resident_bytes <= self.max_bytes:
+                break
+            if old_key == key:
+                continue
+            if not self._spill(old_key, self._resident[old_key]) and old_key in self._refs:
+                # A session still needs it and there is no copy on disk: keep it resident
+                continue
+            self._resident_bytes -= self._resident.pop(old_key)["size"]
+            self._stats["evictions"] += 1
+
+    def _spill(self, key, entry):
+        """
+        Write an evicted document to disk, unless it is already there. Must hold the lock.
+
+        Returns:
+            bool: Whether the document is on disk.
+        """
+        path = self._path(key)
+        if os.path.exists(path):
+            return True
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry["document"], f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error spilling document {key} to disk: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        self._trim_disk(keep=key)
+        return True
+
+    def _trim_disk(self, keep=None):
+        """
+        Remove the least recently used unreferenced files past the disk limit. Must hold the lock.
+
+        Args:
+            keep (str, optional): Key of a file that must not be removed, e.g.
+                the document being evicted. Defaults to None.
+        """
+        files = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, name[:-len(".json")], path))
+            total += stat.st_size
+
+        files.sort()
+        for _, size, key, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            if key == keep or (key in self._refs and key not in self._resident):
+                # A session still needs this copy
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                self._stats["disk_removals"] += 1
+            except OSError:
+                pass
+
+    def metrics(self):
+        """
+        Get the store's size and cache statistics.
+
+        Returns:
+            dict: "resident_bytes", "max_bytes", "resident_documents",
+            "referenced_documents", "references", "hits" and "disk_hits"
+            (acquired documents that were already in memory or on disk), "misses"
+            (acquired documents that had to be built), "hit_rate" (hits over all
+            acquisitions), "reloads" (documents brought back from disk),
+            "evictions" and "disk_removals".
+        """
+        with self._lock:
+            acquisitions = self._stats["hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            return {
+                "resident_bytes": self._resident_bytes,
+                "max_bytes": self.max_bytes,
+                "resident_documents": len(self._resident),
+                "referenced_documents": len(self._refs),
+                "references": sum(self._refs.values()),
+                **self._stats,
+                "hit_rate": (self._stats["hits"] + self._stats["disk_hits"]) / acquisitions if acquisitions else 0.0,
+            }
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_document_store():
+    """
+    Get the process-wide document store, creating it on first use.
+
+    Returns:
+        DocumentStore: The document store.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            config = get_config()
+            _store = DocumentStore(
+                os.path.join(config["temp_folder"], "document_store"),
+                config["document_store_max_mb"] * 1024 * 1024,
+                config["document_store_disk_max_mb"] * 1024 * 1024
+            )
+        return _store
@@ -0,0 +1,68 @@
+"""
+Persistent, content-addressed cache for extracted PDF text.
+"""
+import hashlib
+import os
+from utils.config import get_config
+from utils.disk_cache import DiskCache
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def hash_file(file_path):
+    """
+    Compute the SHA-256 digest of a file's bytes.
+
+    Args:
+        file_path (str): Path to the file.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def hash_buffer(buffer):
+    """
+    Compute the SHA-256 digest of an in-memory buffer without copying it.
+
+    Args:
+        buffer: A bytes-like object, e.g. the memoryview of an uploaded file.
+
+    Returns:
+        str: Hex digest of the buffer contents.
+    """
+    digest = hashlib.sha256()
+    with memoryview(buffer) as view:
+        for start in range(0, len(view), HASH_BLOCK_SIZE):
+            digest.update(view[start:start + HASH_BLOCK_SIZE])
+    return digest.hexdigest()
+
+class ExtractionCache(DiskCache):
+    """
+    Disk cache of extraction results keyed by the SHA-256 of the source file.
+
+    Each entry holds the extracted text, page boundaries and chunks.
+    """
+    def __init__(self, directory, max_bytes):
+        super().__init__(directory, max_bytes, name="extraction cache")
+
+_cache = None
+
+def get_extraction_cache():
+    """
+    Get the process-wide extraction cache, creating it on first use.
+
+    Returns:
+        ExtractionCache: The extraction cache.
+    """
+    global _cache
+    if _cache is None:
+        config = get_config()
+        _cache = ExtractionCache(
+            os.path.join(config["temp_folder"], "extraction_cache"),
+            config["extraction_cache_max_mb"] * 1024 * 1024
+        )
+    return _cache
@@ -0,0 +1,269 @@
+"""
+Local stand-in for the GitHub REST API, for offline runs, load tests and benchmarks.
+
+Serves synthetic issues and code search results for any repository, with the
+parts of the API the GitHub tool relies on: Link header pagination, ETags
+with If-None-Match revalidation and rate-limit headers. As on GitHub, 304
+responses don't count against the rate limit. Point the app at it with:
+
+    python -m utils.fake_github_server --port 8766 --issues 450
+
+and set "github_api_url": "http://127.0.0.1:8766" in utils/config.py.
+
+Routes:
+    GET /repos/<owner>/<repo>/issues?state=&sort=&direction=&since=&per_page=&page=  -> issues and pull requests
+    GET /repos/<owner>/<repo>/issues/<number>                                       -> one issue
+    GET /search/code?q=<terms> repo:<owner>/<repo>&per_page=&page=                  -> {"total_count", "items"}
+Errors are returned as {"message": message} with a non-200 status.
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+ISSUES_PATTERN = re.compile(r"^/repos/([^/]+)/([^/]+)/issues(?:/(\d+))?$")
+RATE_LIMIT = 5000
+LABELS = ["bug", "enhancement", "documentation", "testing", "ci", "api"]
+WORDS = (
+    "client server session transport protocol resource prompt tool message "
+    "request response stream schema validation context retrieval cache"
+).split()
+
+def _timestamp(seconds):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(seconds))
+
+def make_issues(count):
+    """
+    Build synthetic issues, newest first. Every fourth one is a pull request.
+
+    Args:
+        count (int): Number of issues and pull requests.
+
+    Returns:
+        list: Issue dicts in the GitHub API format.
+    """
+    issues = []
+    for number in range(count, 0, -1):
+        words = [WORDS[(number * 7 + i) % len(WORDS)] for i in range(4)]
+        created = 1700000000 + number * 3600
+        issue = {
+            "number": number,
+            "title": f"{words[0].capitalize()} {words[1]} fails with {words[2]} {words[3]}",
+            "state": "closed" if number % 3 == 0 else "open",
+            "created_at": _timestamp(created),
+            "updated_at": _timestamp(created + (number % 5) * 86400),
+            "body": f"The {words[1]} {words[0]} breaks when the {words[2]} sends a {words[3]}.",
+            "comments": number % 7,
+            "labels": [{"name": LABELS[number % len(LABELS)]}],
+        }
+        if number % 4 == 0:
+            issue["pull_request"] = {"url": f"/pulls/{number}"}
+        issues.append(issue)
+    return issues
+
+def make_files(count):
+    """
+    Build synthetic source files for code search.
+
+    Args:
+        count (int): Number of files.
+
+    Returns:
+        list: (path, set of words) pairs.
+    """
+    return [
+        (f"src/{WORDS[i % len(WORDS)]}/{WORDS[(i * 5 + 3) % len(WORDS)]}_{i}.py",
+         {WORDS[(i * k) % len(WORDS)] for k in range(1, 6)})
+        for i in range(count)
+    ]
+
+class FakeGitHubServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server simulating the GitHub REST API.
+
+    Every repository has the same synthetic issues and files. `latency` is
+    added to each request, so concurrent pagination is visible in timings.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, issues=250, files=120, latency=0.05):
+        super().__init__(address, _Handler)
+        self.issues = make_issues(issues)
+        self.issues_by_number = {issue["number"]: issue for issue in self.issues}
+        self.files = make_files(files)
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "not_modified": 0, "in_flight": 0, "max_in_flight": 0,
+                      "rate_limit_remaining": RATE_LIMIT}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def update_issue(self, number, **fields):
+        """
+        Change an issue, or create it if it doesn't exist, and bump its updated_at.
+
+        Args:
+            number (int): The issue number.
+            **fields: Issue fields to set, e.g. title, body, state or labels.
+        """
+        with self._lock:
+            now = _timestamp(time.time())
+            issue = self.issues_by_number.get(number)
+            if issue is None:
+                issue = {"number": number, "title": "", "state": "open", "created_at": now,
+                         "body": "", "comments": 0, "labels": []}
+                self.issues_by_number[number] = issue
+                self.issues.insert(0, issue)
+            issue.update(fields, updated_at=now)
+
+    def _update_stats(self, in_flight=0, requests=0, not_modified=0, rate_limited=0):
+        with self._lock:
+            self.stats["requests"] += requests
+            self.stats["not_modified"] += not_modified
+            self.stats["rate_limit_remaining"] -= rate_limited
+            self.stats["in_flight"] += in_flight
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+            return self.stats["rate_limit_remaining"]
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # Keep load tests quiet
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        etag = f'"{hashlib.sha1(data).hexdigest()}"'
+        not_modified = status == 200 and self.headers.get("If-None-Match") == etag
+        remaining = self.server._update_stats(not_modified=not_modified, rate_limited=not not_modified)
+
+        self.send_response(304 if not_modified else status)
+        self.send_header("ETag", etag)
+        self.send_header("X-RateLimit-Limit", str(RATE_LIMIT))
+        self.send_header("X-RateLimit-Remaining", str(remaining))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if not_modified:
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _paginate(self, items, query):
+        """Slice a page of items and build its Link header."""
+        try:
+            per_page = min(100, max(1, int(query.get("per_page", ["30"])[0])))
+            page = max(1, int(query.get("page", ["1"])[0]))
+        except ValueError:
+            per_page, page = 30, 1
+        last_page = max(1, -(-len(items) // per_page))
+
+        links = []
+        path = urlparse(self.path).path
+        params = {name: values[0] for name, values in query.items()}
+        for rel, number in (("prev", page - 1), ("next", page + 1), ("first", 1), ("last", last_page)):
+            if 1 <= number <= last_page and number != page:
+                links.append(f'<{self.server.url}{path}?{urlencode(dict(params, page=number))}>; rel="{rel}"')
+        headers = {"Link": ", ".join(links)} if links else {}
+        return items[(page - 1) * per_page:page * per_page], headers
+
+    def do_GET(self):
+        server = self.server
+        server._update_stats(in_flight=1, requests=1)
+        try:
+            time.sleep(server.latency)
+            parsed = urlparse(self.path)
+            query = parse_qs(parsed.query)
+
+            match = ISSUES_PATTERN.match(parsed.path)
+            if match is not None:
+                number = match.group(3)
+                if number is not None:
+                    issue = server.issues_by_number.get(int(number))
+                    if issue is None:
+                        self._send_json(404, {"message": "Not Found"})
+                    else:
+                        self._send_json(200, issue)
+                    return
+                state = query.get("state", ["open"])[0]
+                since = query.get("since", [""])[0]
+                issues = [issue for issue in server.issues
+                          if (state == "all" or issue["state"] == state) and issue["updated_at"] >= since]
+                sort_key = "updated_at" if query.get("sort", ["created"])[0] == "updated" else "created_at"
+                issues.sort(key=lambda issue: (issue[sort_key], issue["number"]),
+                            reverse=query.get("direction", ["desc"])[0] == "desc")
+                page, headers = self._paginate(issues, query)
+                self._send_json(200, page, headers)
+                return
+
+            if parsed.path == "/search/code":
+                terms = [term.lower() for term in query.get("q", [""])[0].split() if ":" not in term]
+                if not terms:
+                    self._send_json(422, {"message": "Validation Failed"})
+                    return
+                matches = []
+                for path, words in server.files:
+                    score = sum(term in words or term in path for term in terms)
+                    if score == len(terms):
+                        matches.append({"name": path.rsplit("/", 1)[-1], "path": path,
+                                        "html_url": f"https://github.com/fake/blob/main/{path}", "score": float(score)})
+                page, headers = self._paginate(matches, query)
+                self._send_json(200, {"total_count": len(matches), "incomplete_results": False, "items": page}, headers)
+                return
+
+            self._send_json(404, {"message": "Not Found"})
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away mid-response
+            pass
+        finally:
+            server._update_stats(in_flight=-1)
+
+def start_fake_github_server(host="127.0.0.1", port=0, **options):
+    """
+    Start a fake GitHub server in a background thread.
+
+    Args:
+        host (str, optional): Interface to bind. Defaults to "127.0.0.1".
+        port (int, optional): Port to bind; 0 picks a free port. Defaults to 0.
+        **options: FakeGitHubServer options (issues, files, latency).
+
+    Returns:
+        FakeGitHubServer: The running server; call shutdown() to stop it.
+    """
+    server = FakeGitHubServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True, name="fake-github-server").start()
+    return server
+
+def main():
+    """Run a fake GitHub server in the foreground."""
+    parser = argparse.ArgumentParser(description="Local stand-in for the GitHub REST API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--issues", type=int, default=250, help="Issues and pull requests per repository")
+    parser.add_argument("--files", type=int, default=120, help="Files searchable with code search")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Added to every request")
+    args = parser.parse_args()
+
+    server = FakeGitHubServer((args.host, args.port), issues=args.issues, files=args.files,
+                              latency=args.latency_ms / 1000)
+    print(f"Fake GitHub server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
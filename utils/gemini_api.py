@@ -1,12 +1,18 @@
 """
 Gemini API integration for the LLM Evolution Explorer application.
 """
-import google.generativeai as genai
+import asyncio
+import time
 from utils.config import get_config
+from utils.generation_client import GenerationError, get_generation_client
+from utils.llm_backend import get_llm_backend
+from utils.model_registry import get_model_registry
+from utils.response_cache import get_response_cache, make_cache_key
+from utils.tracing import get_tracer, traced
 
 def initialize_gemini():
     """
-    Initialize the Gemini API with the API key from configuration.
+    Initialize the configured LLM backend with the API key from configuration.
     
     Returns:
         bool: True if initialization was successful, False otherwise.
@@ -18,9 +24,11 @@ def initialize_gemini():
         return False
     
     try:
-        genai.configure(api_key=api_key)
-        # Test if we can list models
-        genai.list_models()
+        get_llm_backend().configure(api_key)
+        # Test if we can list models, which also warms the model catalog
+        registry = get_model_registry()
+        registry.reset()
+        registry.refresh()
         return True
     except Exception as e:
         print(f"Error initializing Gemini API: {str(e)}")
@@ -30,17 +38,107 @@ def get_available_models():
     """
     Get the list of available Gemini models.
     
+    The list is served from the cached model catalog, so Streamlit reruns
+    don't pay a list_models() round trip.
+    
     Returns:
         list: List of available model names.
     """
+    return get_model_registry().list_models()
+
+def build_rag_prompt(prompt, context):
+    """
+    Build a RAG-enhanced prompt from a question and its context.
+    
+    Args:
+        prompt (str): The question to answer.
+        context (str): The context to use for RAG.
+    
+    Returns:
+        str: The RAG-enhanced prompt.
+    """
+    return f"""
+    Context information:
+    {context}
+    
+    Based on the above context, please answer the following question:
+    {prompt}
+    
+    If the answer is not in the context, please say so. When using information from the context, cite the relevant parts.
+    """
+
+# Requested model -> the model that last answered in its place, so cached fallback answers are found
+_answering_models = {}
+
+def _record_answering_model(model_name, used_model):
+    if used_model != model_name:
+        _answering_models[model_name] = used_model
+    else:
+        _answering_models.pop(model_name, None)
+
+def _cache_lookup(cache, model_name, cache_key):
+    """
+    Look up a response in the cache, under the requested model and then under
+    the model that last answered in its place.
+    
+    Args:
+        cache (ResponseCache): The response cache.
+        model_name (str): The requested model.
+        cache_key (callable): Returns the response cache key of this request
+            for a model name.
+    
+    Returns:
+        str: The cached response, with the "[Using model: ...]" notice if a
+        fallback model produced it, or None on a miss.
+    """
+    with get_tracer().span("response_cache.get") as span:
+        cached = cache.get(cache_key(model_name))
+        fallback_model = _answering_models.get(model_name)
+        if cached is None and fallback_model is not None:
+            cached = cache.get(cache_key(fallback_model))
+            if cached is not None:
+                cached = f"[Using model: {fallback_model}] " + cached
+        span["hit"] = cached is not None
+    return cached
+
+def _generate(prompt, model_name, label, cache_key):
+    """
+    Generate a response through the response cache and the generation client.
+    
+    Fallback to alternative models (raced concurrently) and request hedging
+    are handled by the generation client.
+    
+    Args:
+        prompt (str): The full prompt to send to Gemini.
+        model_name (str): The model to try first.
+        label (str): Name of the response kind used in error messages.
+        cache_key (callable): Returns the response cache key of this request
+            for a model name.
+    
+    Returns:
+        str: The generated response, or an error message.
+    """
+    cache = get_response_cache()
+    if cache is not None:
+        cached = _cache_lookup(cache, model_name, cache_key)
+        if cached is not None:
+            return cached
+    
     try:
-        models = [model.name for model in genai.list_models() 
-                 if "generateContent" in model.supported_generation_methods]
-        return models
-    except Exception:
-        # Return default models if API call fails
-        return get_config()["available_models"]
+        text, used_model = get_generation_client().generate(prompt, model_name)
+    except GenerationError as e:
+        return f"Error generating {label}: {str(e)}. Please try a different model or check your API key."
+    
+    # Cache the answer under the model that produced it, so a fallback answer
+    # isn't served later as if the requested model had given it
+    _record_answering_model(model_name, used_model)
+    if cache is not None:
+        cache.put(cache_key(used_model), text)
+    if used_model != model_name:
+        text = f"[Using model: {used_model}] " + text
+    return text
 
+@traced()
 def generate_response(prompt, model_name=None):
     """
     Generate a response from Gemini for a given prompt.
@@ -55,30 +153,9 @@ def generate_response(prompt, model_name=None):
     if not model_name:
         model_name = get_config()["default_model"]
     
-    # Try with the specified model first
-    try:
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        error_msg = str(e)
-        print(f"Error with model {model_name}: {error_msg}")
-        
-        # If the specified model fails, try other available models
-        if "not found" in error_msg or "not supported" in error_msg:
-            available_models = get_config()["available_models"]
-            for alt_model in available_models:
-                if alt_model != model_name:
-                    try:
-                        print(f"Trying alternative model: {alt_model}")
-                        model = genai.GenerativeModel(alt_model)
-                        response = model.generate_content(prompt)
-                        return f"[Using model: {alt_model}] " + response.text
-                    except Exception as alt_e:
-                        print(f"Error with alternative model {alt_model}: {str(alt_e)}")
-        
-        return f"Error generating response: {error_msg}. Please try a different model or check your API key."
+    return _generate(prompt, model_name, "response", lambda model: make_cache_key(model, prompt))
 
+@traced()
 def generate_rag_response(prompt, context, model_name=None):
     """
     Generate a RAG-enhanced response from Gemini for a given prompt and context.
@@ -95,36 +172,208 @@ def generate_rag_response(prompt, context, model_name=None):
         model_name = get_config()["default_model"]
     
     # Create a RAG-enhanced prompt
-    rag_prompt = f"""
-    Context information:
-    {context}
+    rag_prompt = build_rag_prompt(prompt, context)
     
-    Based on the above context, please answer the following question:
-    {prompt}
+    return _generate(rag_prompt, model_name, "RAG response", lambda model: make_cache_key(model, prompt, context, kind="rag"))
+
+class ResponseStream:
+    """
+    Iterable over the text chunks of a streamed response that records its timing.
     
-    If the answer is not in the context, please say so. When using information from the context, cite the relevant parts.
+    Consuming the stream is recorded as a "response_stream" span of the
+    current trace.
+    
+    Attributes:
+        text (str): The full response text, available once iteration completes.
+        time_to_first_token (float): Seconds from the start of iteration to the first chunk.
+        total_time (float): Seconds from the start of iteration to the last chunk.
+        cache_hit (bool): Whether the response was served from the response cache,
+            or None if caching is disabled.
     """
+    def __init__(self, chunks, cache_hit=None):
+        self._chunks = chunks
+        self.cache_hit = cache_hit
+        self.text = ""
+        self.time_to_first_token = None
+        self.total_time = None
+    
+    def __iter__(self):
+        start = time.perf_counter()
+        parts = []
+        try:
+            for chunk in self._chunks:
+                if self.time_to_first_token is None:
+                    self.time_to_first_token = time.perf_counter() - start
+                parts.append(chunk)
+                yield chunk
+        finally:
+            end = time.perf_counter()
+            self.text = "".join(parts)
+            self.total_time = end - start
+            get_tracer().record_span(
+                "response_stream", start, end,
+                cache_hit=self.cache_hit,
+                time_to_first_token_ms=None if self.time_to_first_token is None else self.time_to_first_token * 1000
+            )
+
+def _stream(prompt, model_name, label, cache_key):
+    """
+    Stream a response through the generation client, caching it once complete.
+    
+    Args:
+        prompt (str): The full prompt to send to Gemini.
+        model_name (str): The model to try first.
+        label (str): Name of the response kind used in error messages.
+        cache_key (callable): Returns the response cache key of this request
+            for a model name.
+    
+    Yields:
+        str: Text chunks of the response.
+    """
+    try:
+        chunks, used_model = get_generation_client().generate(prompt, model_name, stream=True)
+    except GenerationError as e:
+        yield f"Error generating {label}: {str(e)}. Please try a different model or check your API key."
+        return
     
-    # Try with the specified model first
+    if used_model != model_name:
+        yield f"[Using model: {used_model}] "
+    parts = []
     try:
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(rag_prompt)
-        return response.text
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
     except Exception as e:
-        error_msg = str(e)
-        print(f"Error with model {model_name} for RAG: {error_msg}")
-        
-        # If the specified model fails, try other available models
-        if "not found" in error_msg or "not supported" in error_msg:
-            available_models = get_config()["available_models"]
-            for alt_model in available_models:
-                if alt_model != model_name:
-                    try:
-                        print(f"Trying alternative model for RAG: {alt_model}")
-                        model = genai.GenerativeModel(alt_model)
-                        response = model.generate_content(rag_prompt)
-                        return f"[Using model: {alt_model}] " + response.text
-                    except Exception as alt_e:
-                        print(f"Error with alternative model {alt_model} for RAG: {str(alt_e)}")
-        
-        return f"Error generating RAG response: {error_msg}. Please try a different model or check your API key."
+        # Part of the answer has already been shown, so don't restart with another model
+        yield f"\n\n[Response interrupted: {str(e)}]"
+        return
+    
+    # Cache the answer under the model that produced it, without the fallback notice
+    _record_answering_model(model_name, used_model)
+    cache = get_response_cache()
+    if cache is not None:
+        cache.put(cache_key(used_model), "".join(parts))
+
+def _cached_stream(prompt, model_name, label, cache_key):
+    """
+    Create a response stream, serving it from the response cache on a hit.
+    
+    Args:
+        prompt (str): The full prompt to send to Gemini.
+        model_name (str): The model to try first.
+        label (str): Name of the response kind used in error messages.
+        cache_key (callable): Returns the response cache key of this request
+            for a model name.
+    
+    Returns:
+        ResponseStream: Iterable over the response text chunks.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return ResponseStream(_stream(prompt, model_name, label, cache_key))
+    
+    cached = _cache_lookup(cache, model_name, cache_key)
+    if cached is not None:
+        return ResponseStream(iter([cached]), cache_hit=True)
+    return ResponseStream(_stream(prompt, model_name, label, cache_key), cache_hit=False)
+
+@traced()
+def generate_response_stream(prompt, model_name=None):
+    """
+    Stream a response from Gemini for a given prompt.
+    
+    Args:
+        prompt (str): The prompt to send to Gemini.
+        model_name (str, optional): The model to use. Defaults to None, which uses the default model.
+    
+    Returns:
+        ResponseStream: Iterable over the response text chunks.
+    """
+    if not model_name:
+        model_name = get_config()["default_model"]
+    
+    return _cached_stream(prompt, model_name, "response", lambda model: make_cache_key(model, prompt))
+
+@traced()
+def generate_rag_response_stream(prompt, context, model_name=None):
+    """
+    Stream a RAG-enhanced response from Gemini for a given prompt and context.
+    
+    Args:
+        prompt (str): The prompt to send to Gemini.
+        context (str): The context to use for RAG.
+        model_name (str, optional): The model to use. Defaults to None, which uses the default model.
+    
+    Returns:
+        ResponseStream: Iterable over the response text chunks.
+    """
+    if not model_name:
+        model_name = get_config()["default_model"]
+    
+    return _cached_stream(build_rag_prompt(prompt, context), model_name, "RAG response",
+                          lambda model: make_cache_key(model, prompt, context, kind="rag"))
+
+class TokenBucket:
+    """
+    Asyncio token-bucket rate limiter.
+    
+    Args:
+        rate (float): Tokens added per second.
+        capacity (float, optional): Maximum burst size. Defaults to one second's worth of tokens.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until a token is available and consume it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+async def generate_many(prompts, model_name=None, max_concurrency=8, rate_limit=None):
+    """
+    Generate responses for many prompts concurrently with the backend's async API.
+    
+    At most max_concurrency requests are in flight at once, and requests are
+    started no faster than rate_limit per second. A failing prompt does not
+    affect the others: its error is recorded in its own result.
+    
+    Args:
+        prompts (list): The prompts to send to Gemini.
+        model_name (str, optional): The model to use. Defaults to None, which uses the default model.
+        max_concurrency (int, optional): Maximum number of requests in flight. Defaults to 8.
+        rate_limit (float, optional): Maximum requests started per second. Defaults to None (unlimited).
+    
+    Returns:
+        list: One dict per prompt, in the same order as prompts, with "text",
+        "error" and "latency" (seconds) keys.
+    """
+    if not model_name:
+        model_name = get_config()["default_model"]
+    
+    backend = get_llm_backend()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    bucket = TokenBucket(rate_limit) if rate_limit else None
+    
+    async def generate_one(prompt):
+        async with semaphore:
+            if bucket is not None:
+                await bucket.acquire()
+            start = time.perf_counter()
+            try:
+                text = await backend.generate_async(model_name, prompt)
+                return {"text": text, "error": None, "latency": time.perf_counter() - start}
+            except Exception as e:
+                return {"text": None, "error": str(e), "latency": time.perf_counter() - start}
+    
+    return await asyncio.gather(*(generate_one(prompt) for prompt in prompts))
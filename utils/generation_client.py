@@ -0,0 +1,191 @@
+"""
+Unified generation client with concurrent model fallback for the LLM Evolution Explorer application.
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from utils.config import get_config
+from utils.llm_backend import get_llm_backend
+from utils.tracing import get_tracer
+
+LATENCY_WINDOW = 100
+
+class GenerationError(Exception):
+    """Raised when no model could generate a response."""
+
+def is_model_unavailable(error):
+    """
+    Check whether an error means the model itself is unavailable.
+
+    Args:
+        error (Exception): The error raised by a model call.
+
+    Returns:
+        bool: True if another model should be tried.
+    """
+    error_msg = str(error)
+    return "not found" in error_msg or "not supported" in error_msg
+
+def call_backend(model_name, prompt, stream=False):
+    """
+    Call a model once through the configured LLM backend.
+
+    Args:
+        model_name (str): The model to call.
+        prompt (str): The full prompt.
+        stream (bool, optional): Whether to stream the response. Defaults to False.
+
+    Returns:
+        str or generator: The response text, or a generator of text chunks when streaming.
+    """
+    return get_llm_backend().generate(model_name, prompt, stream)
+
+def _close_result(future):
+    """Release the result of a losing attempt once it finishes."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    if hasattr(result, "close"):
+        result.close()
+
+class GenerationClient:
+    """
+    Generation client that races fallback models and hedges slow requests.
+
+    The requested model is always tried first. If it reports that it is not
+    found or not supported, every alternative model is started at once and the
+    first good answer wins; the remaining attempts are cancelled (or their
+    results discarded if already in flight). When hedging is enabled, a second
+    copy of the request is sent once the primary has been running longer than
+    the configured percentile of that model's recent latencies.
+    """
+    def __init__(self, call_model=None, fallback_models=None, max_workers=8,
+                 hedge_percentile=None, hedge_min_samples=20):
+        self.call_model = call_model or call_backend
+        self.fallback_models = fallback_models
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="generation")
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def _record_latency(self, model_name, latency):
+        with self._lock:
+            self._latencies.setdefault(model_name, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+    def latency_percentile(self, model_name, percentile):
+        """
+        Get a percentile of the recent successful latencies of a model.
+
+        Args:
+            model_name (str): The model name.
+            percentile (float): Percentile between 0 and 100.
+
+        Returns:
+            float: The latency in seconds, or None if there are too few samples.
+        """
+        with self._lock:
+            samples = sorted(self._latencies.get(model_name, ()))
+        if len(samples) < self.hedge_min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return samples[index]
+
+    def _timed_call(self, model_name, prompt, stream, attempt):
+        with get_tracer().span("model_call", model=model_name, stream=stream, attempt=attempt):
+            start = time.perf_counter()
+            result = self.call_model(model_name, prompt, stream)
+            self._record_latency(model_name, time.perf_counter() - start)
+            return result
+
+    def _submit(self, model_name, prompt, stream, attempt="primary"):
+        # Run in a copy of the caller's context so the call is traced as part of its request
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, self._timed_call, model_name, prompt, stream, attempt)
+
+    def generate(self, prompt, model_name, stream=False):
+        """
+        Generate a response, falling back to other models if needed.
+
+        Args:
+            prompt (str): The full prompt.
+            model_name (str): The model to try first.
+            stream (bool, optional): Whether to stream the response. Defaults to False.
+
+        Returns:
+            tuple: The response (text, or a generator of text chunks when
+            streaming) and the name of the model that produced it.
+
+        Raises:
+            GenerationError: If every attempted model failed.
+        """
+        fallback_models = self.fallback_models
+        if fallback_models is None:
+            fallback_models = get_config()["available_models"]
+
+        start = time.perf_counter()
+        pending = {self._submit(model_name, prompt, stream): model_name}
+        hedge_delay = None
+        if self.hedge_percentile is not None:
+            hedge_delay = self.latency_percentile(model_name, self.hedge_percentile)
+        fallback_started = False
+        first_error = None
+
+        while pending:
+            timeout = None
+            if hedge_delay is not None:
+                timeout = max(0.0, hedge_delay - (time.perf_counter() - start))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # The primary is slower than usual: send a hedged copy
+                print(f"Hedging slow request to model {model_name} after {hedge_delay:.2f}s")
+                pending[self._submit(model_name, prompt, stream, "hedge")] = model_name
+                hedge_delay = None
+                continue
+
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error with model {name}: {str(e)}")
+                    if first_error is None:
+                        first_error = e
+                    if not fallback_started and is_model_unavailable(e):
+                        # Race every alternative model instead of trying them one by one
+                        fallback_started = True
+                        hedge_delay = None
+                        for alt_model in fallback_models:
+                            if alt_model != model_name:
+                                print(f"Trying alternative model: {alt_model}")
+                                pending[self._submit(alt_model, prompt, stream, "fallback")] = alt_model
+                    continue
+
+                for other in pending:
+                    if not other.cancel():
+                        other.add_done_callback(_close_result)
+                return result, name
+
+        raise GenerationError(str(first_error))
+
+_client = None
+
+def get_generation_client():
+    """
+    Get the process-wide generation client, creating it on first use.
+
+    Returns:
+        GenerationClient: The generation client.
+    """
+    global _client
+    if _client is None:
+        config = get_config()
+        _client = GenerationClient(
+            max_workers=config["generation_max_workers"],
+            hedge_percentile=config["hedge_percentile"],
+            hedge_min_samples=config["hedge_min_samples"]
+        )
+    return _client
@@ -1,155 +1,549 @@
 """
-GitHub integration using Model Context Protocol for the LLM Evolution Explorer application.
+GitHub integration for the LLM Evolution Explorer application.
+
+Issues and code search results are read from the GitHub REST API through one
+pooled HTTP session. Responses are cached on disk with their ETags and
+revalidated with conditional requests, so unchanged data comes back as a 304
+(which doesn't count against the rate limit) and is served from the cache.
+Paginated results are fetched concurrently once the first page's Link header
+gives the page count. Issues are also kept in a local full-text index
+(utils.issue_index) that is synced incrementally, so the agent can look up
+relevant issues without listing the whole repository. Set "github_api_url" in
+utils/config.py to the address of utils.fake_github_server to run offline.
 """
-# Fix import error by using a mock implementation since the MCP Client is not available
-# in the current version of the MCP SDK
-import subprocess
+import asyncio
+import hashlib
 import os
-import json
+import re
+import threading
+import time
+from urllib.parse import parse_qs, urlencode, urlparse
 from utils.config import get_config
+from utils.disk_cache import DiskCache
+from utils.issue_index import get_issue_index
+from utils.tracing import get_tracer, traced
+
+LINK_PATTERN = re.compile(r'<([^>]+)>;\s*rel="(\w+)"')
+
+class GitHubAPIError(Exception):
+    """Raised when the GitHub API answers with an error status."""
+    def __init__(self, status, message):
+        super().__init__(f"{status} {message}")
+        self.status = status
+
+def parse_link_header(header):
+    """
+    Parse a GitHub Link header.
+
+    Args:
+        header (str): The header value, e.g. '<https://...&page=2>; rel="next", ...'.
+
+    Returns:
+        dict: Relation ("next", "last", ...) -> URL.
+    """
+    return {rel: url for url, rel in LINK_PATTERN.findall(header or "")}
+
+def parse_repo_url(repo_url):
+    """
+    Extract the owner and repository name from a GitHub repository URL.
+
+    Args:
+        repo_url (str): URL such as https://github.com/owner/repository.
+
+    Returns:
+        tuple: (owner, name), or None if the URL has no owner and name.
+    """
+    parts = repo_url.rstrip("/").split("/")
+    if len(parts) < 5:
+        return None
+    name = parts[-1][:-4] if parts[-1].endswith(".git") else parts[-1]
+    return parts[-2], name
+
+class GitHubClient:
+    """
+    Client for the GitHub REST API with conditional requests.
+
+    Requests go through one pooled requests.Session, and the async methods
+    run them on worker threads, so concurrent page fetches reuse keep-alive
+    connections whichever event loop they are awaited from.
+    """
+    def __init__(self, api_url, token=None, cache=None, timeout=10, pool_size=16, per_page=100, max_pages=10):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.api_url = api_url.rstrip("/")
+        self.cache = cache
+        self.timeout = timeout
+        self.per_page = per_page
+        self.max_pages = max_pages
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "User-Agent": "llm-evolution-explorer",
+        })
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "not_modified": 0, "rate_limit_remaining": None}
+
+    def _update_stats(self, response):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["not_modified"] += response.status_code == 304
+            remaining = response.headers.get("X-RateLimit-Remaining")
+            if remaining is not None:
+                self.stats["rate_limit_remaining"] = int(remaining)
+
+    def get(self, path, params=None):
+        """
+        GET an API resource, revalidating a cached copy with its ETag.
+
+        Args:
+            path (str): API path, e.g. "/repos/owner/name/issues", or a full URL.
+            params (dict, optional): Query parameters. Defaults to None.
+
+        Returns:
+            tuple: The decoded JSON body and the parsed Link header.
+        """
+        url = path if path.startswith("http") else f"{self.api_url}{path}"
+        if params:
+            url = f"{url}?{urlencode(params)}"
+        key = hashlib.sha256(url.encode()).hexdigest()
+        entry = self.cache.get(key) if self.cache is not None else None
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        with get_tracer().span("github_request", path=urlparse(url).path) as attributes:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            attributes["status"] = response.status_code
+        self._update_stats(response)
+
+        if response.status_code == 304 and entry is not None:
+            return entry["body"], entry["links"]
+        if response.status_code != 200:
+            try:
+                message = response.json().get("message", response.text)
+            except ValueError:
+                message = response.text
+            raise GitHubAPIError(response.status_code, message)
+
+        body = response.json()
+        links = parse_link_header(response.headers.get("Link"))
+        if self.cache is not None and (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+            self.cache.put(key, {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "links": links,
+                "body": body,
+            })
+        return body, links
+
+    async def get_async(self, path, params=None):
+        """
+        GET an API resource without blocking the event loop.
+
+        Args:
+            path (str): API path or full URL.
+            params (dict, optional): Query parameters. Defaults to None.
+
+        Returns:
+            tuple: The decoded JSON body and the parsed Link header.
+        """
+        return await asyncio.to_thread(self.get, path, params)
+
+    async def get_paginated(self, path, params=None, items_key=None, per_page=None, max_pages=None):
+        """
+        GET every page of a paginated resource, up to max_pages.
+
+        The first page is fetched alone; its Link header gives the last page
+        number, and the remaining pages are then fetched concurrently.
+
+        Args:
+            path (str): API path.
+            params (dict, optional): Query parameters. Defaults to None.
+            items_key (str, optional): Key holding the items in each page, e.g.
+                "items" for search results. Defaults to None for list pages.
+            per_page (int, optional): Items per page. Defaults to None, which
+                uses the client's per_page.
+            max_pages (int, optional): Maximum number of pages. Defaults to
+                None, which uses the client's max_pages.
+
+        Returns:
+            list: The items of all pages, in page order.
+        """
+        params = dict(params or {}, per_page=per_page or self.per_page)
+        body, links = await self.get_async(path, dict(params, page=1))
+        pages = [body]
+
+        last_page = 1
+        if "last" in links:
+            last_page = int(parse_qs(urlparse(links["last"]).query).get("page", ["1"])[0])
+        last_page = min(last_page, max_pages or self.max_pages)
+        if last_page > 1:
+            rest = await asyncio.gather(*(
+                self.get_async(path, dict(params, page=page)) for page in range(2, last_page + 1)
+            ))
+            pages.extend(page_body for page_body, _ in rest)
+
+        items = []
+        for page in pages:
+            items.extend(page[items_key] if items_key else page)
+        return items
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_github_client():
+    """
+    Get the process-wide GitHub client, creating it on first use.
+
+    Returns:
+        GitHubClient: The client.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            config = get_config()
+            _client = GitHubClient(
+                config["github_api_url"],
+                token=config["github_token"],
+                cache=DiskCache(
+                    os.path.join(config["temp_folder"], "github_cache"),
+                    config["github_cache_max_mb"] * 1024 * 1024,
+                    name="GitHub cache"
+                ),
+                timeout=config["github_timeout"],
+                pool_size=config["github_max_connections"],
+                per_page=config["github_per_page"],
+                max_pages=config["github_max_pages"]
+            )
+        return _client
+
+def _issue_summary(issue):
+    return {
+        "number": issue["number"],
+        "title": issue["title"],
+        "state": issue["state"],
+        "created_at": issue["created_at"],
+        "body": issue.get("body") or "",
+    }
 
 class GitHubTool:
     """
-    Mock GitHub integration tool for demonstration purposes.
+    GitHub integration tool for a single repository.
     """
-    def __init__(self):
+    def __init__(self, client=None, index=None):
         self.config = get_config()
         self.repo_url = self.config["github_repo"]
-        
+        self.client = client or get_github_client()
+        self.index = index or get_issue_index()
+
     def initialize_client(self):
         """
-        Mock initialization of the client.
-        
+        Check that the GitHub client is set up.
+
+        Returns:
+            bool: True if the client is ready.
+        """
+        return self.client is not None
+
+    def index_key(self, repo_owner, repo_name):
+        """
+        Get the key of a repository in the issue index.
+
+        The key includes the API host, so issues synced from a fake server
+        never mix with those of the real repository.
+
+        Args:
+            repo_owner (str): Repository owner.
+            repo_name (str): Repository name.
+
         Returns:
-            bool: Always returns True for demonstration.
+            str: The key, e.g. "api.github.com/owner/name".
         """
-        print("Mock GitHub client initialized")
-        return True
-    
-    async def list_repository_issues(self, repo_owner=None, repo_name=None):
+        return f"{urlparse(self.client.api_url).netloc}/{repo_owner}/{repo_name}"
+
+    def _resolve_repo(self, repo_owner, repo_name):
+        # If repo_owner and repo_name are not provided, extract from the repository URL
+        if repo_owner and repo_name:
+            return repo_owner, repo_name
+        return parse_repo_url(self.repo_url)
+
+    @traced("GitHubTool.list_repository_issues")
+    async def list_repository_issues(self, repo_owner=None, repo_name=None, state="all", limit=None):
         """
-        Mock method to list issues from a GitHub repository.
-        
+        List the issues of a GitHub repository, newest first. Pull requests are left out.
+
         Args:
             repo_owner (str, optional): Repository owner. Defaults to None.
             repo_name (str, optional): Repository name. Defaults to None.
-            
+            state (str, optional): "open", "closed" or "all". Defaults to "all".
+            limit (int, optional): Maximum number of issues. Only the pages
+                needed for them are fetched, so fewer may be returned when some
+                of the newest items are pull requests. Defaults to None, which
+                lists up to the client's max_pages.
+
         Returns:
-            list: Mock list of issues.
-        """
-        # If repo_owner and repo_name are not provided, extract from config
-        if not repo_owner or not repo_name:
-            parts = self.repo_url.split('/')
-            if len(parts) >= 5:
-                repo_owner = parts[-2]
-                repo_name = parts[-1]
-            else:
-                return "Invalid repository URL format"
-        
-        # Return mock data
-        mock_issues = [
-            {
-                "number": 465,
-                "title": "Fix tests for Pydantic 2.11",
-                "state": "closed",
-                "created_at": "2025-03-15T10:23:45Z",
-                "body": "Tests are failing with the latest Pydantic version."
-            },
-            {
-                "number": 471,
-                "title": "Match ruff version on CI and local",
-                "state": "closed",
-                "created_at": "2025-03-20T14:12:33Z",
-                "body": "We need to ensure consistent linting between CI and local development."
-            },
-            {
-                "number": 474,
-                "title": "Support custom client info throughout client APIs",
-                "state": "open",
-                "created_at": "2025-03-25T09:45:21Z",
-                "body": "Add support for custom client information in all client APIs."
-            }
-        ]
-        return mock_issues
-    
+            list: Issue dicts with "number", "title", "state", "created_at" and
+            "body", or an error message string.
+        """
+        repo = self._resolve_repo(repo_owner, repo_name)
+        if repo is None:
+            return "Invalid repository URL format"
+        repo_owner, repo_name = repo
+
+        pages = {}
+        if limit:
+            per_page = min(self.client.per_page, limit)
+            pages = {"per_page": per_page, "max_pages": -(-limit // per_page)}
+        try:
+            items = await self.client.get_paginated(f"/repos/{repo_owner}/{repo_name}/issues", {"state": state}, **pages)
+        except Exception as e:
+            print(f"Error listing issues of {repo_owner}/{repo_name}: {str(e)}")
+            return f"Error listing issues: {str(e)}"
+        return [_issue_summary(item) for item in items if "pull_request" not in item][:limit]
+
+    @traced("GitHubTool.get_issue_content")
     async def get_issue_content(self, issue_number, repo_owner=None, repo_name=None):
         """
-        Mock method to get content of a specific issue from a GitHub repository.
-        
+        Get the content of a specific issue from a GitHub repository.
+
         Args:
             issue_number (int): Issue number.
             repo_owner (str, optional): Repository owner. Defaults to None.
             repo_name (str, optional): Repository name. Defaults to None.
-            
+
         Returns:
-            dict: Mock issue content.
-        """
-        # If repo_owner and repo_name are not provided, extract from config
-        if not repo_owner or not repo_name:
-            parts = self.repo_url.split('/')
-            if len(parts) >= 5:
-                repo_owner = parts[-2]
-                repo_name = parts[-1]
-            else:
-                return "Invalid repository URL format"
-        
-        # Return mock data based on issue number
-        if issue_number == 465:
-            return {
-                "number": 465,
-                "title": "Fix tests for Pydantic 2.11",
-                "state": "closed",
-                "created_at": "2025-03-15T10:23:45Z",
-                "body": "Tests are failing with the latest Pydantic version. We need to update our test suite to be compatible with Pydantic 2.11.",
-                "comments": 5,
-                "labels": ["bug", "testing"]
-            }
-        elif issue_number == 471:
-            return {
-                "number": 471,
-                "title": "Match ruff version on CI and local",
-                "state": "closed",
-                "created_at": "2025-03-20T14:12:33Z",
-                "body": "We need to ensure consistent linting between CI and local development by pinning the ruff version.",
-                "comments": 3,
-                "labels": ["ci", "tooling"]
-            }
-        elif issue_number == 474:
-            return {
-                "number": 474,
-                "title": "Support custom client info throughout client APIs",
-                "state": "open",
-                "created_at": "2025-03-25T09:45:21Z",
-                "body": "Add support for custom client information in all client APIs to improve traceability and debugging.",
-                "comments": 8,
-                "labels": ["enhancement", "api"]
-            }
-        else:
-            return f"Issue #{issue_number} not found"
-    
+            dict: The issue summary plus "comments" (the comment count) and
+            "labels" (label names), or an error message string.
+        """
+        repo = self._resolve_repo(repo_owner, repo_name)
+        if repo is None:
+            return "Invalid repository URL format"
+        repo_owner, repo_name = repo
+
+        try:
+            issue, _ = await self.client.get_async(f"/repos/{repo_owner}/{repo_name}/issues/{issue_number}")
+        except GitHubAPIError as e:
+            if e.status == 404:
+                return f"Issue #{issue_number} not found"
+            print(f"Error getting issue #{issue_number} of {repo_owner}/{repo_name}: {str(e)}")
+            return f"Error getting issue: {str(e)}"
+        except Exception as e:
+            print(f"Error getting issue #{issue_number} of {repo_owner}/{repo_name}: {str(e)}")
+            return f"Error getting issue: {str(e)}"
+
+        content = _issue_summary(issue)
+        content["comments"] = issue.get("comments", 0)
+        content["labels"] = [label["name"] for label in issue.get("labels", [])]
+        return content
+
+    @traced("GitHubTool.sync_issues")
+    async def sync_issues(self, repo_owner=None, repo_name=None):
+        """
+        Bring the local issue index of a repository up to date.
+
+        Only issues updated since the last sync's watermark are requested,
+        oldest first. If a sync hits the page limit, it continues from the new
+        watermark until it has caught up.
+
+        Args:
+            repo_owner (str, optional): Repository owner. Defaults to None.
+            repo_name (str, optional): Repository name. Defaults to None.
+
+        Returns:
+            dict: "fetched" (issues and pull requests received), "indexed" (issues
+            in the index) and "watermark", or an error message string.
+        """
+        repo = self._resolve_repo(repo_owner, repo_name)
+        if repo is None:
+            return "Invalid repository URL format"
+        repo_owner, repo_name = repo
+        key = self.index_key(repo_owner, repo_name)
+
+        state = await asyncio.to_thread(self.index.get_sync_state, key)
+        watermark = state["watermark"] if state else None
+        fetched = 0
+        while True:
+            params = {"state": "all", "sort": "updated", "direction": "asc"}
+            if watermark:
+                params["since"] = watermark
+            try:
+                items = await self.client.get_paginated(f"/repos/{repo_owner}/{repo_name}/issues", params)
+            except Exception as e:
+                print(f"Error syncing issues of {repo_owner}/{repo_name}: {str(e)}")
+                return f"Error syncing issues: {str(e)}"
+            fetched += len(items)
+
+            issues = [item for item in items if "pull_request" not in item]
+            await asyncio.to_thread(self.index.upsert, key, issues)
+            latest = max((item["updated_at"] for item in items), default=None)
+            caught_up = len(items) < self.client.per_page * self.client.max_pages
+            if latest is None or latest == watermark or caught_up:
+                watermark = latest or watermark
+                break
+            watermark = latest
+
+        await asyncio.to_thread(self.index.set_sync_state, key, watermark)
+        return {"fetched": fetched, "indexed": await asyncio.to_thread(self.index.count, key), "watermark": watermark}
+
+    @traced("GitHubTool.search_issues")
+    async def search_issues(self, query, state=None, labels=None, limit=None, repo_owner=None, repo_name=None):
+        """
+        Find the issues of a repository that are relevant to a query.
+
+        The local index is synced first if its last sync is older than
+        "issue_sync_interval". If the sync fails, the index is searched as it is.
+
+        Args:
+            query (str): Free-text query.
+            state (str, optional): "open" or "closed"; None or "all" for both. Defaults to None.
+            labels (list, optional): Only issues with all of these labels. Defaults to None.
+            limit (int, optional): Maximum number of issues. Defaults to None,
+                which uses the "issue_search_limit" setting.
+            repo_owner (str, optional): Repository owner. Defaults to None.
+            repo_name (str, optional): Repository name. Defaults to None.
+
+        Returns:
+            list: Issue dicts ranked by relevance (see IssueIndex.search), or an
+            error message string.
+        """
+        repo = self._resolve_repo(repo_owner, repo_name)
+        if repo is None:
+            return "Invalid repository URL format"
+        repo_owner, repo_name = repo
+        key = self.index_key(repo_owner, repo_name)
+
+        sync_state = await asyncio.to_thread(self.index.get_sync_state, key)
+        if sync_state is None or time.time() - sync_state["synced_at"] > self.config["issue_sync_interval"]:
+            synced = await self.sync_issues(repo_owner, repo_name)
+            if isinstance(synced, str) and sync_state is None:
+                return synced
+
+        return await asyncio.to_thread(
+            self.index.search, key, query, state, labels, None, limit or self.config["issue_search_limit"]
+        )
+
+    @traced("GitHubTool.search_code")
+    async def search_code(self, query, repo_owner=None, repo_name=None):
+        """
+        Search for code in a GitHub repository. The GitHub API requires a token for code search.
+
+        Args:
+            query (str): Search terms.
+            repo_owner (str, optional): Repository owner. Defaults to None.
+            repo_name (str, optional): Repository name. Defaults to None.
+
+        Returns:
+            list: Matches with "name", "path", "url" and "score", best first,
+            or an error message string.
+        """
+        repo = self._resolve_repo(repo_owner, repo_name)
+        if repo is None:
+            return "Invalid repository URL format"
+        repo_owner, repo_name = repo
+
+        try:
+            items = await self.client.get_paginated(
+                "/search/code", {"q": f"{query} repo:{repo_owner}/{repo_name}"}, items_key="items"
+            )
+        except Exception as e:
+            print(f"Error searching code in {repo_owner}/{repo_name}: {str(e)}")
+            return f"Error searching code: {str(e)}"
+        return [
+            {"name": item["name"], "path": item["path"], "url": item.get("html_url"), "score": item.get("score")}
+            for item in items
+        ]
+
+    @traced("GitHubTool.discover_available_tools")
     async def discover_available_tools(self):
         """
-        Mock method to discover available tools.
-        
+        Discover the available tools.
+
         Returns:
-            list: Mock list of available tools.
+            list: The available tools, with "name", "description" and a JSON
+            schema of their arguments under "parameters".
         """
-        # Return mock data
-        mock_tools = [
+        repo_parameters = {
+            "owner": {"type": "string", "description": "Repository owner. Defaults to the repository being discussed."},
+            "repo": {"type": "string", "description": "Repository name. Defaults to the repository being discussed."},
+        }
+        state_parameter = {"type": "string", "description": 'Issue state: "open", "closed" or "all".'}
+        return [
             {
                 "name": "github.list_issues",
-                "description": "List issues from a GitHub repository",
-                "parameters": ["owner", "repo"]
+                "description": "List the newest issues of a GitHub repository",
+                "parameters": {"type": "object", "properties": dict(
+                    repo_parameters,
+                    state=state_parameter,
+                    limit={"type": "integer", "description": "Maximum number of issues. Defaults to 20."}
+                )}
+            },
+            {
+                "name": "github.search_issues",
+                "description": "Find issues relevant to a query in a GitHub repository, with optional state and label filters",
+                "parameters": {"type": "object", "properties": dict(
+                    repo_parameters,
+                    query={"type": "string", "description": "Keywords to search issue titles, bodies and labels for."},
+                    state=state_parameter,
+                    labels={"type": "array", "items": {"type": "string"}, "description": "Only issues with all of these labels."}
+                ), "required": ["query"]}
             },
             {
                 "name": "github.get_issue",
                 "description": "Get content of a specific issue from a GitHub repository",
-                "parameters": ["owner", "repo", "issue_number"]
+                "parameters": {"type": "object", "properties": dict(
+                    repo_parameters,
+                    issue_number={"type": "integer", "description": "The issue number."}
+                ), "required": ["issue_number"]}
             },
             {
                 "name": "github.search_code",
                 "description": "Search for code in a GitHub repository",
-                "parameters": ["query", "owner", "repo"]
+                "parameters": {"type": "object", "properties": dict(
+                    repo_parameters,
+                    query={"type": "string", "description": "Code search terms."}
+                ), "required": ["query"]}
             }
         ]
-        return mock_tools
+
+    async def call_tool(self, name, arguments):
+        """
+        Call a tool by the name discover_available_tools gives it.
+
+        Args:
+            name (str): The tool name, e.g. "github.search_issues".
+            arguments (dict): The tool arguments, as described by its schema.
+
+        Returns:
+            The tool's result, or an error message string.
+        """
+        arguments = arguments or {}
+        repo = {"repo_owner": arguments.get("owner"), "repo_name": arguments.get("repo")}
+        try:
+            if name == "github.list_issues":
+                return await self.list_repository_issues(
+                    state=arguments.get("state") or "all", limit=int(arguments.get("limit") or 20), **repo
+                )
+            if name == "github.search_issues":
+                return await self.search_issues(
+                    arguments["query"], state=arguments.get("state"), labels=arguments.get("labels"), **repo
+                )
+            if name == "github.get_issue":
+                # Numbers arrive as floats from some function-calling APIs
+                return await self.get_issue_content(int(arguments["issue_number"]), **repo)
+            if name == "github.search_code":
+                return await self.search_code(arguments["query"], **repo)
+        except (KeyError, TypeError, ValueError) as e:
+            return f"Invalid arguments for {name}: {str(e)}"
+        return f"Unknown tool: {name}"
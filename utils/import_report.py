@@ -0,0 +1,155 @@
+"""
+Import-time report and cold-start budget check for the LLM Evolution Explorer application.
+
+Runs `python -X importtime` on the app module in a fresh interpreter, then
+reports the slowest imports and checks them against the configured budget.
+Exits non-zero when the budget is exceeded, so it can gate CI:
+
+    python -m utils.import_report
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from utils.config import get_config
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_importtime(output):
+    """
+    Parse the output of `python -X importtime`.
+
+    Args:
+        output (str): The interpreter's stderr.
+
+    Returns:
+        list: Dicts with "name", "depth", "self_ms" and "cumulative_ms", in
+        the order the imports finished.
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # Skip the header line
+            continue
+        name = fields[2].rstrip()
+        stripped = name.lstrip(" ")
+        imports.append({
+            "name": stripped,
+            "depth": (len(name) - len(stripped) - 1) // 2,
+            "self_ms": int(fields[0]) / 1000,
+            "cumulative_ms": int(fields[1]) / 1000,
+        })
+    return imports
+
+def measure_imports(module="app"):
+    """
+    Import a module in a fresh interpreter with import timing enabled.
+
+    Args:
+        module (str, optional): The module to import. Defaults to "app".
+
+    Returns:
+        list: Parsed import timings, see parse_importtime.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+def import_report(module="app", excluded=("streamlit",), deferred_modules=(), top=15):
+    """
+    Summarize the import cost of a module.
+
+    Args:
+        module (str, optional): The module to import. Defaults to "app".
+        excluded (tuple, optional): Top-level packages whose own import time
+            isn't counted against the budget. Defaults to ("streamlit",).
+        deferred_modules (tuple, optional): Modules that must not be loaded
+            by the import. Defaults to ().
+        top (int, optional): Number of slowest imports to list. Defaults to 15.
+
+    Returns:
+        dict: The report, with "total_ms", "excluded_ms", "own_ms" (total minus
+        excluded), "slowest" imports and the "deferred_loaded" modules.
+    """
+    imports = measure_imports(module)
+    total_ms = next((item["cumulative_ms"] for item in imports if item["name"] == module and item["depth"] == 0), 0.0)
+
+    def in_package(name, packages):
+        return any(name == package or name.startswith(package + ".") for package in packages)
+
+    # Children are listed before their parent, so walk backwards to find each
+    # import's direct child of the module, and skip whole excluded subtrees
+    own_imports = []
+    excluded_ms = 0.0
+    top_level = None
+    for item in reversed(imports):
+        if item["depth"] == 1:
+            top_level = item
+            if in_package(item["name"], excluded):
+                excluded_ms += item["cumulative_ms"]
+        if item["depth"] >= 1 and not in_package(top_level["name"], excluded):
+            own_imports.append(item)
+    slowest = sorted(
+        own_imports,
+        key=lambda item: item["self_ms"],
+        reverse=True
+    )[:top]
+    return {
+        "module": module,
+        "total_ms": total_ms,
+        "excluded_ms": excluded_ms,
+        "own_ms": total_ms - excluded_ms,
+        "slowest": slowest,
+        "deferred_loaded": [
+            package for package in deferred_modules
+            if any(in_package(item["name"], [package]) for item in imports)
+        ],
+    }
+
+def main():
+    """Print the import-time report and exit non-zero if the cold-start budget is exceeded."""
+    config = get_config()
+    parser = argparse.ArgumentParser(description="Import-time report with a cold-start budget.")
+    parser.add_argument("--module", default="app", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=config["import_time_budget_ms"],
+                        help="Budget for the module's imports, excluding Streamlit")
+    parser.add_argument("--runs", type=int, default=3, help="Number of fresh interpreters to time; the median is used")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    args = parser.parse_args()
+
+    reports = [
+        import_report(args.module, deferred_modules=config["deferred_modules"], top=args.top)
+        for _ in range(args.runs)
+    ]
+    report = sorted(reports, key=lambda item: item["own_ms"])[len(reports) // 2]
+    own_ms = statistics.median(item["own_ms"] for item in reports)
+
+    print(f"Import of {report['module']}: {report['total_ms']:.1f} ms total, "
+          f"{report['excluded_ms']:.1f} ms in Streamlit, {own_ms:.1f} ms own (median of {args.runs})")
+    print(f"{'self ms':>9} {'cumul ms':>9}  module")
+    for item in report["slowest"]:
+        print(f"{item['self_ms']:>9.1f} {item['cumulative_ms']:>9.1f}  {'  ' * (item['depth'] - 1)}{item['name']}")
+
+    failures = []
+    if own_ms > args.budget_ms:
+        failures.append(f"import time {own_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    if report["deferred_loaded"]:
+        failures.append(f"modules that should load on first use were imported: {', '.join(report['deferred_loaded'])}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print(f"OK: within the {args.budget_ms:.0f} ms budget")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
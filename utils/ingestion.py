@@ -0,0 +1,137 @@
+"""
+Background document ingestion for the LLM Evolution Explorer application.
+
+Uploaded PDFs are queued as ingestion jobs and extracted and chunked by a
+pool of worker threads, so the UI stays responsive and several uploads are
+processed in parallel (large PDFs additionally fan their pages out to the
+extraction process pool). Each job reports per-page progress and ends with a
+handle to the document and its BM25 index in the shared document store; a
+document another session already uploaded is not processed again. Workers
+never touch session state; the app polls its jobs and adds finished documents
+itself, so documents that are already indexed can be queried meanwhile.
+"""
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import get_config
+from utils.tracing import get_tracer
+
+class IngestionJob:
+    """
+    One queued document, updated by the worker that processes it.
+
+    Attributes:
+        job_id (int): Process-wide job number.
+        name (str): Document name, e.g. the uploaded file name.
+        status (str): "queued", "extracting", "done" or "error".
+        pages_done (int): Pages extracted so far.
+        num_pages (int): Pages in the document, or None until known.
+        document (SharedDocument): The document in the shared document store, once done.
+        error (str): The error message, if the job failed.
+        trace (dict): The job's latency trace, if tracing is enabled.
+    """
+    def __init__(self, job_id, name):
+        self.job_id = job_id
+        self.name = name
+        self.status = "queued"
+        self.pages_done = 0
+        self.num_pages = None
+        self.document = None
+        self.error = None
+        self.trace = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ("done", "error")
+
+    @property
+    def progress(self):
+        """Fraction of the pages extracted, between 0 and 1."""
+        if self.finished:
+            return 1.0
+        if not self.num_pages:
+            return 0.0
+        return self.pages_done / self.num_pages
+
+    def _report(self, pages_done, num_pages):
+        self.pages_done = pages_done
+        self.num_pages = num_pages
+
+class IngestionQueue:
+    """
+    Job queue served by a pool of ingestion worker threads.
+    """
+    def __init__(self, max_workers):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingestion")
+        self._job_ids = itertools.count(1)
+
+    def submit(self, name, pdf_source, chunk_size, chunk_overlap):
+        """
+        Queue a PDF for extraction and chunking.
+
+        Args:
+            name (str): Document name, e.g. the uploaded file name.
+            pdf_source: Path to the PDF file, or a binary stream such as a
+                Streamlit uploaded file. It must not be read elsewhere until
+                the job has finished.
+            chunk_size (int): Size of each chunk.
+            chunk_overlap (int): Overlap between chunks.
+
+        Returns:
+            IngestionJob: The queued job.
+        """
+        job = IngestionJob(next(self._job_ids), name)
+        self._executor.submit(self._run, job, pdf_source, chunk_size, chunk_overlap)
+        return job
+
+    def _run(self, job, pdf_source, chunk_size, chunk_overlap):
+        from utils.document_processor import hash_pdf_source, process_pdf
+        from utils.document_store import document_key, get_document_store
+        from utils.retrieval import build_index
+        tracer = get_tracer()
+        job.status = "extracting"
+
+        def build():
+            document = process_pdf(pdf_source, chunk_size, chunk_overlap, progress=job._report, content_hash=content_hash)
+            if document["text"].startswith("Error extracting text from PDF") and not document["chunks"]:
+                job.error = document["text"]
+                return None
+            with tracer.span("build_index"):
+                return document, build_index(document["chunks"])
+
+        try:
+            with tracer.trace("document_ingestion", document=job.name) as trace:
+                with tracer.span("hash_file"):
+                    content_hash = hash_pdf_source(pdf_source)
+                with tracer.span("document_store.acquire"):
+                    job.document = get_document_store().acquire(document_key(content_hash, chunk_size, chunk_overlap), build)
+            if trace is not None:
+                job.trace = trace.to_dict()
+            if job.document is not None and job.num_pages is None:
+                # Shared by another session: nothing was extracted
+                num_pages = len(job.document.document["pages"])
+                job._report(num_pages, num_pages)
+        except Exception as e:
+            print(f"Error ingesting {job.name}: {str(e)}")
+            job.error = f"Error ingesting document: {str(e)}"
+        job.finished_at = time.time()
+        job.status = "error" if job.error else "done"
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_ingestion_queue():
+    """
+    Get the process-wide ingestion queue, creating it on first use.
+
+    Returns:
+        IngestionQueue: The ingestion queue.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = IngestionQueue(get_config()["ingestion_workers"])
+        return _queue
@@ -0,0 +1,266 @@
+"""
+Local, incrementally synced index of GitHub issues for the LLM Evolution Explorer application.
+
+Issues are stored in SQLite with an FTS5 full-text index over their titles,
+bodies and labels. Each repository keeps an `updated_at` watermark; a sync
+only asks GitHub for issues updated since then, so after the first sync a
+repository with thousands of issues costs one small request. Queries combine
+keyword search (ranked by BM25) with state, label and date filters, so the
+agent can put just the relevant issues into the prompt.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from utils.config import get_config
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# Bumped when the stored format changes; an index in an older format is dropped and resynced
+SCHEMA_VERSION = 1
+# Words too common in questions about a repository to be useful search terms
+STOP_WORDS = {
+    "a", "about", "all", "an", "and", "any", "are", "at", "be", "by", "can", "do", "does",
+    "for", "from", "has", "have", "how", "i", "in", "is", "issue", "issues", "it", "me",
+    "of", "on", "or", "repo", "repository", "show", "tell", "that", "the", "there", "this",
+    "to", "was", "what", "when", "which", "who", "why", "with",
+}
+
+def build_match_query(text):
+    """
+    Turn free text into an FTS5 query that matches any of its terms.
+
+    Terms are quoted, so punctuation and FTS5 operators in the text are taken literally.
+
+    Args:
+        text (str): The user's query.
+
+    Returns:
+        str: The FTS5 MATCH expression, or "" if the text has no search terms.
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token not in STOP_WORDS and token not in terms:
+            terms.append(token)
+    return " OR ".join(f'"{term}"' for term in terms)
+
+class IssueIndex:
+    """
+    SQLite store of issues per repository, with a full-text index and sync watermarks.
+    """
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        if self._db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Labels used to be stored space-joined; the index is a cache, so rebuild it
+            self._db.executescript("""
+                DROP TABLE IF EXISTS issues_fts;
+                DROP TABLE IF EXISTS issues;
+                DROP TABLE IF EXISTS sync_state;
+            """)
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._db.executescript("""
+            -- labels is a JSON array of label names, which may contain spaces
+            CREATE TABLE IF NOT EXISTS issues (
+                repo TEXT NOT NULL, number INTEGER NOT NULL, title TEXT NOT NULL, body TEXT NOT NULL,
+                labels TEXT NOT NULL, state TEXT NOT NULL, comments INTEGER NOT NULL,
+                created_at TEXT NOT NULL, updated_at TEXT NOT NULL,
+                UNIQUE (repo, number)
+            );
+            CREATE INDEX IF NOT EXISTS issues_updated ON issues (repo, updated_at);
+            CREATE VIRTUAL TABLE IF NOT EXISTS issues_fts USING fts5(
+                title, body, labels, content='issues', content_rowid='rowid'
+            );
+            CREATE TRIGGER IF NOT EXISTS issues_insert AFTER INSERT ON issues BEGIN
+                INSERT INTO issues_fts (rowid, title, body, labels) VALUES (new.rowid, new.title, new.body, new.labels);
+            END;
+            CREATE TRIGGER IF NOT EXISTS issues_delete AFTER DELETE ON issues BEGIN
+                INSERT INTO issues_fts (issues_fts, rowid, title, body, labels) VALUES ('delete', old.rowid, old.title, old.body, old.labels);
+            END;
+            CREATE TRIGGER IF NOT EXISTS issues_update AFTER UPDATE ON issues BEGIN
+                INSERT INTO issues_fts (issues_fts, rowid, title, body, labels) VALUES ('delete', old.rowid, old.title, old.body, old.labels);
+                INSERT INTO issues_fts (rowid, title, body, labels) VALUES (new.rowid, new.title, new.body, new.labels);
+            END;
+            CREATE TABLE IF NOT EXISTS sync_state (
+                repo TEXT PRIMARY KEY, watermark TEXT, synced_at REAL NOT NULL
+            );
+        """)
+        self._db.commit()
+
+    def upsert(self, repo, issues):
+        """
+        Insert or update issues from the GitHub API.
+
+        Args:
+            repo (str): Repository key, e.g. "api.github.com/owner/name".
+            issues (list): Issue dicts from the GitHub API.
+
+        Returns:
+            str: The latest updated_at among the issues, or None if there are none.
+        """
+        rows = [
+            (repo, issue["number"], issue["title"], issue.get("body") or "",
+             json.dumps([label["name"] for label in issue.get("labels", [])]), issue["state"],
+             issue.get("comments", 0), issue["created_at"], issue.get("updated_at") or issue["created_at"])
+            for issue in issues
+        ]
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO issues (repo, number, title, body, labels, state, comments, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (repo, number) DO UPDATE SET title = excluded.title, body = excluded.body, "
+                "labels = excluded.labels, state = excluded.state, comments = excluded.comments, "
+                "updated_at = excluded.updated_at",
+                rows
+            )
+            self._db.commit()
+        return max((row[8] for row in rows), default=None)
+
+    def get_sync_state(self, repo):
+        """
+        Get the sync watermark of a repository.
+
+        Args:
+            repo (str): Repository key, e.g. "api.github.com/owner/name".
+
+        Returns:
+            dict: "watermark" (latest synced updated_at, or None) and "synced_at"
+            (time of the last sync), or None if the repository was never synced.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT watermark, synced_at FROM sync_state WHERE repo = ?", (repo,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def set_sync_state(self, repo, watermark):
+        """
+        Record a finished sync.
+
+        Args:
+            repo (str): Repository key, e.g. "api.github.com/owner/name".
+            watermark (str): Latest updated_at seen so far.
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sync_state (repo, watermark, synced_at) VALUES (?, ?, ?)",
+                (repo, watermark, time.time())
+            )
+            self._db.commit()
+
+    def count(self, repo):
+        """
+        Count the indexed issues of a repository.
+
+        Args:
+            repo (str): Repository key, e.g. "api.github.com/owner/name".
+
+        Returns:
+            int: The number of issues.
+        """
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM issues WHERE repo = ?", (repo,)).fetchone()[0]
+
+    def search(self, repo, query="", state=None, labels=None, updated_since=None, limit=10):
+        """
+        Find issues by keywords and filters.
+
+        With search terms, issues matching any term are ranked by BM25. Without
+        any, or if no issue matches, the most recently updated issues are returned.
+
+        Args:
+            repo (str): Repository key, e.g. "api.github.com/owner/name".
+            query (str, optional): Free-text query. Defaults to "".
+            state (str, optional): "open" or "closed"; None or "all" for both. Defaults to None.
+            labels (list, optional): Only issues with all of these labels. Defaults to None.
+            updated_since (str, optional): ISO 8601 timestamp; only issues updated since then. Defaults to None.
+            limit (int, optional): Maximum number of issues. Defaults to 10.
+
+        Returns:
+            list: Issue dicts with "number", "title", "state", "created_at", "updated_at",
+            "body", "comments", "labels" and "score" (None for unranked results).
+        """
+        filters = ["issues.repo = ?"]
+        params = [repo]
+        if state and state != "all":
+            filters.append("issues.state = ?")
+            params.append(state)
+        for label in labels or []:
+            filters.append("EXISTS (SELECT 1 FROM json_each(issues.labels) WHERE json_each.value = ?)")
+            params.append(label)
+        if updated_since:
+            filters.append("issues.updated_at >= ?")
+            params.append(updated_since)
+        where = " AND ".join(filters)
+
+        match = build_match_query(query)
+        rows = []
+        with self._lock:
+            if match:
+                rows = self._db.execute(
+                    f"SELECT issues.*, bm25(issues_fts) AS rank FROM issues_fts "
+                    f"JOIN issues ON issues.rowid = issues_fts.rowid "
+                    f"WHERE issues_fts MATCH ? AND {where} ORDER BY rank LIMIT ?",
+                    [match] + params + [limit]
+                ).fetchall()
+            if not rows:
+                rows = self._db.execute(
+                    f"SELECT issues.*, NULL AS rank FROM issues WHERE {where} ORDER BY updated_at DESC LIMIT ?",
+                    params + [limit]
+                ).fetchall()
+
+        return [
+            {
+                "number": row["number"],
+                "title": row["title"],
+                "state": row["state"],
+                "created_at": row["created_at"],
+                "updated_at": row["updated_at"],
+                "body": row["body"],
+                "comments": row["comments"],
+                "labels": json.loads(row["labels"]),
+                # bm25() is lower for better matches; flip it so higher is better like the retrieval scores
+                "score": -row["rank"] if row["rank"] is not None else None,
+            }
+            for row in rows
+        ]
+
+def format_issues(issues, max_body_chars=500):
+    """
+    Format issues as context for a prompt.
+
+    Args:
+        issues (list): Issue dicts from IssueIndex.search.
+        max_body_chars (int, optional): Characters of each body to keep. Defaults to 500.
+
+    Returns:
+        str: One block per issue.
+    """
+    blocks = []
+    for issue in issues:
+        labels = ", ".join(issue["labels"]) or "none"
+        body = issue["body"]
+        if len(body) > max_body_chars:
+            body = body[:max_body_chars].rstrip() + "..."
+        blocks.append(
+            f"Issue #{issue['number']}: {issue['title']} [{issue['state']}; labels: {labels}; "
+            f"comments: {issue['comments']}; created {issue['created_at']}; updated {issue['updated_at']}]\n{body}"
+        )
+    return "\n\n".join(blocks)
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_issue_index():
+    """
+    Get the process-wide issue index, creating it on first use.
+
+    Returns:
+        IssueIndex: The issue index.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = IssueIndex(os.path.join(get_config()["temp_folder"], "issue_index.sqlite3"))
+        return _index
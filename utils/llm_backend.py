@@ -0,0 +1,367 @@
+"""
+Pluggable LLM backends for the LLM Evolution Explorer application.
+
+The Gemini backend talks to the Gemini API through google.generativeai. The
+HTTP backend talks to any server that speaks the small JSON protocol of
+utils.stub_llm_server, which lets the app run and be load-tested without an
+API key or network access. The backend is chosen with the "llm_backend"
+setting in utils/config.py.
+"""
+import asyncio
+import contextvars
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import get_config
+
+def _chunk_text(chunk):
+    """Get the text of a streamed chunk, or an empty string if it has no text parts."""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+def _iter_stream(first_text, response):
+    yield first_text
+    for chunk in response:
+        yield _chunk_text(chunk)
+
+def call_gemini(model_name, prompt, stream=False):
+    """
+    Call a Gemini model once.
+
+    For streaming calls this returns once the first chunk has arrived, so a
+    model that fails up front is detected before anything is shown.
+
+    Args:
+        model_name (str): The model to call.
+        prompt (str): The full prompt.
+        stream (bool, optional): Whether to stream the response. Defaults to False.
+
+    Returns:
+        str or generator: The response text, or a generator of text chunks when streaming.
+    """
+    from utils.model_registry import get_model_registry
+    model = get_model_registry().get_model(model_name)
+    if not stream:
+        return model.generate_content(prompt).text
+
+    response = iter(model.generate_content(prompt, stream=True))
+    first_chunk = next(response, None)
+    if first_chunk is None:
+        return iter(())
+    return _iter_stream(_chunk_text(first_chunk), response)
+
+class GeminiBackend:
+    """
+    Backend for the Gemini API.
+    """
+    name = "gemini"
+
+    def configure(self, api_key):
+        """
+        Set the API key.
+
+        Args:
+            api_key (str): The Gemini API key.
+        """
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+
+    def list_models(self):
+        """
+        List the models that support content generation.
+
+        Returns:
+            list: Model names.
+        """
+        import google.generativeai as genai
+        return [model.name for model in genai.list_models()
+                if "generateContent" in model.supported_generation_methods]
+
+    def generate(self, model_name, prompt, stream=False):
+        """
+        Call a model once.
+
+        For streaming calls this returns once the first chunk has arrived, so a
+        model that fails up front is detected before anything is shown.
+
+        Args:
+            model_name (str): The model to call.
+            prompt (str): The full prompt.
+            stream (bool, optional): Whether to stream the response. Defaults to False.
+
+        Returns:
+            str or generator: The response text, or a generator of text chunks when streaming.
+        """
+        return call_gemini(model_name, prompt, stream)
+
+    async def generate_async(self, model_name, prompt):
+        """
+        Call a model once with the async API.
+
+        Args:
+            model_name (str): The model to call.
+            prompt (str): The full prompt.
+
+        Returns:
+            str: The response text.
+        """
+        from utils.model_registry import get_model_registry
+        response = await get_model_registry().get_model(model_name).generate_content_async(prompt)
+        return response.text
+
+    def count_tokens(self, model_name, text):
+        """
+        Count the tokens of a text for a model.
+
+        Args:
+            model_name (str): The model name.
+            text (str): The text.
+
+        Returns:
+            int: The number of tokens.
+        """
+        from utils.model_registry import get_model_registry
+        return get_model_registry().get_model(model_name).count_tokens(text).total_tokens
+
+    def chat(self, model_name, messages, tools=None):
+        """
+        Run one turn of a conversation in which the model may call functions.
+
+        Args:
+            model_name (str): The model to call.
+            messages (list): The conversation so far. Each message is a dict with a
+                "role" of "user" (with "text"), "model" (with "text" and
+                "function_calls") or "tool" (with "results", a list of dicts with
+                "name" and "response").
+            tools (list, optional): Function declarations, dicts with "name",
+                "description" and a JSON schema under "parameters". Defaults to
+                None, which lets the model only answer in text.
+
+        Returns:
+            dict: "text" and "function_calls", a list of dicts with "name" and "args".
+        """
+        from utils.model_registry import get_model_registry
+
+        contents = []
+        for message in messages:
+            if message["role"] == "user":
+                contents.append({"role": "user", "parts": [{"text": message["text"]}]})
+            elif message["role"] == "model":
+                parts = [{"text": message["text"]}] if message.get("text") else []
+                parts += [{"function_call": call} for call in message.get("function_calls", [])]
+                contents.append({"role": "model", "parts": parts})
+            else:
+                contents.append({"role": "function", "parts": [
+                    {"function_response": {"name": result["name"], "response": {"result": result["response"]}}}
+                    for result in message["results"]
+                ]})
+
+        kwargs = {"tools": [{"function_declarations": tools}]} if tools else {}
+        response = get_model_registry().get_model(model_name).generate_content(contents, **kwargs)
+
+        text = []
+        function_calls = []
+        for part in response.candidates[0].content.parts:
+            if part.function_call.name:
+                call = type(part.function_call).to_dict(part.function_call)
+                function_calls.append({"name": call["name"], "args": call.get("args") or {}})
+            elif part.text:
+                text.append(part.text)
+        return {"text": "".join(text), "function_calls": function_calls}
+
+class HTTPBackend:
+    """
+    Backend for a server speaking the utils.stub_llm_server protocol.
+
+    Requests go through one pooled requests.Session, so concurrent sessions
+    reuse keep-alive connections. Async calls run on the backend's own worker
+    threads, one per pooled connection, so their concurrency doesn't depend on
+    the default executor of the calling event loop.
+    """
+    name = "http"
+
+    def __init__(self, base_url, timeout=60, pool_size=32):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="llm-http")
+        self._lock = threading.Lock()
+
+    def configure(self, api_key):
+        """
+        Set the API key sent with every request.
+
+        Args:
+            api_key (str): The API key, sent as a bearer token.
+        """
+        with self._lock:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def _post(self, model_name, method, payload, stream=False):
+        name = model_name if model_name.startswith("models/") else f"models/{model_name}"
+        response = self.session.post(f"{self.base_url}/v1/{name}:{method}", json=payload, timeout=self.timeout, stream=stream)
+        if response.status_code != 200:
+            try:
+                message = response.json().get("error", response.text)
+            except ValueError:
+                message = response.text
+            response.close()
+            raise Exception(f"{response.status_code} {message}")
+        return response
+
+    def list_models(self):
+        """
+        List the models that support content generation.
+
+        Returns:
+            list: Model names.
+        """
+        response = self.session.get(f"{self.base_url}/v1/models", timeout=self.timeout)
+        response.raise_for_status()
+        return [model["name"] for model in response.json()["models"]
+                if "generateContent" in model["supported_generation_methods"]]
+
+    def _iter_stream(self, first_text, lines, response):
+        try:
+            yield first_text
+            for line in lines:
+                if line:
+                    yield self._stream_text(line)
+        finally:
+            response.close()
+
+    @staticmethod
+    def _stream_text(line):
+        event = json.loads(line)
+        if "error" in event:
+            raise Exception(event["error"])
+        return event["text"]
+
+    def generate(self, model_name, prompt, stream=False):
+        """
+        Call a model once.
+
+        For streaming calls this returns once the first chunk has arrived, so a
+        model that fails up front is detected before anything is shown.
+
+        Args:
+            model_name (str): The model to call.
+            prompt (str): The full prompt.
+            stream (bool, optional): Whether to stream the response. Defaults to False.
+
+        Returns:
+            str or generator: The response text, or a generator of text chunks when streaming.
+        """
+        if not stream:
+            return self._post(model_name, "generateContent", {"prompt": prompt}).json()["text"]
+
+        response = self._post(model_name, "streamGenerateContent", {"prompt": prompt}, stream=True)
+        lines = response.iter_lines(decode_unicode=True)
+        first_line = next((line for line in lines if line), None)
+        if first_line is None:
+            response.close()
+            return iter(())
+        return self._iter_stream(self._stream_text(first_line), lines, response)
+
+    async def generate_async(self, model_name, prompt):
+        """
+        Call a model once without blocking the event loop.
+
+        The request runs on one of the backend's worker threads through the
+        pooled session.
+
+        Args:
+            model_name (str): The model to call.
+            prompt (str): The full prompt.
+
+        Returns:
+            str: The response text.
+        """
+        # Run in a copy of the caller's context so the call is traced as part of its request
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, context.run, self.generate, model_name, prompt
+        )
+
+    def count_tokens(self, model_name, text):
+        """
+        Count the tokens of a text for a model.
+
+        Args:
+            model_name (str): The model name.
+            text (str): The text.
+
+        Returns:
+            int: The number of tokens.
+        """
+        return self._post(model_name, "countTokens", {"prompt": text}).json()["total_tokens"]
+
+    def chat(self, model_name, messages, tools=None):
+        """
+        Run one turn of a conversation in which the model may call functions.
+
+        Args:
+            model_name (str): The model to call.
+            messages (list): The conversation so far, in the format described
+                in GeminiBackend.chat.
+            tools (list, optional): Function declarations, dicts with "name",
+                "description" and a JSON schema under "parameters". Defaults to
+                None, which lets the model only answer in text.
+
+        Returns:
+            dict: "text" and "function_calls", a list of dicts with "name" and "args".
+        """
+        return self._post(model_name, "chat", {"messages": messages, "tools": tools or []}).json()
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def create_backend(kind, base_url=None):
+    """
+    Create an LLM backend.
+
+    Args:
+        kind (str): "gemini" or "http".
+        base_url (str, optional): Server URL for the HTTP backend. Defaults to None.
+
+    Returns:
+        GeminiBackend or HTTPBackend: The backend.
+    """
+    if kind == "gemini":
+        return GeminiBackend()
+    if kind == "http":
+        config = get_config()
+        return HTTPBackend(base_url or config["llm_backend_url"], pool_size=config["llm_http_pool_size"])
+    raise ValueError(f"Unknown LLM backend: {kind}")
+
+def get_llm_backend():
+    """
+    Get the configured process-wide LLM backend, creating it on first use.
+
+    Returns:
+        GeminiBackend or HTTPBackend: The backend.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend(get_config()["llm_backend"])
+        return _backend
+
+def set_llm_backend(backend):
+    """
+    Replace the process-wide LLM backend, e.g. to point the app at a stub server.
+
+    Args:
+        backend (GeminiBackend or HTTPBackend): The backend to use.
+    """
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,269 @@
+"""
+Load driver for the four app setups, run against the stub LLM server.
+
+Simulated sessions run the same pipeline as the Streamlit panels (retrieval,
+context packing, streamed generation, GitHub tool calls against a fake GitHub
+API) in closed loops, at increasing concurrency, and the report shows where
+throughput stops scaling:
+
+    python -m utils.load_test --levels 1,2,4,8,16,32 --duration 5
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from utils.async_runtime import run_async
+from utils.config import get_config
+from utils.llm_backend import create_backend, set_llm_backend
+
+SETUPS = ["basic", "rag", "agentic", "agentic_rag"]
+QUERIES = [
+    "What does the document say about retrieval latency?",
+    "Summarize the open issues in the repository.",
+    "How is the context budget used for each model?",
+    "Which tools can the agent call?",
+]
+
+def _percentile(samples, p):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+class Workload:
+    """
+    The documents and tools shared by all simulated sessions.
+    """
+    def __init__(self, pages=20):
+        from utils.benchmark import write_synthetic_pdf
+        from utils.document_processor import process_pdf
+        from utils.github_tool import GitHubTool
+        from utils.retrieval import CorpusIndex, build_index
+
+        config = get_config()
+        pdf_path = os.path.join(config["temp_folder"], "benchmarks", f"synthetic_{pages}_0.pdf")
+        if not os.path.exists(pdf_path):
+            write_synthetic_pdf(pdf_path, pages)
+        document = process_pdf(pdf_path, config["chunk_size"], config["chunk_overlap"])
+        self.index = build_index(document["chunks"])
+        self.corpus = CorpusIndex()
+        half = len(document["chunks"]) // 2
+        self.corpus.add_document("first.pdf", document["chunks"][:half])
+        self.corpus.add_document("second.pdf", document["chunks"][half:])
+        self.github_tool = GitHubTool()
+        self.model_name = config["default_model"]
+
+    def run_request(self, setup, query):
+        """
+        Run one request of a setup, the way its Streamlit panel does.
+
+        Args:
+            setup (str): One of SETUPS.
+            query (str): The user query.
+
+        Returns:
+            tuple: The response stream and whether the request failed.
+        """
+        from utils.context_packer import pack_context
+        from utils.gemini_api import generate_rag_response_stream, generate_response_stream
+        from utils.retrieval import retrieve_chunks
+
+        config = get_config()
+        if setup == "agentic":
+            from utils.agent import run_agent
+            stream = run_async(run_agent(query, self.github_tool, self.model_name))["stream"]
+        elif setup == "basic":
+            stream = generate_response_stream(query, self.model_name)
+        elif setup == "rag":
+            results = retrieve_chunks(self.index, query, config["retrieval_top_k"])
+            context, _ = pack_context(results, self.model_name)
+            stream = generate_rag_response_stream(query, context, self.model_name)
+        else:
+            from utils.rag_pipeline import fetch_sources, fuse_sources, issue_chunks
+            fetched = run_async(fetch_sources({
+                "documents": lambda: retrieve_chunks(self.corpus, query, config["retrieval_top_k"]),
+                "github": self.github_tool.search_issues(query),
+            }, config["agentic_rag_deadline"]))
+            fused = fuse_sources({"documents": fetched["documents"]["results"],
+                                  "github": issue_chunks(fetched["github"]["results"])})
+            context, _ = pack_context(fused, self.model_name)
+            stream = generate_rag_response_stream(
+                f"The user is asking about the GitHub repository: {config['github_repo']} and possibly the uploaded documents. The query is: {query}",
+                context,
+                self.model_name
+            )
+
+        for _ in stream:
+            pass
+        failed = stream.text.startswith("Error generating") or "[Response interrupted:" in stream.text
+        return stream, failed
+
+def run_level(workload, setup, concurrency, duration, think_time=0.0):
+    """
+    Run closed-loop sessions of a setup at a fixed concurrency.
+
+    Args:
+        workload (Workload): The shared workload.
+        setup (str): One of SETUPS.
+        concurrency (int): Number of simultaneous sessions.
+        duration (float): Seconds to run for.
+        think_time (float, optional): Pause between a session's requests. Defaults to 0.0.
+
+    Returns:
+        dict: "concurrency", "requests", "throughput" (requests/s), "error_rate",
+        "p50_ms"/"p95_ms" request latency and "ttft_p95_ms".
+    """
+    latencies = []
+    ttfts = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def session(session_id):
+        nonlocal errors
+        request_id = 0
+        while time.perf_counter() < deadline:
+            # Unique queries so the response cache can't answer them
+            query = f"{QUERIES[request_id % len(QUERIES)]} (session {session_id}, request {request_id})"
+            start = time.perf_counter()
+            try:
+                stream, failed = workload.run_request(setup, query)
+            except Exception as e:
+                print(f"Error in {setup} session {session_id}: {str(e)}")
+                stream, failed = None, True
+            latency = time.perf_counter() - start
+            with lock:
+                latencies.append(latency)
+                if stream is not None and stream.time_to_first_token is not None:
+                    ttfts.append(stream.time_to_first_token)
+                errors += failed
+            request_id += 1
+            if think_time:
+                time.sleep(think_time)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "error_rate": errors / len(latencies) if latencies else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "ttft_p95_ms": _percentile(ttfts, 95) * 1000,
+    }
+
+def find_saturation(levels, min_gain=0.1, max_error_rate=0.05):
+    """
+    Find the concurrency level after which a setup stops scaling.
+
+    Args:
+        levels (list): Results of run_level, in increasing concurrency.
+        min_gain (float, optional): Minimum relative throughput gain for the
+            next level to count as scaling. Defaults to 0.1.
+        max_error_rate (float, optional): Error rate that counts as saturated. Defaults to 0.05.
+
+    Returns:
+        dict: The last level that still scaled, or None if there are no levels.
+    """
+    if not levels:
+        return None
+    saturated = levels[0]
+    for level in levels[1:]:
+        if level["error_rate"] > max_error_rate:
+            break
+        if level["throughput"] < saturated["throughput"] * (1 + min_gain):
+            break
+        saturated = level
+    return saturated
+
+def main():
+    """Load-test each setup at increasing concurrency and report its saturation point."""
+    parser = argparse.ArgumentParser(description="Load driver for the four app setups.")
+    parser.add_argument("--setups", default=",".join(SETUPS), help="Comma-separated setups to test")
+    parser.add_argument("--levels", default="1,2,4,8,16,32", help="Comma-separated session counts")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per concurrency level")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds between a session's requests")
+    parser.add_argument("--pages", type=int, default=20, help="Pages in the synthetic document")
+    parser.add_argument("--url", help="Use a running stub server instead of starting one in-process")
+    parser.add_argument("--github-url", help="Use this GitHub API instead of an in-process fake GitHub server")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="In-process server: time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="In-process server: latency jitter")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="In-process server: output throughput")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="In-process server: injected error rate")
+    parser.add_argument("--capacity", type=int, default=None, help="In-process server: maximum concurrent generations")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    setups = [setup.strip() for setup in args.setups.split(",") if setup.strip()]
+    unknown = set(setups) - set(SETUPS)
+    if unknown:
+        parser.error(f"unknown setups: {', '.join(sorted(unknown))} (choose from {', '.join(SETUPS)})")
+    levels = [int(level) for level in args.levels.split(",")]
+
+    server = None
+    url = args.url
+    if url is None:
+        from utils.stub_llm_server import start_stub_server
+        server = start_stub_server(
+            latency=args.latency_ms / 1000,
+            jitter=args.jitter_ms / 1000,
+            error_rate=args.error_rate,
+            tokens_per_second=args.tokens_per_second,
+            capacity=args.capacity
+        )
+        url = server.url
+
+    github_server = None
+    github_url = args.github_url
+    if github_url is None:
+        from utils.fake_github_server import start_fake_github_server
+        github_server = start_fake_github_server()
+        github_url = github_server.url
+
+    config = get_config()
+    config["github_api_url"] = github_url
+    config["llm_backend"] = "http"
+    config["llm_backend_url"] = url
+    config["response_cache_enabled"] = False
+    set_llm_backend(create_backend("http", url))
+
+    workload = Workload(args.pages)
+    print(f"Stub server: {url} · GitHub API: {github_url} · generation client workers: {config['generation_max_workers']}")
+    report = {}
+    try:
+        for setup in setups:
+            print(f"\n{setup}")
+            print(f"{'sessions':>9} {'requests':>9} {'req/s':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'ttft p95':>9}")
+            results = []
+            for concurrency in levels:
+                level = run_level(workload, setup, concurrency, args.duration, args.think_time)
+                results.append(level)
+                print(f"{level['concurrency']:>9} {level['requests']:>9} {level['throughput']:>8.2f} "
+                      f"{level['error_rate']:>7.1%} {level['p50_ms']:>9.0f} {level['p95_ms']:>9.0f} {level['ttft_p95_ms']:>9.0f}")
+            saturation = find_saturation(results)
+            print(f"Saturates at {saturation['concurrency']} sessions ({saturation['throughput']:.2f} req/s, "
+                  f"p95 {saturation['p95_ms']:.0f} ms)")
+            report[setup] = {"levels": results, "saturation": saturation}
+    finally:
+        if server is not None:
+            server.shutdown()
+            print(f"\nServer stats: {server.stats}")
+        if github_server is not None:
+            github_server.shutdown()
+            print(f"GitHub server stats: {github_server.stats}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
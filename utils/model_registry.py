@@ -0,0 +1,135 @@
+"""
+Process-wide registry of Gemini models for the LLM Evolution Explorer application.
+"""
+import threading
+import time
+from utils.config import get_config
+from utils.llm_backend import get_llm_backend
+
+class ModelRegistry:
+    """
+    Caches the Gemini model catalog and pools GenerativeModel handles.
+
+    The catalog is fetched once and then served from memory. Once it is older
+    than the TTL, the stale catalog keeps being served while a background
+    thread refreshes it, so callers never wait on a list_models() round trip
+    after the first fetch. If a fetch fails, the previous catalog (or the
+    configured default models) is served until the shorter retry TTL expires.
+    """
+    def __init__(self, ttl_seconds, retry_ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self.retry_ttl_seconds = retry_ttl_seconds
+        self._catalog = None
+        self._expires_at = 0.0
+        self._refreshing = False
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Fetch the model catalog from the LLM backend.
+
+        Returns:
+            list: Names of the models that support generateContent.
+
+        Raises:
+            Exception: If the API call fails.
+        """
+        catalog = get_llm_backend().list_models()
+        with self._lock:
+            self._catalog = catalog
+            self._expires_at = time.monotonic() + self.ttl_seconds
+        return catalog
+
+    def _use_fallback(self):
+        """
+        Keep serving the current catalog, or the configured default models if
+        none was fetched yet, until the next retry.
+
+        Returns:
+            list: The catalog to serve.
+        """
+        with self._lock:
+            if self._catalog is None:
+                self._catalog = list(get_config()["available_models"])
+            self._expires_at = time.monotonic() + self.retry_ttl_seconds
+            return self._catalog
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Error refreshing model catalog: {str(e)}")
+            self._use_fallback()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def list_models(self):
+        """
+        Get the cached model catalog, refreshing it in the background when stale.
+
+        Returns:
+            list: Names of the available models, or the configured defaults if
+            the catalog could not be fetched.
+        """
+        with self._lock:
+            catalog = self._catalog
+            stale = time.monotonic() > self._expires_at
+            start_refresh = catalog is not None and stale and not self._refreshing
+            if start_refresh:
+                self._refreshing = True
+
+        if catalog is None:
+            try:
+                catalog = self.refresh()
+            except Exception:
+                # Serve the default models until the retry TTL expires
+                catalog = self._use_fallback()
+        elif start_refresh:
+            threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+        return list(catalog)
+
+    def get_model(self, model_name):
+        """
+        Get a pooled GenerativeModel handle for a model name.
+
+        Args:
+            model_name (str): The model name.
+
+        Returns:
+            genai.GenerativeModel: The model handle.
+        """
+        # Imported on first use: the SDK takes about a second to import
+        import google.generativeai as genai
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = genai.GenerativeModel(model_name)
+                self._models[model_name] = model
+            return model
+
+    def reset(self):
+        """
+        Drop the cached catalog and model handles, e.g. after the API key changes.
+        """
+        with self._lock:
+            self._catalog = None
+            self._expires_at = 0.0
+            self._models = {}
+
+_registry = None
+
+def get_model_registry():
+    """
+    Get the process-wide model registry, creating it on first use.
+
+    Returns:
+        ModelRegistry: The model registry.
+    """
+    global _registry
+    if _registry is None:
+        config = get_config()
+        _registry = ModelRegistry(config["model_catalog_ttl"], config["model_catalog_retry_ttl"])
+    return _registry
@@ -0,0 +1,110 @@
+"""
+Pipelined request path of the agentic RAG setup.
+
+Document retrieval and the GitHub issue lookup start together as soon as a
+question is submitted. Generation starts as soon as both have finished or a
+deadline expires, whichever comes first. The ranked results of the sources are
+fused into one list, which is packed into the model's context budget.
+"""
+import asyncio
+import functools
+import time
+from utils.issue_index import format_issues
+from utils.tracing import get_tracer
+
+# Rank offset of reciprocal rank fusion; larger values flatten the rank weights
+RRF_K = 60
+
+def _log_abandoned(name, task):
+    """Retrieve the outcome of a source that missed the deadline, logging its error if it failed."""
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Error fetching {name} context after the deadline: {str(task.exception())}")
+
+async def fetch_sources(sources, deadline):
+    """
+    Await several context sources concurrently, up to a deadline.
+
+    Sources still running at the deadline are reported as timed out and left
+    to finish in the background, so e.g. a slow issue sync still warms the
+    issue index for the next question.
+
+    Args:
+        sources (dict): Source name -> awaitable, or blocking callable run in a
+            worker thread, returning a list of results (or an error message
+            string, like the tool methods).
+        deadline (float): Seconds to wait for the sources.
+
+    Returns:
+        dict: Source name -> dict with "results" (a list, empty unless the source
+        succeeded), "status" ("ok", "error" or "timeout"), "elapsed_ms" and "error".
+    """
+    tracer = get_tracer()
+    start = time.perf_counter()
+    elapsed_ms = {}
+
+    async def timed(name, source):
+        try:
+            with tracer.span("fetch_source", source=name):
+                if callable(source):
+                    return await asyncio.to_thread(source)
+                return await source
+        finally:
+            elapsed_ms[name] = (time.perf_counter() - start) * 1000
+
+    tasks = {name: asyncio.ensure_future(timed(name, source)) for name, source in sources.items()}
+    if tasks:
+        await asyncio.wait(tasks.values(), timeout=deadline)
+
+    report = {}
+    for name, task in tasks.items():
+        entry = {"results": [], "status": "ok", "elapsed_ms": elapsed_ms.get(name, deadline * 1000), "error": None}
+        if not task.done():
+            entry.update(status="timeout", error=f"Deadline of {deadline:.3g}s expired")
+            task.add_done_callback(functools.partial(_log_abandoned, name))
+        elif task.exception() is not None:
+            print(f"Error fetching {name} context: {str(task.exception())}")
+            entry.update(status="error", error=str(task.exception()))
+        elif isinstance(task.result(), str):
+            entry.update(status="error", error=task.result())
+        else:
+            entry["results"] = task.result()
+        report[name] = entry
+    return report
+
+def issue_chunks(issues):
+    """
+    Turn issues from GitHubTool.search_issues into context chunks.
+
+    Args:
+        issues (list): Issue dicts.
+
+    Returns:
+        list: Chunk dicts with "text", "label" and "score" (None for unranked issues).
+    """
+    return [
+        {"text": format_issues([issue]), "label": f"Issue #{issue['number']}", "score": issue["score"]}
+        for issue in issues
+    ]
+
+def fuse_sources(ranked_sources, k=RRF_K):
+    """
+    Fuse the ranked results of several sources with reciprocal rank fusion.
+
+    Scores of different sources (e.g. BM25 over documents and over issues)
+    aren't comparable, so each result is scored by its rank within its source:
+    1 / (k + rank). The top results of every source come first, interleaved.
+
+    Args:
+        ranked_sources (dict): Source name -> chunk dicts, best first.
+        k (int, optional): Rank offset. Defaults to RRF_K.
+
+    Returns:
+        list: Copies of the chunks with the fused "score", plus "source" and
+        the original "source_score", best first.
+    """
+    fused = []
+    for source, chunks in ranked_sources.items():
+        for rank, chunk in enumerate(chunks, start=1):
+            fused.append(dict(chunk, score=1.0 / (k + rank), source=source, source_score=chunk.get("score")))
+    fused.sort(key=lambda chunk: chunk["score"], reverse=True)
+    return fused
@@ -0,0 +1,146 @@
+"""
+Two-tier cache of generated responses for the LLM Evolution Explorer application.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from utils.config import get_config
+
+def _sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def normalize_prompt(prompt):
+    """
+    Normalize a prompt so trivially different spellings share a cache entry.
+
+    Args:
+        prompt (str): The prompt text.
+
+    Returns:
+        str: The prompt with whitespace collapsed and case folded.
+    """
+    return " ".join(prompt.split()).casefold()
+
+def make_cache_key(model_name, prompt, context="", kind="generate"):
+    """
+    Build a response cache key.
+
+    Args:
+        model_name (str): The model that produces the response.
+        prompt (str): The user prompt.
+        context (str, optional): The RAG context, if any. Defaults to "".
+        kind (str, optional): The request kind, "generate" or "rag", so a RAG
+            request with an empty context doesn't share a plain generation's
+            entry. Defaults to "generate".
+
+    Returns:
+        str: Hex digest of (request kind, model name, normalized prompt hash, context hash).
+    """
+    return _sha256("\0".join([kind, model_name, _sha256(normalize_prompt(prompt)), _sha256(context)]))
+
+class ResponseCache:
+    """
+    Response cache with an in-memory LRU in front of an on-disk SQLite store.
+
+    Entries expire after ttl_seconds, and responses larger than
+    max_entry_bytes are never cached.
+    """
+    def __init__(self, db_path, memory_entries=256, ttl_seconds=86400, max_entry_bytes=256 * 1024):
+        self.memory_entries = memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_entry_bytes = max_entry_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def _remember(self, key, response, expires_at):
+        self._memory[key] = (response, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        Look up a cached response.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            str: The cached response, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    return entry[0]
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT response, expires_at FROM responses WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            # Promote disk hits into the memory tier
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+    def put(self, key, response):
+        """
+        Store a response in both tiers.
+
+        Args:
+            key (str): The cache key.
+            response (str): The response text.
+        """
+        if len(response.encode("utf-8")) > self.max_entry_bytes:
+            return
+
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, response, expires_at)
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, expires_at) VALUES (?, ?, ?)",
+                    (key, response, expires_at)
+                )
+                self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Error writing response cache entry: {str(e)}")
+
+_cache = None
+
+def get_response_cache():
+    """
+    Get the process-wide response cache, creating it on first use.
+
+    Returns:
+        ResponseCache: The response cache, or None if caching is disabled.
+    """
+    global _cache
+    config = get_config()
+    if not config["response_cache_enabled"]:
+        return None
+    if _cache is None:
+        _cache = ResponseCache(
+            os.path.join(config["temp_folder"], "response_cache.sqlite3"),
+            memory_entries=config["response_cache_memory_entries"],
+            ttl_seconds=config["response_cache_ttl"],
+            max_entry_bytes=config["response_cache_max_entry_kb"] * 1024
+        )
+    return _cache
@@ -0,0 +1,324 @@
+"""
+Lexical retrieval utilities for the LLM Evolution Explorer application.
+"""
+import heapq
+import math
+import re
+from collections import Counter
+from utils.tracing import traced
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    """
+    Tokenize text into lowercase alphanumeric terms.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        list: List of terms.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+class BM25Index:
+    """
+    In-memory BM25 index over text chunks, backed by an inverted index.
+
+    Scoring only touches the postings of the query terms, so the cost of a
+    search depends on the query and on top_k rather than on the full text.
+    Chunks can be added and removed incrementally; removed chunks leave a
+    tombstone so the ids of the remaining chunks never change.
+    """
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        # Removed chunks are set to None
+        self.chunks = []
+        self.chunk_lengths = []
+        self.total_length = 0
+        self.num_chunks = 0
+        # term -> {chunk_id: term frequency}
+        self.postings = {}
+
+    def __len__(self):
+        return self.num_chunks
+
+    def add_chunks(self, chunks):
+        """
+        Add text chunks to the index.
+
+        Args:
+            chunks (list): List of text chunks.
+
+        Returns:
+            list: The ids assigned to the added chunks.
+        """
+        chunk_ids = []
+        for chunk in chunks:
+            chunk_id = len(self.chunks)
+            terms = Counter(tokenize(chunk))
+            length = sum(terms.values())
+
+            self.chunks.append(chunk)
+            self.chunk_lengths.append(length)
+            self.total_length += length
+            self.num_chunks += 1
+            for term, frequency in terms.items():
+                self.postings.setdefault(term, {})[chunk_id] = frequency
+
+            chunk_ids.append(chunk_id)
+        return chunk_ids
+
+    def remove_chunks(self, chunk_ids):
+        """
+        Remove chunks from the index.
+
+        Only the postings of the removed chunks' own terms are touched.
+
+        Args:
+            chunk_ids (list): Ids of the chunks to remove.
+        """
+        for chunk_id in chunk_ids:
+            chunk = self.chunks[chunk_id]
+            if chunk is None:
+                continue
+
+            for term in set(tokenize(chunk)):
+                postings = self.postings[term]
+                del postings[chunk_id]
+                if not postings:
+                    del self.postings[term]
+
+            self.chunks[chunk_id] = None
+            self.total_length -= self.chunk_lengths[chunk_id]
+            self.num_chunks -= 1
+
+    def leading_chunks(self, top_k=5):
+        """
+        Get the first chunks of the index, in insertion order.
+
+        Args:
+            top_k (int, optional): Number of chunks to return. Defaults to 5.
+
+        Returns:
+            list: List of result dicts with "chunk_id", "score" and "text".
+        """
+        results = []
+        for chunk_id, chunk in enumerate(self.chunks):
+            if len(results) >= top_k:
+                break
+            if chunk is not None:
+                results.append({"chunk_id": chunk_id, "score": 0.0, "text": chunk})
+        return results
+
+    def search(self, query, top_k=5):
+        """
+        Search the index for the chunks most relevant to a query.
+
+        Args:
+            query (str): The query text.
+            top_k (int, optional): Number of chunks to return. Defaults to 5.
+
+        Returns:
+            list: List of result dicts with "chunk_id", "score" and "text", best match first.
+        """
+        if not self.num_chunks:
+            return []
+
+        terms = set(tokenize(query))
+        document_frequencies = {term: len(self.postings.get(term, ())) for term in terms}
+        average_length = self.total_length / self.num_chunks or 1.0
+        scores = self.score_terms(terms, self.num_chunks, average_length, document_frequencies)
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [
+            {"chunk_id": chunk_id, "score": score, "text": self.chunks[chunk_id]}
+            for chunk_id, score in best
+        ]
+
+    def score_terms(self, terms, num_chunks, average_length, document_frequencies):
+        """
+        Score this index's chunks for query terms, given collection statistics.
+
+        The statistics may describe a larger collection than this index, so
+        several indexes can be scored as if they were one.
+
+        Args:
+            terms (set): Query terms.
+            num_chunks (int): Number of chunks in the collection.
+            average_length (float): Average chunk length in the collection, in terms.
+            document_frequencies (dict): Number of chunks in the collection containing each term.
+
+        Returns:
+            dict: Chunk id -> BM25 score, for the chunks containing any of the terms.
+        """
+        scores = {}
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            document_frequency = document_frequencies[term]
+            idf = math.log(1 + (num_chunks - document_frequency + 0.5) / (document_frequency + 0.5))
+            for chunk_id, frequency in postings.items():
+                length_norm = 1 - self.b + self.b * self.chunk_lengths[chunk_id] / average_length
+                score = idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + score
+        return scores
+
+class CorpusIndex:
+    """
+    Incremental multi-document index for agentic RAG.
+
+    Each document has its own BM25 index, which may be shared with other
+    sessions through the document store, so documents are never copied per
+    session. A query scores every document with the statistics of the whole
+    corpus, so the merged top-k ranks as if all chunks were in one index, and
+    every result carries its provenance.
+    """
+    def __init__(self):
+        # doc_id -> callable returning the document's BM25Index, in insertion order
+        self.documents = {}
+        self._sizes = {}
+
+    def __len__(self):
+        return sum(self._sizes.values())
+
+    def __contains__(self, doc_id):
+        return doc_id in self.documents
+
+    def add_document(self, doc_id, chunks=None, index=None):
+        """
+        Add a document to the corpus, replacing any previous version.
+
+        Args:
+            doc_id (str): Document identifier, e.g. the file name.
+            chunks (list, optional): Text chunks, indexed for this corpus only.
+            index (BM25Index or callable, optional): An existing index of the
+                document, or a callable returning it on each query (e.g. the
+                `get_index` of a SharedDocument, which may reload it from disk).
+        """
+        if index is None:
+            index = build_index(chunks)
+        get_index = index if callable(index) else (lambda: index)
+        self.documents[doc_id] = get_index
+        self._sizes[doc_id] = len(get_index())
+
+    def remove_document(self, doc_id):
+        """
+        Remove a document from the corpus.
+
+        Args:
+            doc_id (str): Document identifier.
+        """
+        self.documents.pop(doc_id, None)
+        self._sizes.pop(doc_id, None)
+
+    def document_chunks(self, doc_id):
+        """
+        Get the chunks of a document, in document order.
+
+        Args:
+            doc_id (str): Document identifier.
+
+        Returns:
+            list: The document's text chunks.
+        """
+        if doc_id not in self.documents:
+            return []
+        return [chunk for chunk in self.documents[doc_id]().chunks if chunk is not None]
+
+    def _with_provenance(self, doc_id, results):
+        for result in results:
+            result["document"] = doc_id
+            result["position"] = result["chunk_id"]
+            result["label"] = f"{doc_id}, chunk {result['chunk_id'] + 1}"
+        return results
+
+    def leading_chunks(self, top_k=5):
+        """
+        Get the first chunks of the corpus, with provenance.
+
+        Args:
+            top_k (int, optional): Number of chunks to return. Defaults to 5.
+
+        Returns:
+            list: List of result dicts with "chunk_id" (the position within
+            the document), "score", "text", "document", "position" and "label".
+        """
+        results = []
+        for doc_id, get_index in self.documents.items():
+            if len(results) >= top_k:
+                break
+            results.extend(self._with_provenance(doc_id, get_index().leading_chunks(top_k - len(results))))
+        return results
+
+    def search(self, query, top_k=5):
+        """
+        Search all documents for the chunks most relevant to a query.
+
+        Args:
+            query (str): The query text.
+            top_k (int, optional): Number of chunks to return. Defaults to 5.
+
+        Returns:
+            list: List of result dicts with "chunk_id" (the position within
+            the document), "score", "text", "document", "position" and
+            "label", best match first.
+        """
+        indexes = [(doc_id, get_index()) for doc_id, get_index in self.documents.items()]
+        num_chunks = sum(len(index) for _, index in indexes)
+        if not num_chunks:
+            return []
+
+        # Corpus-wide statistics, so scores are comparable across documents
+        terms = set(tokenize(query))
+        average_length = sum(index.total_length for _, index in indexes) / num_chunks or 1.0
+        document_frequencies = {
+            term: sum(len(index.postings.get(term, ())) for _, index in indexes) for term in terms
+        }
+        scored = []
+        for doc_id, index in indexes:
+            for chunk_id, score in index.score_terms(terms, num_chunks, average_length, document_frequencies).items():
+                scored.append((score, doc_id, index, chunk_id))
+
+        best = heapq.nlargest(top_k, scored, key=lambda item: item[0])
+        results = []
+        for score, doc_id, index, chunk_id in best:
+            results.extend(self._with_provenance(doc_id, [{"chunk_id": chunk_id, "score": score, "text": index.chunks[chunk_id]}]))
+        return results
+
+def build_index(chunks):
+    """
+    Build a BM25 index from a list of text chunks.
+
+    Args:
+        chunks (list): List of text chunks.
+
+    Returns:
+        BM25Index: The populated index.
+    """
+    index = BM25Index()
+    index.add_chunks(chunks)
+    return index
+
+@traced()
+def retrieve_chunks(index, query, top_k=5):
+    """
+    Retrieve the top-k chunks for a query.
+
+    Falls back to the leading chunks of the document when no chunk shares a
+    term with the query (e.g. "summarize this document").
+
+    Args:
+        index (BM25Index or CorpusIndex): The index to search.
+        query (str): The query text.
+        top_k (int, optional): Number of chunks to return. Defaults to 5.
+
+    Returns:
+        list: List of result dicts with "chunk_id", "score" and "text".
+    """
+    results = index.search(query, top_k)
+    if not results:
+        results = index.leading_chunks(top_k)
+    return results
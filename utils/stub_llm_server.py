@@ -0,0 +1,277 @@
+"""
+Local stand-in for an LLM API, for offline runs and load tests.
+
+Mimics list-models, generate, stream and count-tokens endpoints with
+configurable latency, error rate, token throughput and server capacity.
+Point the app at it with the HTTP backend:
+
+    python -m utils.stub_llm_server --port 8765 --latency-ms 300 --tokens-per-second 80
+
+and set "llm_backend": "http" in utils/config.py.
+
+Protocol (JSON over HTTP):
+    GET  /v1/models                                  -> {"models": [{"name", "supported_generation_methods"}]}
+    POST /v1/models/<model>:generateContent          {"prompt"} -> {"text"}
+    POST /v1/models/<model>:streamGenerateContent    {"prompt"} -> newline-delimited {"text"} events
+    POST /v1/models/<model>:countTokens              {"prompt"} -> {"total_tokens"}
+    POST /v1/models/<model>:chat                     {"messages", "tools"} -> {"text", "function_calls"}
+The chat endpoint plays a simple agent: given tools and a new user message,
+it calls every tool whose only required parameter is "query" (in parallel,
+in one turn), then answers once it has the tool results.
+Errors are returned as {"error": message} with a non-200 status.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_MODELS = ["models/gemini-1.5-pro", "models/gemini-1.5-flash"]
+ROUTE_PATTERN = re.compile(r"^/v1/(models/[^:/]+):(\w+)$")
+STREAM_CHUNK_TOKENS = 8
+WORDS = (
+    "the model retrieved context from the document and the repository to answer "
+    "your question with citations where the information was available"
+).split()
+
+class StubLLMServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server simulating an LLM API.
+
+    At most `capacity` generations run at once; further requests queue, like
+    a rate-limited or GPU-bound provider, so load tests can find saturation.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, models=None, latency=0.3, jitter=0.05, error_rate=0.0,
+                 tokens_per_second=80.0, response_tokens=120, capacity=None, seed=0):
+        super().__init__(address, _Handler)
+        self.models = list(models or DEFAULT_MODELS)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self._slots = threading.BoundedSemaphore(capacity) if capacity else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def sample(self):
+        """Draw the time to first token and whether to inject an error for one request."""
+        with self._lock:
+            latency = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            return latency, self._rng.random() < self.error_rate
+
+    def response_text(self, model_name, prompt):
+        words = [WORDS[(len(prompt) + i) % len(WORDS)] for i in range(max(1, self.response_tokens - 4))]
+        return f"Stub answer from {model_name}: " + " ".join(words)
+
+    def _update_stats(self, in_flight=0, requests=0, errors=0):
+        with self._lock:
+            self.stats["requests"] += requests
+            self.stats["errors"] += errors
+            self.stats["in_flight"] += in_flight
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+    def acquire(self):
+        if self._slots is not None:
+            self._slots.acquire()
+        self._update_stats(in_flight=1, requests=1)
+
+    def release(self):
+        self._update_stats(in_flight=-1)
+        if self._slots is not None:
+            self._slots.release()
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # Keep load tests quiet
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/v1/models":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        self._send_json(200, {"models": [
+            {"name": name, "supported_generation_methods": ["generateContent", "countTokens"]}
+            for name in self.server.models
+        ]})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "Invalid JSON body"})
+            return
+        prompt = body.get("prompt", "")
+
+        match = ROUTE_PATTERN.match(self.path)
+        if match is None:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        model_name, method = match.groups()
+        if model_name not in self.server.models:
+            self._send_json(404, {"error": f"Model {model_name} not found"})
+            return
+
+        if method == "countTokens":
+            self._send_json(200, {"total_tokens": max(1, len(prompt) // 4)})
+        elif method in ("generateContent", "streamGenerateContent"):
+            self._generate(model_name, prompt, stream=method == "streamGenerateContent")
+        elif method == "chat":
+            self._chat(model_name, body.get("messages", []), body.get("tools", []))
+        else:
+            self._send_json(404, {"error": f"Unknown method {method}"})
+
+    def _generate(self, model_name, prompt, stream):
+        server = self.server
+        server.acquire()
+        try:
+            latency, fail = server.sample()
+            time.sleep(latency)
+            if fail:
+                server._update_stats(errors=1)
+                self._send_json(503, {"error": "Service unavailable (injected error)"})
+                return
+
+            text = server.response_text(model_name, prompt)
+            tokens = text.split(" ")
+            seconds_per_token = 1.0 / server.tokens_per_second if server.tokens_per_second else 0.0
+            if not stream:
+                time.sleep(len(tokens) * seconds_per_token)
+                self._send_json(200, {"text": text})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(tokens), STREAM_CHUNK_TOKENS):
+                piece = tokens[i:i + STREAM_CHUNK_TOKENS]
+                if i:
+                    time.sleep(len(piece) * seconds_per_token)
+                text_piece = (" " if i else "") + " ".join(piece)
+                self._write_chunk(json.dumps({"text": text_piece}).encode() + b"\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away mid-response
+            pass
+        finally:
+            server.release()
+
+    def _chat(self, model_name, messages, tools):
+        server = self.server
+        server.acquire()
+        try:
+            latency, fail = server.sample()
+            time.sleep(latency)
+            if fail:
+                server._update_stats(errors=1)
+                self._send_json(503, {"error": "Service unavailable (injected error)"})
+                return
+
+            # The messages since the latest user message
+            turn = []
+            for message in reversed(messages):
+                if message.get("role") == "user":
+                    question = message.get("text", "")
+                    break
+                turn.append(message)
+            else:
+                question = ""
+
+            results = [result for message in turn if message.get("role") == "tool" for result in message.get("results", [])]
+            if tools and not turn:
+                calls = [
+                    {"name": tool["name"], "args": {"query": question[:200]}}
+                    for tool in tools if tool.get("parameters", {}).get("required") == ["query"]
+                ]
+                if calls:
+                    self._send_json(200, {"text": "", "function_calls": calls})
+                    return
+
+            text = server.response_text(model_name, question)
+            if results:
+                text += f" (based on {len(results)} tool results: {', '.join(result['name'] for result in results)})"
+            if server.tokens_per_second:
+                time.sleep(len(text.split(" ")) / server.tokens_per_second)
+            self._send_json(200, {"text": text, "function_calls": []})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            server.release()
+
+def start_stub_server(host="127.0.0.1", port=0, **options):
+    """
+    Start a stub server in a background thread.
+
+    Args:
+        host (str, optional): Interface to bind. Defaults to "127.0.0.1".
+        port (int, optional): Port to bind; 0 picks a free port. Defaults to 0.
+        **options: StubLLMServer options (latency, jitter, error_rate,
+            tokens_per_second, response_tokens, capacity, models, seed).
+
+    Returns:
+        StubLLMServer: The running server; call shutdown() to stop it.
+    """
+    server = StubLLMServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True, name="stub-llm-server").start()
+    return server
+
+def main():
+    """Run a stub LLM server in the foreground."""
+    parser = argparse.ArgumentParser(description="Local stand-in for an LLM API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Mean time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="Uniform jitter around the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of generations that fail with 503")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="Output token throughput per request")
+    parser.add_argument("--response-tokens", type=int, default=120, help="Tokens per response")
+    parser.add_argument("--capacity", type=int, default=None, help="Maximum concurrent generations (default unlimited)")
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS), help="Comma-separated model names")
+    args = parser.parse_args()
+
+    server = StubLLMServer(
+        (args.host, args.port),
+        models=[name if name.startswith("models/") else f"models/{name}" for name in args.models.split(",")],
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        capacity=args.capacity
+    )
+    print(f"Stub LLM server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
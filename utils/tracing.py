@@ -0,0 +1,287 @@
+"""
+Lightweight span-based latency tracing for the LLM Evolution Explorer application.
+
+A trace covers one user request (e.g. a RAG query) and holds a span per timed
+step. Finished traces are appended to a rotating JSONL log, and every span
+feeds a rolling latency histogram per span name. Spans opened outside a trace
+only update the histograms.
+"""
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from utils.config import get_config
+
+# Upper bounds of the histogram buckets, in milliseconds
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+class Trace:
+    """
+    The spans of one request, timed relative to the start of the request.
+
+    Spans may be added from several threads, e.g. by the generation client's
+    worker threads, so additions are locked.
+    """
+    def __init__(self, name, attributes=None):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attributes = attributes or {}
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration_ms = None
+        self.spans = []
+        self._span_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def new_span_id(self):
+        with self._lock:
+            return next(self._span_ids)
+
+    def add_span(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self):
+        """
+        Get the trace as a JSON-serializable dict.
+
+        Returns:
+            dict: The trace, with its spans ordered by start time.
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: (span["start_ms"], span["span_id"]))
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(self.started_at)) + f".{int(self.started_at % 1 * 1000):03d}Z",
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "spans": spans,
+        }
+
+class Tracer:
+    """
+    Records spans into the current trace and keeps rolling latency histograms.
+
+    The current trace and span are tracked in context variables, so nested
+    spans find their parent in both threads and asyncio tasks.
+    """
+    def __init__(self, log_path=None, max_bytes=5 * 2 ** 20, backup_count=3, window=500, enabled=True):
+        self.log_path = log_path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.window = window
+        self.enabled = enabled
+        self._samples = {}
+        self._logger = None
+        self._lock = threading.Lock()
+
+    def _get_logger(self):
+        if self._logger is None and self.log_path:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            logger = logging.getLogger(f"{__name__}.{self.log_path}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            if not logger.handlers:
+                handler = RotatingFileHandler(self.log_path, maxBytes=self.max_bytes, backupCount=self.backup_count)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def _observe(self, name, duration_ms):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(duration_ms)
+
+    def _finish_span(self, trace, span_id, parent_id, name, start, end, attributes, error=None):
+        duration_ms = (end - start) * 1000
+        self._observe(name, duration_ms)
+        if trace is not None:
+            trace.add_span({
+                "span_id": span_id,
+                "parent_id": parent_id,
+                "name": name,
+                "start_ms": (start - trace.start) * 1000,
+                "duration_ms": duration_ms,
+                "thread": threading.current_thread().name,
+                "attributes": attributes,
+                "error": error,
+            })
+
+    @contextmanager
+    def trace(self, name, **attributes):
+        """
+        Start a trace for one request. Its root span is named after the trace.
+
+        The trace is written to the JSONL log when the block exits.
+
+        Args:
+            name (str): The request kind, e.g. "rag_query".
+            **attributes: Attributes of the request, e.g. the model name.
+
+        Yields:
+            Trace: The trace, or None if tracing is disabled.
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        trace = Trace(name, attributes)
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(None)
+        try:
+            with self.span(name):
+                yield trace
+        finally:
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            trace.duration_ms = (time.perf_counter() - trace.start) * 1000
+            logger = self._get_logger()
+            if logger is not None:
+                try:
+                    logger.info(json.dumps(trace.to_dict(), default=str))
+                except Exception as e:
+                    print(f"Error writing trace log: {str(e)}")
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        Time a block of code as a span of the current trace.
+
+        Args:
+            name (str): The span name, e.g. "split_text".
+            **attributes: Attributes of the span.
+
+        Yields:
+            dict: The span's attributes, which the block may add to.
+        """
+        if not self.enabled:
+            yield attributes
+            return
+
+        trace = _current_trace.get()
+        span_id = trace.new_span_id() if trace is not None else None
+        parent_id = _current_span.get()
+        token = _current_span.set(span_id)
+        error = None
+        start = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            error = f"{type(e).__name__}: {str(e)}"
+            raise
+        finally:
+            end = time.perf_counter()
+            _current_span.reset(token)
+            self._finish_span(trace, span_id, parent_id, name, start, end, attributes, error)
+
+    def record_span(self, name, start, end, **attributes):
+        """
+        Record a span that was timed by the caller, e.g. a response stream
+        consumed after the function that created it returned.
+
+        Args:
+            name (str): The span name.
+            start (float): Start time from time.perf_counter().
+            end (float): End time from time.perf_counter().
+            **attributes: Attributes of the span.
+        """
+        if not self.enabled:
+            return
+        trace = _current_trace.get()
+        span_id = trace.new_span_id() if trace is not None else None
+        self._finish_span(trace, span_id, _current_span.get(), name, start, end, attributes)
+
+    def histograms(self):
+        """
+        Get the rolling latency histograms of all span names.
+
+        Returns:
+            dict: Span name -> dict with "count", "p50_ms", "p95_ms", "p99_ms",
+            "max_ms" and "buckets", a list of (upper bound in ms, count) pairs
+            where the last bound is None for slower samples.
+        """
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+
+        histograms = {}
+        for name, values in samples.items():
+            counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+            for value in values:
+                counts[next((i for i, bound in enumerate(HISTOGRAM_BUCKETS_MS) if value <= bound), -1)] += 1
+
+            def percentile(p):
+                return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+            histograms[name] = {
+                "count": len(values),
+                "p50_ms": percentile(50),
+                "p95_ms": percentile(95),
+                "p99_ms": percentile(99),
+                "max_ms": values[-1],
+                "buckets": list(zip(HISTOGRAM_BUCKETS_MS + [None], counts)),
+            }
+        return histograms
+
+_tracer = None
+
+def get_tracer():
+    """
+    Get the process-wide tracer, creating it on first use.
+
+    Returns:
+        Tracer: The tracer.
+    """
+    global _tracer
+    if _tracer is None:
+        config = get_config()
+        _tracer = Tracer(
+            log_path=os.path.join(config["temp_folder"], "traces", "traces.jsonl"),
+            max_bytes=config["trace_log_max_mb"] * 2 ** 20,
+            backup_count=config["trace_log_backups"],
+            window=config["trace_histogram_window"],
+            enabled=config["tracing_enabled"]
+        )
+    return _tracer
+
+def traced(name=None):
+    """
+    Decorator that records each call of a function (sync or async) as a span.
+
+    Args:
+        name (str, optional): The span name. Defaults to None, which uses the function name.
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with get_tracer().span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,149 @@
+"""
+Content-addressed store for uploaded files.
+
+Uploads are written to files named after the SHA-256 of their bytes, so
+different files uploaded under the same name never overwrite each other, and
+identical bytes uploaded again (by any session, under any name) are stored
+once. Files are written in fixed-size blocks straight from the upload's
+memoryview, without copying the whole buffer. Every upload refreshes the
+file's mtime, and a background janitor removes files that haven't been
+uploaded again within "upload_ttl_hours".
+"""
+import os
+import threading
+import time
+from utils.config import get_config
+from utils.extraction_cache import hash_buffer
+
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+class UploadStore:
+    """
+    Directory of uploaded files named by content hash, with expiry.
+    """
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._janitor = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, content_hash, suffix=".pdf"):
+        """
+        Get the path a file with the given content hash is stored at.
+
+        Args:
+            content_hash (str): SHA-256 hex digest of the file bytes.
+            suffix (str, optional): File extension. Defaults to ".pdf".
+
+        Returns:
+            str: The path.
+        """
+        return os.path.join(self.directory, f"{content_hash}{suffix}")
+
+    def save(self, buffer, suffix=".pdf", content_hash=None):
+        """
+        Store a buffer, unless a file with the same bytes is already stored.
+
+        Args:
+            buffer: A bytes-like object, e.g. the memoryview of an uploaded file.
+            suffix (str, optional): File extension. Defaults to ".pdf".
+            content_hash (str, optional): SHA-256 of the buffer, if already known.
+                Defaults to None, which computes it.
+
+        Returns:
+            dict: "path", "hash", "size" and "deduplicated" (whether the file was
+            already stored, so nothing was written).
+        """
+        with memoryview(buffer) as view:
+            content_hash = content_hash or hash_buffer(view)
+            path = self.path_for(content_hash, suffix)
+            result = {"path": path, "hash": content_hash, "size": len(view), "deduplicated": False}
+            try:
+                # Refresh the mtime so the janitor treats the file as recently uploaded
+                os.utime(path)
+                result["deduplicated"] = True
+                return result
+            except FileNotFoundError:
+                pass
+
+            # Write to a private temporary file and rename it into place, so
+            # concurrent uploads of the same bytes never see a partial file
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    for start in range(0, len(view), UPLOAD_BLOCK_SIZE):
+                        f.write(view[start:start + UPLOAD_BLOCK_SIZE])
+                os.replace(tmp_path, path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return result
+
+    def clean(self, max_age=None):
+        """
+        Remove expired files and temporary files left behind by interrupted writes.
+
+        Args:
+            max_age (float, optional): Age in seconds after which a file expires.
+                Defaults to None, which uses the store's ttl.
+
+        Returns:
+            dict: "removed" (number of files), "freed_bytes" and "kept" (number of files).
+        """
+        max_age = self.ttl if max_age is None else max_age
+        cutoff = time.time() - max_age
+        stats = {"removed": 0, "freed_bytes": 0, "kept": 0}
+        with self._lock:
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                    if stat.st_mtime >= cutoff:
+                        stats["kept"] += 1
+                        continue
+                    os.remove(path)
+                except OSError:
+                    continue
+                stats["removed"] += 1
+                stats["freed_bytes"] += stat.st_size
+        return stats
+
+    def start_janitor(self, interval):
+        """
+        Start a daemon thread that calls clean() every `interval` seconds.
+
+        Args:
+            interval (float): Seconds between sweeps.
+        """
+        def sweep():
+            while True:
+                try:
+                    self.clean()
+                except Exception as e:
+                    print(f"Error cleaning uploads: {str(e)}")
+                time.sleep(interval)
+
+        with self._lock:
+            if self._janitor is None:
+                self._janitor = threading.Thread(target=sweep, daemon=True, name="upload-janitor")
+                self._janitor.start()
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_upload_store():
+    """
+    Get the process-wide upload store, creating it and its janitor on first use.
+
+    Returns:
+        UploadStore: The upload store.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            config = get_config()
+            _store = UploadStore(os.path.join(config["temp_folder"], "uploads"), config["upload_ttl_hours"] * 3600)
+            _store.start_janitor(config["upload_janitor_interval"])
+        return _store
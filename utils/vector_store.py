@@ -0,0 +1,461 @@
+"""
+Dense vector retrieval for the LLM Evolution Explorer application.
+"""
+import heapq
+import importlib
+import json
+import os
+import shutil
+import threading
+import weakref
+import zlib
+import numpy as np
+from numpy.lib.format import open_memmap
+from utils.config import get_config
+from utils.retrieval import tokenize
+
+SEARCH_BLOCK_ROWS = 65536
+MIN_CAPACITY = 1024
+
+class HashingEmbedder:
+    """
+    Offline text embedder based on the hashing trick.
+
+    Unigrams and bigrams are hashed into a fixed number of signed buckets,
+    weighted by log term frequency and L2-normalized, so cosine similarity is
+    a plain dot product. Hashing uses CRC32 rather than hash(), so vectors are
+    stable across processes and restarts.
+
+    Any object with the same name, dim and encode(texts) interface can be
+    used instead (see the "embedding_encoder" setting).
+    """
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def encode(self, texts):
+        """
+        Embed a batch of texts.
+
+        Args:
+            texts (list): The texts to embed.
+
+        Returns:
+            np.ndarray: float32 matrix of shape (len(texts), dim) with unit-norm rows.
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            counts = {}
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                h = zlib.crc32(feature.encode("utf-8"))
+                bucket = (h % self.dim, 1.0 if h & 0x80000000 else -1.0)
+                counts[bucket] = counts.get(bucket, 0) + 1
+            for (index, sign), count in counts.items():
+                vectors[row, index] += sign * (1.0 + np.log(count))
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+def load_embedder(spec):
+    """
+    Load an embedder from a configuration spec.
+
+    Args:
+        spec (str): "hashing" for the built-in HashingEmbedder, or
+            "package.module:factory" for a local encoder factory.
+
+    Returns:
+        object: The embedder.
+    """
+    if spec == "hashing":
+        return HashingEmbedder(get_config()["embedding_dim"])
+    module_name, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)()
+
+_embedder = None
+
+def get_embedder():
+    """
+    Get the process-wide embedder, creating it on first use.
+
+    Returns:
+        object: The embedder.
+    """
+    global _embedder
+    if _embedder is None:
+        _embedder = load_embedder(get_config()["embedding_encoder"])
+    return _embedder
+
+def top_k_rows(scores, top_k):
+    """
+    Get the indices and values of the top-k entries of each row of a score matrix.
+
+    Uses argpartition, so only the selected k entries per row are sorted.
+
+    Args:
+        scores (np.ndarray): Matrix of shape (num_queries, num_candidates).
+        top_k (int): Number of entries per row.
+
+    Returns:
+        tuple: Index and score matrices of shape (num_queries, k), best first.
+    """
+    k = min(top_k, scores.shape[1])
+    if k == 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty
+    indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    values = np.take_along_axis(scores, indices, axis=1)
+    order = np.argsort(-values, axis=1)
+    return np.take_along_axis(indices, order, axis=1), np.take_along_axis(values, order, axis=1)
+
+class VectorStore:
+    """
+    Persistent store of chunk embeddings in a memory-mapped .npy file.
+
+    The directory holds vectors.npy (a float32 matrix with spare capacity),
+    chunks.jsonl (one chunk text per line) and meta.json (row count, dimension
+    and embedder name). Reopening a store maps the matrix instead of
+    re-embedding anything, and meta.json is written last so a partial append
+    is ignored.
+    """
+    def __init__(self, directory, embedder):
+        self.directory = directory
+        self.embedder = embedder
+        self.count = 0
+        self.chunks = []
+        self._vectors = None
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["embedder"] != embedder.name or meta["dim"] != embedder.dim:
+                raise ValueError(f"Vector store {directory} was built with embedder {meta['embedder']}")
+            self.count = meta["count"]
+            if self.count:
+                self._vectors = open_memmap(self._path("vectors.npy"), mode="r+")
+                with open(self._path("chunks.jsonl"), "r", encoding="utf-8") as f:
+                    self.chunks = [json.loads(line) for _, line in zip(range(self.count), f)]
+
+    def __len__(self):
+        return self.count
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _write_meta(self):
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"count": self.count, "dim": self.embedder.dim, "embedder": self.embedder.name}, f)
+        os.replace(tmp_path, self._path("meta.json"))
+
+    def _ensure_capacity(self, rows):
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if rows <= capacity:
+            return
+
+        new_capacity = max(rows, 2 * capacity, MIN_CAPACITY)
+        tmp_path = self._path("vectors.npy.tmp")
+        vectors = open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(new_capacity, self.embedder.dim))
+        if self.count:
+            vectors[:self.count] = self._vectors[:self.count]
+        vectors.flush()
+        del vectors
+        self._vectors = None
+        os.replace(tmp_path, self._path("vectors.npy"))
+        self._vectors = open_memmap(self._path("vectors.npy"), mode="r+")
+
+    def add(self, texts):
+        """
+        Embed texts and append them to the store.
+
+        Args:
+            texts (list): The chunk texts to add.
+
+        Returns:
+            list: The row ids assigned to the texts.
+        """
+        if not texts:
+            return []
+        return self.add_vectors(self.embedder.encode(texts), texts)
+
+    def add_vectors(self, embeddings, texts):
+        """
+        Append precomputed embeddings and their texts to the store.
+
+        Args:
+            embeddings (np.ndarray): Unit-norm float32 matrix of shape (len(texts), dim).
+            texts (list): The chunk texts.
+
+        Returns:
+            list: The row ids assigned to the texts.
+        """
+        with self._lock:
+            start = self.count
+            self._ensure_capacity(start + len(texts))
+            self._vectors[start:start + len(texts)] = embeddings
+            self._vectors.flush()
+            with open(self._path("chunks.jsonl"), "a", encoding="utf-8") as f:
+                for text in texts:
+                    f.write(json.dumps(text) + "\n")
+            self.chunks.extend(texts)
+            self.count += len(texts)
+            self._write_meta()
+        return list(range(start, start + len(texts)))
+
+    def vectors(self):
+        """
+        Get the stored embeddings.
+
+        Returns:
+            np.ndarray: Memory-mapped matrix of shape (len(self), dim).
+        """
+        if self._vectors is None:
+            return np.empty((0, self.embedder.dim), dtype=np.float32)
+        return self._vectors[:self.count]
+
+    def search_vectors(self, query_vectors, top_k=5):
+        """
+        Exact cosine top-k search for a batch of query embeddings.
+
+        Scores are computed block by block with one matrix multiply per block,
+        so memory stays bounded however large the store is.
+
+        Args:
+            query_vectors (np.ndarray): Unit-norm query matrix of shape (num_queries, dim).
+            top_k (int, optional): Number of results per query. Defaults to 5.
+
+        Returns:
+            tuple: Row id and score matrices of shape (num_queries, k), best first.
+        """
+        vectors = self.vectors()
+        best_ids = np.empty((len(query_vectors), 0), dtype=np.int64)
+        best_scores = np.empty((len(query_vectors), 0), dtype=np.float32)
+        for start in range(0, len(vectors), SEARCH_BLOCK_ROWS):
+            scores = query_vectors @ vectors[start:start + SEARCH_BLOCK_ROWS].T
+            ids, values = top_k_rows(scores, top_k)
+            candidate_ids = np.concatenate([best_ids, ids + start], axis=1)
+            candidate_scores = np.concatenate([best_scores, values], axis=1)
+            order, best_scores = top_k_rows(candidate_scores, top_k)
+            best_ids = np.take_along_axis(candidate_ids, order, axis=1)
+        return best_ids, best_scores
+
+    def search_batch(self, queries, top_k=5):
+        """
+        Search the store for a batch of query texts.
+
+        Args:
+            queries (list): The query texts.
+            top_k (int, optional): Number of results per query. Defaults to 5.
+
+        Returns:
+            list: For each query, a list of result dicts with "chunk_id", "score" and "text".
+        """
+        ids, scores = self.search_vectors(self.embedder.encode(queries), top_k)
+        return [
+            [
+                {"chunk_id": int(chunk_id), "score": float(score), "text": self.chunks[chunk_id]}
+                for chunk_id, score in zip(row_ids, row_scores)
+            ]
+            for row_ids, row_scores in zip(ids, scores)
+        ]
+
+    def search(self, query, top_k=5):
+        """
+        Search the store for the chunks most similar to a query.
+
+        Args:
+            query (str): The query text.
+            top_k (int, optional): Number of results. Defaults to 5.
+
+        Returns:
+            list: List of result dicts with "chunk_id", "score" and "text", best match first.
+        """
+        if not self.count:
+            return []
+        return self.search_batch([query], top_k)[0]
+
+    def leading_chunks(self, top_k=5):
+        """
+        Get the first chunks of the store.
+
+        Args:
+            top_k (int, optional): Number of chunks to return. Defaults to 5.
+
+        Returns:
+            list: List of result dicts with "chunk_id", "score" and "text".
+        """
+        return [
+            {"chunk_id": chunk_id, "score": 0.0, "text": self.chunks[chunk_id]}
+            for chunk_id in range(min(top_k, self.count))
+        ]
+
+# Open stores by directory, shared by every session while any of them holds one
+_stores = weakref.WeakValueDictionary()
+# One lock per store directory, so sessions opening the same document don't rebuild it under each other
+_open_locks = {}
+_open_locks_guard = threading.Lock()
+
+def _open_lock(directory):
+    with _open_locks_guard:
+        return _open_locks.setdefault(directory, threading.Lock())
+
+def vector_store_directory(key):
+    """
+    Get the directory of a document's vector store for the configured embedder.
+
+    Args:
+        key (str): Stable identifier of the chunked document, e.g. its content hash.
+
+    Returns:
+        str: The directory.
+    """
+    return os.path.join(get_config()["temp_folder"], "vector_stores", get_embedder().name, key)
+
+def open_existing_vector_store(key):
+    """
+    Open a document's vector store if it has already been built.
+
+    Args:
+        key (str): Stable identifier of the chunked document.
+
+    Returns:
+        VectorStore: The shared open store, or None if there is no complete store.
+    """
+    directory = vector_store_directory(key)
+    with _open_lock(directory):
+        store = _stores.get(directory)
+        if store is None:
+            if not os.path.exists(os.path.join(directory, "meta.json")):
+                return None
+            try:
+                store = VectorStore(directory, get_embedder())
+            except (OSError, ValueError) as e:
+                print(f"Error opening vector store {key}: {str(e)}")
+                return None
+            _stores[directory] = store
+    return store
+
+def open_vector_store(key, chunks):
+    """
+    Open the vector store for a document, embedding its chunks only if it doesn't exist yet.
+
+    Stores are keyed by content, so sessions may open the same one at the same
+    time; a per-directory lock makes later callers wait for the first to finish
+    embedding instead of deleting the store under it. Sessions share one open
+    store per directory, so its chunk texts are loaded once per process.
+
+    Args:
+        key (str): Stable identifier of the chunked document, e.g. its content hash.
+        chunks (list): The document's chunks, embedded when the store is new.
+
+    Returns:
+        VectorStore: The vector store.
+    """
+    embedder = get_embedder()
+    directory = vector_store_directory(key)
+    with _open_lock(directory):
+        store = _stores.get(directory)
+        if store is not None and len(store) == len(chunks):
+            return store
+        store = VectorStore(directory, embedder)
+        if len(store) != len(chunks):
+            # Missing or incomplete store: rebuild it (and any index built on it) from scratch
+            store = None
+            shutil.rmtree(directory, ignore_errors=True)
+            store = VectorStore(directory, embedder)
+            store.add(chunks)
+        _stores[directory] = store
+    return store
+
+class VectorCorpus:
+    """
+    Dense retrieval over several documents, each with its own vector store.
+
+    Mirrors CorpusIndex: documents are added and removed individually, and a
+    query returns a merged top-k across documents with provenance. Documents
+    can be VectorStores (exact search) or IVFIndexes (approximate search); see
+    also LibraryCorpus in utils.ann_index.
+    """
+    def __init__(self):
+        self.documents = {}
+
+    def __len__(self):
+        return sum(len(store) for store in self.documents.values())
+
+    def __contains__(self, doc_id):
+        return doc_id in self.documents
+
+    def add_document(self, doc_id, store):
+        """
+        Add a document's vector store.
+
+        Args:
+            doc_id (str): Document identifier, e.g. the file name.
+            store (VectorStore or IVFIndex): The document's vector index.
+        """
+        self.documents[doc_id] = store
+
+    def remove_document(self, doc_id):
+        """
+        Remove a document.
+
+        Args:
+            doc_id (str): Document identifier.
+        """
+        self.documents.pop(doc_id, None)
+
+    def _with_provenance(self, doc_id, results):
+        for result in results:
+            result["document"] = doc_id
+            result["position"] = result["chunk_id"]
+            result["label"] = f"{doc_id}, chunk {result['chunk_id'] + 1}"
+        return results
+
+    def search(self, query, top_k=5):
+        """
+        Search all documents for the chunks most similar to a query.
+
+        The query is embedded once and scored against every document's store.
+
+        Args:
+            query (str): The query text.
+            top_k (int, optional): Number of results. Defaults to 5.
+
+        Returns:
+            list: List of result dicts with "chunk_id", "score", "text",
+            "document", "position" and "label", best match first.
+        """
+        if not self.documents:
+            return []
+        query_vectors = get_embedder().encode([query])
+        results = []
+        for doc_id, store in self.documents.items():
+            ids, scores = store.search_vectors(query_vectors, top_k)
+            results.extend(self._with_provenance(doc_id, [
+                {"chunk_id": int(chunk_id), "score": float(score), "text": store.chunks[chunk_id]}
+                for chunk_id, score in zip(ids[0], scores[0]) if chunk_id >= 0
+            ]))
+        return heapq.nlargest(top_k, results, key=lambda result: result["score"])
+
+    def leading_chunks(self, top_k=5):
+        """
+        Get the first chunks of the corpus, with provenance.
+
+        Args:
+            top_k (int, optional): Number of chunks to return. Defaults to 5.
+
+        Returns:
+            list: List of result dicts with "chunk_id", "score", "text",
+            "document", "position" and "label".
+        """
+        results = []
+        for doc_id, store in self.documents.items():
+            results.extend(self._with_provenance(doc_id, store.leading_chunks(top_k - len(results))))
+            if len(results) >= top_k:
+                break
+        return results